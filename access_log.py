@@ -0,0 +1,60 @@
+# 访问日志(access.20161111.log)解析的公共工具
+# 供Spark分析脚本和纯Python分析引擎共用，保证各处的解析规则一致
+
+import re
+import calendar
+
+# 单次组合正则：直接从原始日志行中提取视频ID
+# 先用前瞻判断请求中是否存在 /video/数字，存在则取 /video/ 后的ID，否则取 mid= 后的ID，
+# 与原先"先匹配/video/、为空再匹配mid="的优先级一致，且只有一个捕获组
+VIDEO_ID_PATTERN = r'"(?:GET|POST) (?:(?=[^"]*/video/\d)[^"]*?/video/|[^"]*?mid=)(\d+)[^"]* HTTP/1\.1"'
+video_id_regex = re.compile(VIDEO_ID_PATTERN)
+
+# 日志时间格式，例如 [11/Nov/2016:00:00:01 +0800]
+LOG_TIME_PATTERN = r'\[(\d{2})/(\w{3})/(\d{4}):(\d{2}):(\d{2}):(\d{2})'
+log_time_regex = re.compile(LOG_TIME_PATTERN)
+
+# 客户端IP（行首字段）、响应状态码和响应字节数（请求串之后的两个字段，字节数可能为"-"）
+CLIENT_IP_PATTERN = r'^(\S+)'
+STATUS_PATTERN = r'" (\d{3}) '
+BYTES_PATTERN = r'" \d{3} (\d+)'
+response_regex = re.compile(r'" (\d{3}) (\d+|-)')
+
+MONTHS = {
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12
+}
+
+# 缓存"日期+小时+分钟"对应的时间戳，同一分钟内的日志行只需要加上秒数
+_minute_cache = {}
+
+# 从日志行中提取视频ID，未匹配时返回空串
+def extract_video_id(line):
+    match = video_id_regex.search(line)
+    return match.group(1) if match else ""
+
+# 从日志行中提取访问时间，返回秒级时间戳（按日志中的本地时间计算，忽略时区），失败返回None
+def parse_log_time(line):
+    match = log_time_regex.search(line)
+    if not match:
+        return None
+    day, month, year, hour, minute, second = match.groups()
+    key = (year, month, day, hour, minute)
+    minute_ts = _minute_cache.get(key)
+    if minute_ts is None:
+        month_num = MONTHS.get(month)
+        if month_num is None:
+            return None
+        minute_ts = calendar.timegm((int(year), month_num, int(day), int(hour), int(minute), 0))
+        _minute_cache[key] = minute_ts
+    return minute_ts + int(second)
+
+# 从日志行中提取 (客户端IP, 状态码, 响应字节数)，无法解析的字段分别返回 ""、""、0
+def parse_access_fields(line):
+    space = line.find(" ")
+    client_ip = line[:space] if space > 0 else ""
+    match = response_regex.search(line)
+    if not match:
+        return client_ip, "", 0
+    status, size = match.groups()
+    return client_ip, status, int(size) if size != "-" else 0
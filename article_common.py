@@ -0,0 +1,117 @@
+# Taylor & Francis 爬虫的公共部分：文章信息字段、文本清理、DOI提取、Crossref结果映射
+# 本模块不依赖playwright，Crossref相关的模块（异步抓取、缓存、批量查询）可以直接复用
+
+import re
+from urllib.parse import unquote
+
+CROSSREF_API_URL = "https://api.crossref.org/works/{doi}"  # Crossref API基础URL
+# parse_crossref_message用到的字段，批量查询时只请求这些字段（DOI用于把结果对应回请求的DOI）
+CROSSREF_SELECT_FIELDS = ["DOI", "author", "title", "container-title", "volume", "issue", "page",
+                          "abstract", "published-print", "published-online"]
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# 文章信息字段（与输出JSON的字段顺序一致）
+ARTICLE_FIELDS = ["作者", "标题", "期刊名称", "volume", "issue", "page", "keywords", "摘要", "年份", "URL"]
+
+
+# 空的文章信息字典
+def empty_article_data(url):
+    article_data = {field: "" for field in ARTICLE_FIELDS}
+    article_data["URL"] = url
+    return article_data
+
+
+# 清理文本函数
+def clean_text(text):
+    if text:
+        return ' '.join(text.strip().split())
+    return ""
+
+
+# DOI以"10.注册号/"开头，后缀可以包含"/"
+DOI_PATTERN = re.compile(r"10\.\d{4,9}/\S+")
+# 出版商文章页中DOI之前的路径，如 /doi/full/、/doi/abs/、/doi/pdf/
+DOI_PAGE_TYPES = {"full", "abs", "pdf", "epdf", "epub", "ref", "suppl", "figure", "citedby"}
+
+
+# 规范化DOI：URL解码、去掉"doi:"前缀和末尾标点，统一为小写（DOI不区分大小写）
+def normalize_doi(doi):
+    doi = unquote(doi).strip()
+    if doi.lower().startswith("doi:"):
+        doi = doi[len("doi:"):].strip()
+    match = DOI_PATTERN.search(doi)
+    if not match:
+        return None
+    return match.group(0).rstrip(".,;)").lower()
+
+
+# 从URL中提取DOI（也接受 doi.org 链接和单独的DOI），返回规范化后的DOI
+def extract_doi_from_url(url):
+    try:
+        url = unquote(url.strip())
+        # 移除可能的查询参数和锚点
+        url = url.split("?")[0].split("#")[0]
+        if "/doi/" in url:
+            path = url.split("/doi/", 1)[1]
+            # /doi/full/10.xxx、/doi/abs/10.xxx、/doi/pdf/10.xxx 等形式
+            page_type, _, rest = path.partition("/")
+            if page_type.lower() in DOI_PAGE_TYPES:
+                path = rest
+            return normalize_doi(path)
+        if "doi.org/" in url:
+            return normalize_doi(url.split("doi.org/", 1)[1])
+        return normalize_doi(url) if url.lower().startswith(("10.", "doi:")) else None
+    except Exception as e:
+        print(f"[-] 从URL提取DOI失败: {str(e)}")
+        return None
+
+
+# 将Crossref API返回的message映射为文章信息字典
+def parse_crossref_message(message, doi):
+    article_data = empty_article_data(f"https://doi.org/{doi}")
+    
+    # 提取作者信息
+    if "author" in message:
+        authors = []
+        for author in message["author"]:
+            if "given" in author and "family" in author:
+                authors.append(f"{author['given']} {author['family']}")
+            elif "name" in author:
+                authors.append(author["name"])
+        article_data["作者"] = ", ".join(authors)
+    
+    # 提取标题信息
+    if "title" in message and message["title"]:
+        article_data["标题"] = clean_text(message["title"][0])
+    
+    # 提取期刊名称
+    if "container-title" in message and message["container-title"]:
+        article_data["期刊名称"] = clean_text(message["container-title"][0])
+    
+    # 提取volume信息
+    if "volume" in message:
+        article_data["volume"] = clean_text(str(message["volume"]))
+    
+    # 提取issue信息
+    if "issue" in message:
+        article_data["issue"] = clean_text(str(message["issue"]))
+    
+    # 提取page信息
+    if "page" in message:
+        article_data["page"] = clean_text(str(message["page"]))
+    
+    # 提取摘要信息
+    if "abstract" in message:
+        article_data["摘要"] = clean_text(message["abstract"])
+    
+    # 提取年份信息
+    if "published-print" in message and "date-parts" in message["published-print"]:
+        date_parts = message["published-print"]["date-parts"][0]
+        if date_parts and len(date_parts) > 0:
+            article_data["年份"] = str(date_parts[0])
+    elif "published-online" in message and "date-parts" in message["published-online"]:
+        date_parts = message["published-online"]["date-parts"][0]
+        if date_parts and len(date_parts) > 0:
+            article_data["年份"] = str(date_parts[0])
+    
+    return article_data
@@ -0,0 +1,130 @@
+# 文章信息的流式输出：每抓取到一篇文章就追加写入JSONL文件，并在检查点文件中记录已完成的URL/DOI
+# 程序中途崩溃时已抓取的文章不会丢失，重新运行时跳过已完成的URL；内存占用不随URL数量增长。
+# 抓取结束后可选地压缩为原来的 Taylor_Francis_Articles_时间戳.json 格式
+# 运行：python article_store.py [Taylor_Francis_Articles.jsonl]（只做压缩）
+
+import os
+import sys
+import json
+from datetime import datetime
+
+ARTICLES_JSONL = "Taylor_Francis_Articles.jsonl"
+CHECKPOINT_SUFFIX = ".done"  # 检查点文件：每行为 "URL\tDOI"
+
+
+class ArticleJsonlWriter:
+    """
+    追加写入文章信息的JSONL文件及其检查点
+
+    每篇文章先写入JSONL再写检查点，两者都在写完一行后立即flush；
+    如果在两次写入之间崩溃，重新运行时该文章会被再抓取一次，压缩时按URL去重
+
+    Args:
+        path: JSONL文件路径
+        checkpoint_path: 检查点文件路径，默认为 JSONL路径 + ".done"
+    """
+
+    def __init__(self, path=ARTICLES_JSONL, checkpoint_path=None):
+        self.path = path
+        self.checkpoint_path = checkpoint_path or path + CHECKPOINT_SUFFIX
+        self.done_urls = set()
+        self.done_dois = set()
+        self.written = 0
+        for file_path in (self.path, self.checkpoint_path):
+            _drop_partial_line(file_path)
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                for line in f:
+                    url, _, doi = line.rstrip("\n").partition("\t")
+                    self.done_urls.add(url)
+                    if doi:
+                        self.done_dois.add(doi.lower())
+        if self.done_urls:
+            print(f"[+] 检查点中已有 {len(self.done_urls)} 个已完成的URL，将跳过这些URL")
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.checkpoint = open(self.checkpoint_path, "a", encoding="utf-8")
+
+    # URL或其DOI已经完成
+    def is_done(self, url, doi=None):
+        return url in self.done_urls or bool(doi and doi.lower() in self.done_dois)
+
+    def write(self, url, doi, article_data):
+        self.file.write(json.dumps(article_data, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.checkpoint.write(f"{url}\t{doi or ''}\n")
+        self.checkpoint.flush()
+        self.done_urls.add(url)
+        if doi:
+            self.done_dois.add(doi.lower())
+        self.written += 1
+
+    def close(self):
+        for f in (self.file, self.checkpoint):
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        print(f"[+] 本次写入 {self.written} 篇文章到 {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# 崩溃可能留下没写完的最后一行，截掉它
+def _drop_partial_line(path):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        data = f.read()
+        f.seek(data.rfind(b"\n") + 1)
+        f.truncate()
+    print(f"[-] {path} 最后一行不完整，已截掉")
+
+
+# 逐行读取JSONL中的文章信息
+def iter_articles(path=ARTICLES_JSONL):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# 将JSONL压缩为 Taylor_Francis_Articles_时间戳.json（格式与 json.dump(全部文章, indent=2) 相同），按URL去重，逐篇写出
+def compact_jsonl(path=ARTICLES_JSONL, output_dir="."):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = os.path.join(output_dir, f"Taylor_Francis_Articles_{timestamp}.json")
+    seen_urls = set()
+    count = 0
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("[")
+        for article_data in iter_articles(path):
+            if article_data.get("URL") in seen_urls:
+                continue
+            seen_urls.add(article_data.get("URL"))
+            # 与 json.dump(列表, indent=2) 的输出一致：每篇文章整体再缩进两格
+            item = json.dumps(article_data, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            f.write(("," if count else "") + "\n  " + item)
+            count += 1
+        f.write("\n]" if count else "]")
+    print(f"\n[+] 数据已成功保存到: {filename}")
+    print(f"[+] 共抓取 {count} 篇文章信息")
+    return filename
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else ARTICLES_JSONL
+    if not os.path.exists(path):
+        print(f"[-] 文件不存在: {path}")
+        return 1
+    compact_jsonl(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# 无头浏览器池：一个无头Chromium，N个浏览器上下文（各一个页面）并发抓取需要JavaScript渲染的文章页面
+# 原方案只有一个有界面的浏览器和一个页面，逐个URL串行访问，页面超时60秒，并且会下载图片、字体、样式表和统计脚本；
+# 这里通过路由拦截直接中止这些请求，URL分配到池中空闲的页面，单页超时缩短到15秒。
+# 渲染后的DOM交给 static_extract.parse_article_html 解析，选择器与静态HTML解析一致
+# 运行：python browser_pool.py [--size 4] [--timeout 15000] [--no-block] [--headed] URL ...
+# 本地测量：python crawler_stubs.py tandf --latency 0.2，然后访问 http://127.0.0.1:8999/doi/full/10.1080/1 等页面
+
+import sys
+import time
+import asyncio
+import argparse
+from contextlib import nullcontext
+
+from playwright.async_api import async_playwright
+
+from article_common import USER_AGENT, empty_article_data
+from static_extract import parse_article_html
+
+BROWSER_POOL_SIZE = 4  # 浏览器池中的上下文（页面）数
+PAGE_TIMEOUT_MS = 15000  # 单页超时（毫秒）
+# 中止的资源类型，文章信息都在HTML中，这些资源只影响显示
+BLOCKED_RESOURCE_TYPES = {"image", "font", "stylesheet", "media"}
+# 中止的统计/广告脚本（URL中包含以下任一字符串）
+BLOCKED_URL_PATTERNS = ("google-analytics", "googletagmanager", "doubleclick", "analytics", "hotjar",
+                        "scorecardresearch", "newrelic", "nr-data", "adservice", "facebook.net")
+# 等待文章标题出现（JavaScript渲染的页面），超时后直接解析当前DOM
+CONTENT_SELECTOR = "h1"
+
+
+def should_block(resource_type, url):
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    return resource_type == "script" and any(pattern in url for pattern in BLOCKED_URL_PATTERNS)
+
+
+class PoolStats:
+    def __init__(self):
+        self.pages = []  # (URL, 耗时, 是否成功)
+        self.blocked = 0
+        self.allowed = 0
+        self.start_time = time.time()
+
+    def report(self):
+        duration = time.time() - self.start_time
+        succeeded = sum(1 for _, _, ok in self.pages if ok)
+        print(f"[+] 浏览器池: {len(self.pages)} 个页面（成功 {succeeded}），耗时 {duration:.2f} 秒，"
+              f"{len(self.pages) / duration if duration > 0 else 0:.2f} 页/秒")
+        if self.pages:
+            durations = [page_duration for _, page_duration, _ in self.pages]
+            print(f"[+] 单页平均 {sum(durations) / len(durations) * 1000:.0f} ms，最长 {max(durations) * 1000:.0f} ms")
+        print(f"[+] 拦截 {self.blocked} 个资源请求，放行 {self.allowed} 个")
+
+
+class BrowserPool:
+    """
+    无头浏览器池（Playwright异步API）
+
+    Args:
+        size: 浏览器上下文（页面）数，即同时抓取的页面数
+        timeout_ms: 单页超时（毫秒）
+        block_resources: 是否拦截图片、字体、样式表和统计脚本
+        headless: 是否使用无头模式
+        page_stats: static_extract.ExtractionStats，同时把每个页面的耗时记录到其中
+        controller: rate_controller.AdaptiveRateController，每次打开页面前按主机等待速率和并发名额，并记录延迟和错误
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, timeout_ms=PAGE_TIMEOUT_MS, block_resources=True, headless=True,
+                 page_stats=None, controller=None):
+        self.size = size
+        self.timeout_ms = timeout_ms
+        self.block_resources = block_resources
+        self.headless = headless
+        self.stats = PoolStats()
+        self.page_stats = page_stats
+        self.controller = controller
+        self.playwright = None
+        self.browser = None
+        self.contexts = []
+        self._pages = None
+
+    async def __aenter__(self):
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(
+            headless=self.headless,
+            args=["--disable-blink-features=AutomationControlled", "--no-sandbox", "--disable-dev-shm-usage"]
+        )
+        self._pages = asyncio.Queue()
+        for _ in range(self.size):
+            context = await self.browser.new_context(user_agent=USER_AGENT)
+            # 隐藏自动化特征
+            await context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined});")
+            if self.block_resources:
+                await context.route("**/*", self._handle_route)
+            page = await context.new_page()
+            page.set_default_timeout(self.timeout_ms)
+            self.contexts.append(context)
+            self._pages.put_nowait(page)
+        print(f"[+] 浏览器池已启动: {self.size} 个上下文，单页超时 {self.timeout_ms} ms")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for context in self.contexts:
+            await context.close()
+        await self.browser.close()
+        await self.playwright.stop()
+
+    async def _handle_route(self, route):
+        request = route.request
+        if should_block(request.resource_type, request.url):
+            self.stats.blocked += 1
+            await route.abort()
+        else:
+            self.stats.allowed += 1
+            await route.continue_()
+
+    # 用池中空闲的页面打开URL，返回渲染后的HTML；超时或出错时返回None
+    async def fetch_html(self, url):
+        page = await self._pages.get()
+        start_time = time.time()
+        html = None
+        try:
+            async with self.controller.async_request(url, kind="browser") if self.controller else nullcontext({}) as call:
+                response = await page.goto(url, wait_until="domcontentloaded", timeout=self.timeout_ms)
+                call["status"] = response.status if response else None
+            try:
+                await page.wait_for_selector(CONTENT_SELECTOR, timeout=self.timeout_ms // 3)
+            except Exception:
+                pass
+            html = await page.content()
+        except Exception as e:
+            print(f"[-] 浏览器访问 {url[:80]} 失败: {str(e)[:80]}")
+        finally:
+            duration = time.time() - start_time
+            self.stats.pages.append((url, duration, html is not None))
+            if self.page_stats is not None:
+                self.page_stats.record(url, "浏览器池", duration)
+            self._pages.put_nowait(page)
+        return html
+
+    async def extract_article(self, url):
+        html = await self.fetch_html(url)
+        return parse_article_html(html, url) if html else empty_article_data(url)
+
+    async def extract_all(self, urls):
+        return await asyncio.gather(*(self.extract_article(url) for url in urls))
+
+
+# 同步调用入口：用浏览器池抓取一组URL，按输入顺序返回文章信息列表
+def extract_articles(urls, report=True, **options):
+    async def run():
+        async with BrowserPool(**options) as pool:
+            results = await pool.extract_all(urls)
+        if report:
+            pool.stats.report()
+        return results
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无头浏览器池抓取文章页面")
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--size", type=int, default=BROWSER_POOL_SIZE, help="浏览器上下文数")
+    parser.add_argument("--timeout", type=int, default=PAGE_TIMEOUT_MS, help="单页超时（毫秒）")
+    parser.add_argument("--no-block", action="store_true", help="不拦截图片、字体、样式表和统计脚本")
+    parser.add_argument("--headed", action="store_true", help="显示浏览器")
+    args = parser.parse_args()
+
+    results = extract_articles(args.urls, size=args.size, timeout_ms=args.timeout,
+                               block_resources=not args.no_block, headless=not args.headed)
+    for article_data in results:
+        print(f"{article_data['URL'][:80]}: {article_data['标题'] or '未获取到'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+# 基于位图的用户群（cohort）引擎
+# 漏斗和留存查询大量使用 COUNT(DISTINCT CASE WHEN ... THEN user_id END)；这里把每个漏斗环节、每天的用户集合
+# 表示为稠密用户编码（BehaviorData中的因子化编码）上的位图，去重计数即位图基数。
+# 留存用户即每天的位图求交，N日留存矩阵只需对每天的位图两两求交；
+# 漏斗各环节的用户要求同一商品上按时间顺序推进，不能由各环节用户位图求交得到，
+# 仍由 ecommerce_analysis_numpy.funnel_depth 逐环节推进到达时间计算，位图只用于去重计数
+# 安装了pyroaring时使用Roaring压缩位图，否则退化为Python大整数位集（按位与/或 + popcount）
+# 运行：python cohort_bitmap.py [--days 7] [--backend auto|roaring|int] [--input 数据路径]
+
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from ecommerce_analysis_numpy import (load_behavior_data, funnel_depth, spark_round, write_result,
+                                      DEFAULT_FUNNEL_STAGES)
+
+try:
+    from pyroaring import BitMap
+except ImportError:
+    BitMap = None
+
+
+class IntBitSet:
+    """
+    Python大整数表示的位集，第i位表示编码为i的用户
+    只实现引擎用到的集合运算：& | - 和基数
+    """
+
+    __slots__ = ("bits",)
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    @classmethod
+    def from_indices(cls, indices, size):
+        flags = np.zeros(size, dtype=bool)
+        flags[indices] = True
+        return cls(int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little"))
+
+    def __and__(self, other):
+        return IntBitSet(self.bits & other.bits)
+
+    def __or__(self, other):
+        return IntBitSet(self.bits | other.bits)
+
+    def __sub__(self, other):
+        return IntBitSet(self.bits & ~other.bits)
+
+    def __len__(self):
+        return self.bits.bit_count() if hasattr(self.bits, "bit_count") else bin(self.bits).count("1")
+
+
+# 选择位图实现：auto 时优先使用pyroaring
+def resolve_backend(backend="auto"):
+    if backend == "roaring" and BitMap is None:
+        raise ImportError("未安装pyroaring，无法使用roaring后端")
+    if backend == "auto":
+        return "roaring" if BitMap is not None else "int"
+    return backend
+
+
+def make_bitmap(indices, size, backend="auto"):
+    if resolve_backend(backend) == "roaring":
+        return BitMap(np.asarray(indices, dtype=np.uint32))
+    return IntBitSet.from_indices(indices, size)
+
+
+class CohortEngine:
+    """
+    每天 / 每个漏斗环节的用户位图
+
+    Args:
+        data: BehaviorData
+        stages: 漏斗环节列表
+        window_seconds: 漏斗时间窗口（秒），None表示不限
+        backend: 位图实现（auto/roaring/int）
+    """
+
+    def __init__(self, data, stages=DEFAULT_FUNNEL_STAGES, window_seconds=None, backend="auto"):
+        self.backend = resolve_backend(backend)
+        self.num_users = len(data.user_ids)
+        self.stages = list(stages)
+
+        # 每天的活跃用户位图：(日期偏移, 用户) 去重后按日期切分
+        active = data.has_timestamp & (data.user >= 0)
+        self.first_day = int(data.day[active].min()) if active.any() else 0
+        keys = np.unique((data.day[active] - self.first_day) * self.num_users + data.user[active])
+        key_day = keys // self.num_users
+        self.day_users = {}
+        for offset in np.unique(key_day):
+            start, end = np.searchsorted(key_day, [offset, offset + 1])
+            self.day_users[self.first_day + int(offset)] = self._bitmap(keys[start:end] % self.num_users)
+
+        # 每个漏斗环节的用户位图：存在某个商品按顺序到达该环节（漏斗深度 >= 环节序号+1）的用户
+        # （到达与否取决于上一环节的到达时间，由funnel_depth计算，这里不做位图求交）
+        group_user, depth = funnel_depth(data, self.stages, window_seconds)
+        self.stage_users = [self._bitmap(np.unique(group_user[depth >= index + 1]))
+                            for index in range(len(self.stages))]
+
+    def _bitmap(self, indices):
+        return make_bitmap(indices, self.num_users, self.backend)
+
+    @property
+    def days(self):
+        return sorted(self.day_users)
+
+    # 任务2.2：各环节独立用户数（与 funnel_user_count_view 一致）
+    def stage_user_rows(self):
+        return [f"{stage}_user" for stage in self.stages], [[len(users) for users in self.stage_users]]
+
+    # 任务2.2：相邻环节转化率和整体转化率（与 funnel_conversion_view 一致）
+    def funnel_rows(self):
+        stage_counts = [len(users) for users in self.stage_users]
+        header = [f"{previous}_to_{stage}" for previous, stage in zip(self.stages, self.stages[1:])]
+        header.append("overall_conversion")
+        row = [spark_round(stage_counts[i + 1], stage_counts[i]) for i in range(len(self.stages) - 1)]
+        row.append(spark_round(stage_counts[-1], stage_counts[0]))
+        return header, [row]
+
+    # 任务2.4：次日留存（当天用户 ∩ 前一天用户）
+    def day2_retention_rows(self):
+        header = ["current_date", "current_active_user", "retained_user", "day2_retention_rate"]
+        rows = []
+        for day in self.days:
+            users = self.day_users[day]
+            previous = self.day_users.get(day - 1)
+            retained = len(users & previous) if previous is not None else 0
+            rows.append([str(np.datetime64(day, "D")), len(users), retained, spark_round(retained, len(users))])
+        return header, rows
+
+    # N日留存矩阵：每个日期当天的活跃用户中，第1..N天后仍活跃的比例（超出数据范围的为空）
+    def retention_matrix(self, max_days=7):
+        header = ["cohort_date", "cohort_user"] + [f"day{n}_retention_rate" for n in range(1, max_days + 1)]
+        last_day = self.days[-1] if self.day_users else None
+        rows = []
+        for day in self.days:
+            cohort = self.day_users[day]
+            row = [str(np.datetime64(day, "D")), len(cohort)]
+            for n in range(1, max_days + 1):
+                if day + n > last_day:
+                    row.append(None)
+                    continue
+                later = self.day_users.get(day + n)
+                row.append(spark_round(len(cohort & later) if later is not None else 0, len(cohort)))
+            rows.append(row)
+        return header, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="基于位图的漏斗与留存计算")
+    parser.add_argument("--days", type=int, default=7, help="留存矩阵的最大天数")
+    parser.add_argument("--backend", choices=["auto", "roaring", "int"], default="auto")
+    parser.add_argument("--input", help="行为数据（默认Parquet存储，不存在时为CSV）")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    data = load_behavior_data(args.input)
+    load_duration = time.time() - start_time
+
+    start_time = time.time()
+    engine = CohortEngine(data, backend=args.backend)
+    build_duration = time.time() - start_time
+    print(f"=== 位图用户群引擎（{engine.backend}）：{len(engine.day_users)} 天，{engine.num_users} 个用户 ===")
+    print(f"加载耗时: {load_duration:.2f} 秒，构建位图耗时: {build_duration:.2f} 秒")
+
+    start_time = time.time()
+    stage_users = engine.stage_user_rows()
+    funnel = engine.funnel_rows()
+    retention = engine.day2_retention_rows()
+    matrix = engine.retention_matrix(args.days)
+    print(f"漏斗 + 次日留存 + {args.days}日留存矩阵计算耗时: {time.time() - start_time:.4f} 秒")
+
+    print("\n=== 转化漏斗 ===")
+    print(dict(zip(stage_users[0], stage_users[1][0])))
+    print(dict(zip(funnel[0], funnel[1][0])))
+    print("\n=== 近3天用户次日留存率 ===")
+    for row in retention[1][-3:][::-1]:
+        print(row)
+    print(f"\n=== {args.days}日留存矩阵 ===")
+    print(matrix[0])
+    for row in matrix[1]:
+        print(row)
+    write_result("cohort_retention_matrix", *matrix)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
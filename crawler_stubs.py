@@ -0,0 +1,350 @@
+# 爬虫的本地桩服务器：在本机模拟Crossref API和Taylor & Francis文章页面，便于在不访问外网的情况下测量和验证抓取逻辑
+# 运行：python crawler_stubs.py crossref [--port 8999] [--latency 0.05] [--error-every 10]
+# 然后：python crossref_async.py --api-url "http://127.0.0.1:8999/works/{doi}" [--batch 20] 10.1080/1 10.1080/2 ...
+# 文章页面：python crawler_stubs.py tandf [--latency 0.2]，然后 python static_extract.py http://127.0.0.1:8999/doi/full/10.1080/1
+# 或 python browser_pool.py [--no-block] http://127.0.0.1:8999/doi/full/10.1080/1 ...（比较拦截子资源前后的耗时）
+# EBSCO模拟站点：python crawler_stubs.py ebsco，然后 python ebsco_batch.py --url http://127.0.0.1:8999/search
+
+import os
+import sys
+import gzip
+import json
+import html
+import hashlib
+import time
+import argparse
+import threading
+from urllib.parse import unquote, urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# 根据DOI生成确定性的Crossref message；与真实响应一样带有参考文献、许可证等paper.py用不到的大字段
+def make_crossref_message(doi):
+    number = sum(ord(ch) for ch in doi)
+    return {
+        "reference": [{"key": f"ref{i}", "unstructured": f"Stub reference {i} cited by {doi}, "
+                       f"Journal of Stub Citations {i % 40}, pp. {i}-{i + 9}."} for i in range(40)],
+        "license": [{"URL": "http://www.tandfonline.com/action/showCopyRight", "content-version": "vor"}],
+        "link": [{"URL": f"https://www.tandfonline.com/doi/pdf/{doi}", "content-type": "unspecified"}],
+        "publisher": "Informa UK Limited",
+        "subject": ["Stub Studies", "Information Systems"],
+        "DOI": doi,
+        "author": [{"given": "Stub", "family": f"Author{number % 97}"}, {"name": "Stub Consortium"}],
+        "title": [f"Stub article {doi}"],
+        "container-title": ["Journal of Stub Studies"],
+        "volume": str(number % 50 + 1),
+        "issue": str(number % 12 + 1),
+        "page": f"{number % 300 + 1}-{number % 300 + 20}",
+        "abstract": f"<jats:p>Abstract of {doi}.</jats:p>",
+        "published-print": {"date-parts": [[2000 + number % 25, 1, 1]]},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.server.count_bytes(len(body))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        request_number = server.count_request(self.path)
+        if server.latency:
+            time.sleep(server.latency)
+        # 按请求序号注入限流/服务端错误，验证重试逻辑
+        if server.error_every and request_number % server.error_every == 0:
+            status = 429 if request_number // server.error_every % 2 else 503
+            self.send_json(status, {"status": "error"}, {"Retry-After": "0"} if status == 429 else None)
+            return
+        self.handle_route(urlsplit(self.path))
+
+    def handle_route(self, url):
+        if url.path.startswith("/works/"):
+            doi = unquote(url.path[len("/works/"):])
+            if doi in self.server.missing:
+                self.send_json(404, {"status": "error", "message": "Resource not found."})
+                return
+            payload = {"status": "ok", "message-type": "work", "message": make_crossref_message(doi)}
+            # 内容不变时ETag不变，支持条件请求
+            etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_json(200, payload, {"ETag": etag, "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+            return
+        if url.path == "/works":
+            self.handle_works_query(parse_qs(url.query))
+            return
+        self.send_json(404, {"status": "error"})
+
+    # /works?filter=doi:A,doi:B&select=字段&rows=N：返回找到的DOI，只保留select的字段
+    def handle_works_query(self, query):
+        filters = ",".join(query.get("filter", [""])).split(",")
+        dois = [item[len("doi:"):] for item in filters if item.startswith("doi:")]
+        select = ",".join(query.get("select", [])).split(",") if "select" in query else None
+        rows = int(query.get("rows", ["20"])[0])
+        items = []
+        for doi in dois:
+            if doi in self.server.missing:
+                continue
+            message = make_crossref_message(doi)
+            message["DOI"] = doi.lower()  # 与Crossref一致，返回的DOI为小写
+            if select:
+                message = {key: value for key, value in message.items() if key in select}
+            items.append(message)
+        self.send_json(200, {"status": "ok", "message-type": "work-list",
+                             "message": {"total-results": len(items), "items": items[:rows]}})
+
+
+# 文章页面引用的子资源（图片、字体、样式表、统计脚本），用于测量浏览器拦截资源的效果
+PAGE_RESOURCES = {
+    "site.css": ("text/css", b"body { font-family: 'StubFont'; }\n" * 2000),
+    "stubfont.woff2": ("font/woff2", b"\0" * 60000),
+    "cover.jpg": ("image/jpeg", b"\xff\xd8\xff" + b"\0" * 120000),
+    "analytics.js": ("application/javascript", b"window.stubAnalytics = true;\n" * 500),
+}
+
+
+# 根据DOI生成文章页面HTML（结构与Taylor & Francis文章页一致，带citation_*元数据）
+# dynamic=True 时模拟内容由JavaScript渲染的页面：静态HTML中没有文章信息，需要浏览器抓取
+def make_article_html(doi, dynamic=False):
+    message = make_crossref_message(doi)
+    authors = [author.get("name") or f"{author['given']} {author['family']}" for author in message["author"]]
+    first_page, last_page = message["page"].split("-")
+    escape = html.escape
+    meta = [("citation_title", message["title"][0]), ("citation_journal_title", message["container-title"][0]),
+            ("citation_volume", message["volume"]), ("citation_issue", message["issue"]),
+            ("citation_firstpage", first_page), ("citation_lastpage", last_page),
+            ("citation_publication_date", f"{message['published-print']['date-parts'][0][0]}/01/01"),
+            ("citation_doi", doi)] + [("citation_author", author) for author in authors]
+    content = "\n".join([
+        f'<a class="journal-title" href="/journals/stub">{escape(message["container-title"][0])}</a>',
+        f'<h1 class="article-title">{escape(message["title"][0])}</h1>',
+        '<div class="NLM_contrib-group">',
+        *(f'<a class="author" href="#">{escape(author)}</a>' for author in authors),
+        "</div>",
+        f'<div class="abstractSection abstractInFull"><p>Abstract of {escape(doi)}.</p></div>',
+        '<div class="keywords-section">',
+        *(f'<a class="keyword" href="#">{escape(subject)}</a>' for subject in message["subject"]),
+        "</div>",
+        '<img src="/static/cover.jpg" alt="cover">',
+    ])
+    head = [
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">",
+        '<link rel="stylesheet" href="/static/site.css">',
+        "<style>@font-face { font-family: 'StubFont'; src: url('/static/stubfont.woff2'); }</style>",
+        '<script src="/static/analytics.js"></script>',
+    ]
+    if dynamic:
+        script = f"document.getElementById('app').innerHTML = {json.dumps(content)};"
+        return "\n".join(head + ["</head><body>", '<div id="app"></div>', f"<script>{script}</script>",
+                                 "</body></html>"])
+    return "\n".join(head + [f'<meta name="{name}" content="{escape(value)}">' for name, value in meta] +
+                     ["</head><body>", content, "</body></html>"])
+
+
+class ArticlePageHandler(StubHandler):
+    """
+    模拟Taylor & Francis文章页面：/doi/full|abs/{DOI} 返回静态HTML，missing中的DOI返回由JavaScript渲染内容的页面；
+    /static/ 下为页面引用的图片、字体、样式表和统计脚本
+    """
+
+    def send_body(self, content_type, body, encoding=None):
+        if encoding == "gzip":
+            body = gzip.compress(body)
+        self.server.count_bytes(len(body))
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_route(self, url):
+        if url.path.startswith("/static/") and url.path[len("/static/"):] in PAGE_RESOURCES:
+            self.send_body(*PAGE_RESOURCES[url.path[len("/static/"):]])
+            return
+        parts = url.path.split("/", 3)
+        if len(parts) < 4 or parts[1] != "doi" or parts[2] not in ("full", "abs"):
+            self.send_json(404, {"status": "error"})
+            return
+        doi = unquote(parts[3])
+        self.send_body("text/html; charset=utf-8", make_article_html(doi, dynamic=doi in self.server.missing).encode("utf-8"))
+
+
+# 生成指定大小的PDF内容（有效的文件头和%%EOF结尾，中间为填充内容）
+def make_pdf_bytes(size=50000, seed=""):
+    header = f"%PDF-1.7\n% stub {seed}\n".encode("utf-8")
+    trailer = b"\ntrailer\n<< /Root 1 0 R >>\n%%EOF\n"
+    return header + b"0" * max(0, size - len(header) - len(trailer)) + trailer
+
+
+# 模拟浏览器下载：分块写入 路径.crdownload，写完后改名为最终文件名，返回改名的时间
+def simulate_download(path, data, duration=0.5, chunks=10):
+    temp_path = path + ".crdownload"
+    chunk_size = max(1, len(data) // chunks + 1)
+    with open(temp_path, "wb") as f:
+        for start in range(0, len(data), chunk_size):
+            f.write(data[start:start + chunk_size])
+            f.flush()
+            time.sleep(duration / chunks)
+    os.replace(temp_path, path)
+    return time.time()
+
+
+EBSCO_MOCK_RESULTS = 45  # 模拟检索结果的文章数
+EBSCO_MOCK_PAGE_SIZE = 10  # 每页结果数
+EBSCO_MOCK_PDF_SIZE = 80000  # 每个PDF的大小（字节）
+EBSCO_MOCK_COOKIE = "ebsco_session=stub-session"
+
+
+class EbscoMockHandler(ArticlePageHandler):
+    """
+    模拟EBSCO检索结果：/search?page=N 返回一页结果（标题链接 id 以 -bth 结尾、PDF链接、下一页链接），
+    访问检索页时下发会话cookie；/pdf/{id}.pdf 需要该cookie，missing中的文章id返回404，
+    客户端接受gzip时PDF按gzip压缩传输（Content-Length为压缩后的长度）
+    """
+
+    def handle_route(self, url):
+        if url.path == "/search":
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+            first = (page - 1) * EBSCO_MOCK_PAGE_SIZE
+            items = []
+            for number in range(first, min(first + EBSCO_MOCK_PAGE_SIZE, EBSCO_MOCK_RESULTS)):
+                article_id = f"mock{number:04d}"
+                items.append(f'<li class="result-item"><a id="{article_id}-bth" href="/details/{article_id}">'
+                             f'Mock Accounting Article {number}</a> '
+                             f'<a class="pdf-link" href="/pdf/{article_id}.pdf">PDF Full Text</a></li>')
+            next_link = f'<a rel="next" href="/search?page={page + 1}">Next</a>' \
+                if first + EBSCO_MOCK_PAGE_SIZE < EBSCO_MOCK_RESULTS else ""
+            body = ("<!DOCTYPE html><html><body><ul class=\"result-list\">" + "".join(items) + "</ul>" +
+                    next_link + "</body></html>").encode("utf-8")
+            self.server.count_bytes(len(body))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Set-Cookie", EBSCO_MOCK_COOKIE + "; Path=/")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if url.path.startswith("/pdf/") and url.path.endswith(".pdf"):
+            article_id = url.path[len("/pdf/"):-len(".pdf")]
+            if EBSCO_MOCK_COOKIE not in self.headers.get("Cookie", ""):
+                self.send_json(403, {"status": "error", "message": "login required"})
+                return
+            if article_id in self.server.missing:
+                self.send_json(404, {"status": "error"})
+                return
+            encoding = "gzip" if "gzip" in self.headers.get("Accept-Encoding", "") else None
+            self.send_body("application/pdf", make_pdf_bytes(EBSCO_MOCK_PDF_SIZE, article_id), encoding)
+            return
+        self.send_json(404, {"status": "error"})
+
+
+class StubServer:
+    """
+    在后台线程中运行的本地桩服务器
+
+    Args:
+        handler: 请求处理类（默认模拟Crossref API）
+        port: 端口，0表示自动分配
+        latency: 每个请求的模拟延迟（秒）
+        error_every: 每隔多少个请求返回一次429/503，0表示不注入错误
+        missing: 返回404的DOI集合（文章页面桩中为需要JavaScript渲染的DOI）
+    """
+
+    def __init__(self, handler=StubHandler, port=0, latency=0.0, error_every=0, missing=()):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.error_every = error_every
+        self.httpd.missing = set(missing)
+        self.httpd.request_paths = []
+        self.httpd.bytes_sent = 0
+        lock = threading.Lock()
+
+        def count_request(path):
+            with lock:
+                self.httpd.request_paths.append(path)
+                return len(self.httpd.request_paths)
+
+        def count_bytes(size):
+            with lock:
+                self.httpd.bytes_sent += size
+
+        self.httpd.count_request = count_request
+        self.httpd.count_bytes = count_bytes
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        return len(self.httpd.request_paths)
+
+    @property
+    def bytes_sent(self):
+        return self.httpd.bytes_sent
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+STUB_HANDLERS = {
+    "crossref": StubHandler,
+    "tandf": ArticlePageHandler,
+    "ebsco": EbscoMockHandler,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="爬虫本地桩服务器")
+    parser.add_argument("kind", choices=list(STUB_HANDLERS), help="模拟的站点")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的模拟延迟（秒）")
+    parser.add_argument("--error-every", type=int, default=0, help="每隔多少个请求返回一次429/503")
+    args = parser.parse_args()
+
+    server = StubServer(STUB_HANDLERS[args.kind], args.port, args.latency, args.error_every)
+    print(f"[+] {args.kind} 桩服务器运行于 {server.base_url}（Ctrl+C 退出）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"[+] 共处理 {server.request_count} 个请求，发送 {server.bytes_sent / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
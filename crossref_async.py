@@ -0,0 +1,257 @@
+# 并发的Crossref元数据抓取（asyncio + aiohttp）
+# 原方案逐个DOI同步请求，每个DOI之后还要 random_wait(2, 4)；这里所有请求共享一个连接池，
+# 用信号量限制并发数、按主机的令牌桶限制请求速率（礼貌访问），遇到429/5xx时按带抖动的指数退避重试。
+# 批量模式下多个DOI合并为一次 /works?filter=doi:A,doi:B&select=... 查询，只返回需要映射的字段
+# 运行：python crossref_async.py [--api-url URL模板] [--concurrency 8] [--rate 5] [--batch 20] DOI ...
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from urllib.parse import quote, urlsplit
+
+import aiohttp
+
+from article_common import CROSSREF_API_URL, CROSSREF_SELECT_FIELDS, USER_AGENT, parse_crossref_message
+from doi_cache import DoiMetadataCache
+
+# 需要重试的状态码：限流和服务端错误
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    令牌桶：平均每秒 rate 个请求，最多允许 capacity 个请求的突发
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FetchStats:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.not_found = 0
+        self.bytes_received = 0
+        self.start_time = time.time()
+
+    def report(self, label="Crossref"):
+        duration = time.time() - self.start_time
+        rate = self.requests / duration if duration > 0 else 0
+        print(f"[+] {label}: {self.requests} 个请求（重试 {self.retries}，失败 {self.failures}，"
+              f"未找到 {self.not_found}），接收 {self.bytes_received / 1024:.1f} KB，"
+              f"耗时 {duration:.2f} 秒，{rate:.1f} 请求/秒")
+
+
+class AsyncCrossrefFetcher:
+    """
+    并发抓取Crossref元数据
+
+    Args:
+        api_url: 单个DOI的API地址模板（含 {doi}），可指向本地桩服务器
+        concurrency: 同时进行的请求数（同时也是连接池大小）
+        rate_per_host: 每个主机每秒的请求数上限
+        max_retries: 429/5xx/网络错误的最大重试次数
+        backoff_base / backoff_max: 指数退避的基数与上限（秒），实际等待时间在 [0, 上限] 内随机
+        timeout: 单个请求的超时（秒）
+        mailto: 联系邮箱，Crossref会把带邮箱的请求放入"礼貌"资源池
+        cache: DoiMetadataCache，为None时不使用缓存
+        batch_size: 每次批量查询的DOI数，0表示逐个DOI请求
+    """
+
+    def __init__(self, api_url=CROSSREF_API_URL, concurrency=8, rate_per_host=5.0, max_retries=4,
+                 backoff_base=0.5, backoff_max=30.0, timeout=10, mailto=None, cache=None, batch_size=0):
+        self.api_url = api_url
+        # 批量查询地址：单个DOI地址模板去掉 /{doi}
+        self.works_url = api_url.split("/{doi}")[0]
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.rate_per_host = rate_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.user_agent = f"{USER_AGENT} (mailto:{mailto})" if mailto else USER_AGENT
+        self.cache = cache
+        self.stats = FetchStats()
+        self.session = None
+        self._semaphore = None
+        self._buckets = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                             headers={"User-Agent": self.user_agent})
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate_per_host)
+        return self._buckets[host]
+
+    # 带抖动的指数退避；服务器给出 Retry-After 时至少等待该时长
+    def _backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return delay
+
+    # 请求JSON，返回 (状态码, JSON, 响应头)；重试用尽或出现其他错误时JSON为None
+    async def get_json(self, url, params=None, headers=None):
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._bucket(url).acquire()
+                self.stats.requests += 1
+                retry_after = None
+                try:
+                    async with self.session.get(url, params=params, headers=headers) as response:
+                        if response.status not in RETRY_STATUS:
+                            if response.status != 200:
+                                return response.status, None, response.headers
+                            body = await response.read()
+                            self.stats.bytes_received += len(body)
+                            return response.status, json.loads(body), response.headers
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status = None
+                    print(f"[-] 请求 {url} 出错: {str(e)[:80]}")
+                if attempt < self.max_retries:
+                    self.stats.retries += 1
+                    await asyncio.sleep(self._backoff(attempt, retry_after))
+            self.stats.failures += 1
+            return status, None, {}
+
+    # 获取单个DOI的文章信息，失败时返回None
+    # 缓存有效期内不发请求；缓存过期时带 ETag/Last-Modified 做条件请求
+    async def fetch_doi(self, doi):
+        entry = self.cache.get(doi) if self.cache else None
+        if entry and entry.fresh:
+            return entry.article_data
+
+        url = self.api_url.format(doi=quote(doi, safe="/"))
+        status, data, headers = await self.get_json(url, headers=entry.validators() if entry else None)
+        if status == 304 and entry:
+            self.cache.touch(doi)
+            return entry.article_data
+        if status == 404:
+            self.stats.not_found += 1
+            if self.cache:
+                self.cache.put(doi, None, None, status=404)
+        if not data or "message" not in data:
+            # 重新验证失败（网络错误、重试用尽）时退回使用过期的缓存
+            return entry.article_data if entry and status != 404 else None
+        article_data = parse_crossref_message(data["message"], doi)
+        if self.cache:
+            self.cache.put(doi, data, article_data, headers.get("ETag"), headers.get("Last-Modified"))
+        return article_data
+
+    # 批量查询一组DOI，返回 {DOI: 文章信息或None}；整批请求失败时退回逐个请求
+    async def fetch_batch(self, dois):
+        params = {
+            "filter": ",".join(f"doi:{doi}" for doi in dois),
+            "select": ",".join(CROSSREF_SELECT_FIELDS),
+            "rows": str(len(dois)),
+        }
+        status, data, _ = await self.get_json(self.works_url, params=params)
+        if not data or "message" not in data:
+            print(f"[-] 批量查询失败（状态码 {status}），改为逐个请求 {len(dois)} 个DOI")
+            results = await asyncio.gather(*(self.fetch_doi(doi) for doi in dois))
+            return dict(zip(dois, results))
+
+        # Crossref返回的DOI为小写，按小写对应回请求的DOI
+        items = {item.get("DOI", "").lower(): item for item in data["message"].get("items", [])}
+        results = {}
+        for doi in dois:
+            item = items.get(doi.lower())
+            if item is None:
+                self.stats.not_found += 1
+                if self.cache:
+                    self.cache.put(doi, None, None, status=404)
+                results[doi] = None
+                continue
+            article_data = parse_crossref_message(item, doi)
+            if self.cache:
+                self.cache.put(doi, {"status": "ok", "message": item}, article_data)
+            results[doi] = article_data
+        return results
+
+    # 并发获取一批DOI，返回 {DOI: 文章信息或None}
+    # 批量模式下缓存有效期内的DOI直接使用缓存，其余DOI（未缓存或已过期）按 batch_size 分组批量查询
+    async def fetch_all(self, dois):
+        dois = list(dict.fromkeys(dois))
+        if not self.batch_size:
+            results = await asyncio.gather(*(self.fetch_doi(doi) for doi in dois))
+            return dict(zip(dois, results))
+
+        results, pending = {}, []
+        for doi in dois:
+            entry = self.cache.get(doi) if self.cache else None
+            if entry and entry.fresh:
+                results[doi] = entry.article_data
+            else:
+                pending.append(doi)
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        for batch_results in await asyncio.gather(*(self.fetch_batch(batch) for batch in batches)):
+            results.update(batch_results)
+        return {doi: results.get(doi) for doi in dois}
+
+
+# 同步调用入口：在新的事件循环中抓取一批DOI（options中可传入cache）
+def fetch_articles(dois, report=True, **options):
+    async def run():
+        async with AsyncCrossrefFetcher(**options) as fetcher:
+            results = await fetcher.fetch_all(dois)
+        if report:
+            fetcher.stats.report()
+            if fetcher.cache:
+                fetcher.cache.report()
+        return results
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发抓取Crossref元数据")
+    parser.add_argument("dois", nargs="+")
+    parser.add_argument("--api-url", default=CROSSREF_API_URL, help="API地址模板（含 {doi}）")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=5.0, help="每个主机每秒的请求数上限")
+    parser.add_argument("--mailto", help="联系邮箱（Crossref礼貌资源池）")
+    parser.add_argument("--cache", help="DOI缓存数据库路径（不指定时不使用缓存）")
+    parser.add_argument("--batch", type=int, default=0, help="每次批量查询的DOI数，0表示逐个请求")
+    args = parser.parse_args()
+
+    cache = DoiMetadataCache(args.cache) if args.cache else None
+    results = fetch_articles(args.dois, api_url=args.api_url, concurrency=args.concurrency,
+                             rate_per_host=args.rate, mailto=args.mailto, cache=cache, batch_size=args.batch)
+    for doi, article_data in results.items():
+        print(f"{doi}: {article_data['标题'] if article_data else '未获取到'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
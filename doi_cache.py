@@ -0,0 +1,109 @@
+# DOI元数据的持久化缓存（SQLite，以DOI为键）
+# 已发表文章的元数据几乎不会变化：缓存Crossref返回的原始JSON和映射后的article_data，
+# 在有效期(TTL)内直接使用缓存，不发请求；过期后带 ETag/Last-Modified 做条件请求，304时只刷新缓存时间。
+# 未找到(404)的DOI同样缓存，重复运行同一批URL时不会产生任何网络请求
+
+import json
+import time
+import sqlite3
+
+CROSSREF_CACHE_DB = "crossref_cache.db"
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600  # 30天
+
+
+# DOI不区分大小写，统一转为小写作为缓存键
+def cache_key(doi):
+    return doi.strip().lower()
+
+
+class CacheEntry:
+    def __init__(self, doi, raw_json, article_data, etag, last_modified, fetched_at, status, fresh):
+        self.doi = doi
+        self.raw = json.loads(raw_json) if raw_json else None
+        self.article_data = json.loads(article_data) if article_data else None
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.status = status
+        self.fresh = fresh
+
+    # 条件请求头
+    def validators(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DoiMetadataCache:
+    """
+    Crossref元数据缓存
+
+    Args:
+        path: SQLite数据库路径
+        ttl_seconds: 缓存有效期（秒），过期的条目需要重新验证
+    """
+
+    def __init__(self, path=CROSSREF_CACHE_DB, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS crossref_cache (
+          doi TEXT PRIMARY KEY,
+          raw_json TEXT,
+          article_data TEXT,
+          etag TEXT,
+          last_modified TEXT,
+          fetched_at REAL,
+          status INTEGER
+        )
+        """)
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.revalidated = 0
+        self.updated = 0
+
+    # 查询缓存，不存在时返回None；条目是否仍在有效期内见 entry.fresh
+    def get(self, doi):
+        row = self.conn.execute(
+            "SELECT raw_json, article_data, etag, last_modified, fetched_at, status FROM crossref_cache WHERE doi = ?",
+            (cache_key(doi),)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        raw_json, article_data, etag, last_modified, fetched_at, status = row
+        fresh = time.time() - fetched_at < self.ttl_seconds
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale += 1
+        return CacheEntry(doi, raw_json, article_data, etag, last_modified, fetched_at, status, fresh)
+
+    # 写入一次成功（200）或未找到（404）的结果
+    def put(self, doi, raw, article_data, etag=None, last_modified=None, status=200):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO crossref_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (cache_key(doi), json.dumps(raw, ensure_ascii=False) if raw is not None else None,
+             json.dumps(article_data, ensure_ascii=False) if article_data is not None else None,
+             etag, last_modified, time.time(), status))
+        self.conn.commit()
+        self.updated += 1
+
+    # 条件请求返回304：内容未变化，只刷新缓存时间
+    def touch(self, doi):
+        self.conn.execute("UPDATE crossref_cache SET fetched_at = ? WHERE doi = ?", (time.time(), cache_key(doi)))
+        self.conn.commit()
+        self.revalidated += 1
+
+    def report(self):
+        total = self.hits + self.misses + self.stale
+        hit_rate = self.hits / total * 100 if total else 0
+        print(f"[+] DOI缓存: 命中 {self.hits}，未命中 {self.misses}，过期 {self.stale}（验证未变化 {self.revalidated}），"
+              f"写入 {self.updated}，命中率 {hit_rate:.1f}%")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,239 @@
+# 下载完成检测：监听下载目录的文件系统事件（安装了watchdog时使用inotify/FSEvents/ReadDirectoryChangesW），
+# 文件一写完/改名为最终文件名就立即得到通知，不再每秒glob一次目录并等待一秒比较文件大小。
+# 同时跟踪任意多个并发下载，每个完成的文件都校验PDF文件头(%PDF-)、结尾标记(%%EOF)和长度（已知时）。
+# 未安装watchdog时退回到每0.1秒扫描一次目录
+# 运行：python download_tracker.py [--downloads 8] [--size 200000]（用桩下载器并发写入PDF，测量检测延迟）
+
+import os
+import sys
+import time
+import queue
+import shutil
+import argparse
+import tempfile
+import threading
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# 浏览器下载过程中使用的临时文件后缀（Chrome/Edge为.crdownload，Firefox为.part）
+TEMP_SUFFIXES = (".crdownload", ".part", ".tmp", ".download")
+PDF_HEADER = b"%PDF-"
+PDF_TRAILER = b"%%EOF"
+POLL_INTERVAL = 0.1  # 未安装watchdog时扫描目录的间隔（秒）
+
+
+class DownloadResult:
+    def __init__(self, path, size, valid, error=None, detected_at=None):
+        self.path = path
+        self.size = size
+        self.valid = valid
+        self.error = error
+        self.detected_at = detected_at or time.time()
+
+    def __repr__(self):
+        status = "有效" if self.valid else f"无效: {self.error}"
+        return f"<DownloadResult {os.path.basename(self.path)} {self.size} 字节 {status}>"
+
+
+# 检查PDF文件：返回 (是否有效, 原因)；expected_size为已知的文件长度（如Content-Length）
+def verify_pdf(path, expected_size=None):
+    try:
+        size = os.path.getsize(path)
+        if size < len(PDF_HEADER) + len(PDF_TRAILER):
+            return False, "文件过短"
+        if expected_size is not None and size != expected_size:
+            return False, f"长度 {size} 与预期 {expected_size} 不符"
+        with open(path, "rb") as f:
+            if f.read(len(PDF_HEADER)) != PDF_HEADER:
+                return False, "不是PDF文件头"
+            f.seek(max(0, size - 1024))
+            if PDF_TRAILER not in f.read():
+                return False, "缺少%%EOF结尾"
+        return True, None
+    except OSError as e:
+        return False, str(e)
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.tracker.check(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.tracker.check(event.src_path)
+
+    def on_closed(self, event):
+        self.tracker.check(event.src_path)
+
+    def on_moved(self, event):
+        # 浏览器下载完成时把 .crdownload 改名为最终文件名
+        if not event.is_directory:
+            self.tracker.check(event.dest_path)
+
+
+class DownloadTracker:
+    """
+    跟踪下载目录中新出现的文件，每个文件写完并通过PDF校验后放入完成队列
+
+    Args:
+        download_dir: 下载目录
+        suffixes: 需要跟踪的文件后缀
+        use_watchdog: 为False时强制使用目录扫描
+    """
+
+    def __init__(self, download_dir, suffixes=(".pdf",), use_watchdog=True):
+        self.download_dir = os.path.abspath(download_dir)
+        self.suffixes = suffixes
+        self.use_watchdog = use_watchdog and Observer is not None
+        self.expected_sizes = {}  # 文件名 -> 预期长度
+        self.pending = {}  # 路径 -> 最近一次校验失败的原因（可能仍在写入）
+        self.completed = {}  # 路径 -> DownloadResult
+        self.results = queue.Queue()
+        self._lock = threading.Lock()
+        self._existing = set()
+        self._observer = None
+        self._poller = None
+        self._stopped = threading.Event()
+
+    @property
+    def backend(self):
+        return "watchdog" if self.use_watchdog else "目录扫描"
+
+    def start(self):
+        os.makedirs(self.download_dir, exist_ok=True)
+        # 开始跟踪之前已存在的文件不算新下载
+        self._existing = {entry.path for entry in os.scandir(self.download_dir)}
+        if self.use_watchdog:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.download_dir, recursive=False)
+            self._observer.start()
+        else:
+            self._poller = threading.Thread(target=self._poll, daemon=True)
+            self._poller.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+        if self._poller:
+            self._poller.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # 登记已知长度的下载（如HTTP响应的Content-Length），校验时要求长度一致
+    def expect(self, filename, size):
+        self.expected_sizes[filename] = size
+
+    def _poll(self):
+        sizes = {}
+        while not self._stopped.is_set():
+            for entry in os.scandir(self.download_dir):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                key = (stat.st_size, stat.st_mtime_ns)
+                if sizes.get(entry.path) != key:
+                    sizes[entry.path] = key
+                    self.check(entry.path)
+            self._stopped.wait(POLL_INTERVAL)
+
+    # 检查一个文件是否已下载完成
+    def check(self, path):
+        path = os.path.abspath(path)
+        name = os.path.basename(path)
+        if path in self._existing or name.endswith(TEMP_SUFFIXES) or not name.lower().endswith(self.suffixes):
+            return
+        with self._lock:
+            if path in self.completed:
+                return
+            valid, error = verify_pdf(path, self.expected_sizes.get(name))
+            if not valid:
+                # 文件可能仍在写入，等下一个事件再检查
+                self.pending[path] = error
+                return
+            self.pending.pop(path, None)
+            result = DownloadResult(path, os.path.getsize(path), True)
+            self.completed[path] = result
+        print(f"[+] 下载完成: {name}（{result.size} 字节）")
+        self.results.put(result)
+
+    # 等待count个下载完成，返回完成的DownloadResult列表；超时时仍未通过校验的文件作为无效结果返回
+    def wait_for(self, count=1, timeout=30):
+        deadline = time.time() + timeout
+        results = []
+        while len(results) < count:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                results.append(self.results.get(timeout=remaining))
+            except queue.Empty:
+                break
+        if len(results) < count:
+            with self._lock:
+                for path, error in self.pending.items():
+                    size = os.path.getsize(path) if os.path.exists(path) else 0
+                    results.append(DownloadResult(path, size, False, error))
+            print(f"[-] 等待下载超时({timeout}秒)，完成 {sum(1 for r in results if r.valid)}/{count}")
+        return results
+
+
+def main():
+    from crawler_stubs import make_pdf_bytes, simulate_download
+
+    parser = argparse.ArgumentParser(description="用桩下载器测量下载完成检测")
+    parser.add_argument("--downloads", type=int, default=8, help="并发下载数")
+    parser.add_argument("--size", type=int, default=200000, help="每个PDF的大小（字节）")
+    parser.add_argument("--delay", type=float, default=0.5, help="每个下载的写入耗时（秒）")
+    parser.add_argument("--poll", action="store_true", help="不使用watchdog，改为扫描目录")
+    args = parser.parse_args()
+
+    download_dir = tempfile.mkdtemp(prefix="downloads_")
+    try:
+        with DownloadTracker(download_dir, use_watchdog=not args.poll) as tracker:
+            print(f"[+] 检测方式: {tracker.backend}")
+            finished_at = {}
+            threads = []
+            for i in range(args.downloads):
+                name = f"article_{i}.pdf"
+                data = make_pdf_bytes(args.size)
+                tracker.expect(name, len(data))
+                # 最后一个下载写入截断的文件，验证校验逻辑
+                if i == args.downloads - 1:
+                    data = data[:-100]
+                thread = threading.Thread(target=lambda n=name, d=data: finished_at.__setitem__(
+                    n, simulate_download(os.path.join(download_dir, n), d, args.delay)))
+                thread.start()
+                threads.append(thread)
+            results = tracker.wait_for(args.downloads, timeout=args.delay * 2 + 1)
+            for thread in threads:
+                thread.join()
+        valid = [result for result in results if result.valid]
+        delays = [result.detected_at - finished_at[os.path.basename(result.path)] for result in valid]
+        print(f"[+] 有效 {len(valid)}，无效 {len(results) - len(valid)}: "
+              f"{[result for result in results if not result.valid]}")
+        if delays:
+            print(f"[+] 写完到检测到的延迟: 平均 {sum(delays) / len(delays) * 1000:.1f} ms，"
+                  f"最长 {max(delays) * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,28 @@
-import time
-import random
-import json
 import os
-import glob
-from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.edge.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
+from rate_controller import AdaptiveRateController
+from download_tracker import DownloadTracker
+from ebsco_common import EBSCO_HOST, EBSCO_LIMITS, EBSCO_SEARCH_URL
 
-# 模拟人类行为的随机等待时间 - 优化等待时间范围
-def human_like_wait(min_time=0.5, max_time=1.5):
-    """模拟人类随机等待时间 - 优化为更短的等待时间"""
-    wait_time = random.uniform(min_time, max_time)
-    print(f"等待 {wait_time:.2f} 秒...")
-    time.sleep(wait_time)
+# 按主机的自适应速率控制（替代固定的随机等待）：页面操作平均不超过每秒2次，页面加载变慢或出错时自动放慢
+RATE_CONTROLLER = AdaptiveRateController({EBSCO_HOST: EBSCO_LIMITS})
+
+# 操作前的节流：只等待到速率控制器允许的时间
+def pace(host=EBSCO_HOST):
+    """按速率控制器的当前速率等待，距上次操作已足够久时不等待"""
+    delay = RATE_CONTROLLER.wait(host)
+    if delay > 0.05:
+        print(f"等待 {delay:.2f} 秒...")
+
+# 打开页面，并把页面加载耗时记录到速率控制器
+def open_page(driver, url):
+    with RATE_CONTROLLER.request(url):
+        driver.get(url)
 
 # 处理cookies弹窗
 def handle_cookies(driver):
@@ -37,10 +43,10 @@ def handle_cookies(driver):
             )
             print(f"找到cookies接受按钮，使用XPath: {xpath}")
             driver.execute_script("arguments[0].scrollIntoView(true);", cookies_button)
-            human_like_wait()
+            pace()
             cookies_button.click()
             print("已点击接受cookies")
-            human_like_wait()
+            pace()
             return True
         except (TimeoutException, NoSuchElementException, ElementClickInterceptedException):
             continue
@@ -66,7 +72,7 @@ def click_element(driver, element=None, by=By.XPATH, value=None, wait_time=5, fo
             return False
         
         driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});", element)
-        human_like_wait()
+        pace()
         
         # 如果强制使用JavaScript点击或直接点击失败，使用JavaScript点击
         if force_js_click:
@@ -90,86 +96,76 @@ def click_element(driver, element=None, by=By.XPATH, value=None, wait_time=5, fo
         return False
 
 # 检查下载是否完成
-def check_download_complete(download_dir, timeout=30):
-    """检查下载是否完成，返回下载的文件路径"""
-    print(f"检查下载是否完成，目录: {download_dir}")
-    start_time = time.time()
+def check_download_complete(tracker, timeout=30):
+    """等待下载跟踪器报告完成的PDF（文件系统事件，校验PDF文件头和结尾），返回下载的文件路径"""
+    print(f"检查下载是否完成，目录: {tracker.download_dir}（检测方式: {tracker.backend}）")
+    for result in tracker.wait_for(1, timeout):
+        if result.valid:
+            print(f"下载完成! 文件名: {os.path.basename(result.path)}")
+            return result.path
+        print(f"下载的文件无效: {os.path.basename(result.path)}（{result.error}）")
+    print(f"下载超时({timeout}秒)，未检测到完成的文件")
+    return None
+
+# 创建下载文件夹，返回绝对路径
+def prepare_download_dir(path="downloads"):
+    download_dir = os.path.abspath(os.path.join(os.getcwd(), path))
+    if not os.path.exists(download_dir):
+        os.makedirs(download_dir)
+        print(f"创建下载文件夹: {download_dir}")
+    print(f"PDF文件将下载到: {download_dir}")
+    return download_dir
+
+# 初始化Edge浏览器，PDF直接下载到download_dir
+def create_driver(download_dir):
+    # 创建Edge浏览器选项
+    options = Options()
     
-    # 记录初始文件列表
-    initial_files = set(glob.glob(os.path.join(download_dir, "*.*")))
+    # 优化Edge浏览器的下载配置
+    prefs = {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "plugins.always_open_pdf_externally": True,
+        "safebrowsing.enabled": False,  # 禁用安全浏览检查
+        "download_restrictions": 0,  # 允许所有下载
+        "profile.default_content_setting_values.automatic_downloads": 1,  # 允许自动下载
+        "profile.default_content_settings.popups": 0  # 禁止弹出窗口
+    }
     
-    while time.time() - start_time < timeout:
-        # 获取当前文件列表
-        current_files = set(glob.glob(os.path.join(download_dir, "*.*")))
-        
-        # 找出新文件（不包括.part等临时文件）
-        new_files = [f for f in current_files - initial_files if not f.endswith('.part')]
-        
-        if new_files:
-            # 等待文件大小稳定（确保下载完成）
-            file_size = os.path.getsize(new_files[0])
-            time.sleep(1)
-            if os.path.getsize(new_files[0]) == file_size:
-                print(f"下载完成! 文件名: {os.path.basename(new_files[0])}")
-                return new_files[0]
-        
-        time.sleep(1)
+    # 添加实验性选项
+    options.add_experimental_option("prefs", prefs)
+    # 禁用自动关闭下载弹窗
+    options.add_argument("--disable-popup-blocking")
     
-    print(f"下载超时({timeout}秒)，未检测到完成的文件")
-    return None
+    print("正在初始化Edge浏览器...")
+    driver = webdriver.Edge(options=options)
+    driver.set_window_size(1200, 800)
+    return driver
 
 # 下载EBSCO PDF文件的主函数
 def download_ebsco_pdf():
     """下载EBSCO搜索结果中第一篇文章的PDF文件"""
     driver = None
+    tracker = None
     try:
         print("开始执行EBSCO PDF下载爬虫...")
         
-        # 创建Edge浏览器选项
-        options = Options()
-        
         # 设置下载目录为绝对路径，确保正确下载
-        download_dir = os.path.abspath(os.path.join(os.getcwd(), "downloads"))
-        if not os.path.exists(download_dir):
-            os.makedirs(download_dir)
-            print(f"创建下载文件夹: {download_dir}")
-        print(f"PDF文件将下载到: {download_dir}")
-        
-        # 优化Edge浏览器的下载配置
-        prefs = {
-            "download.default_directory": download_dir,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "plugins.always_open_pdf_externally": True,
-            "safebrowsing.enabled": False,  # 禁用安全浏览检查
-            "download_restrictions": 0,  # 允许所有下载
-            "profile.default_content_setting_values.automatic_downloads": 1,  # 允许自动下载
-            "profile.default_content_settings.popups": 0  # 禁止弹出窗口
-        }
-        
-        # 添加实验性选项
-        options.add_experimental_option("prefs", prefs)
-        # 禁用自动关闭下载弹窗
-        options.add_argument("--disable-popup-blocking")
-        
-        print("正在初始化Edge浏览器...")
-        driver = webdriver.Edge(options=options)
-        driver.set_window_size(1200, 800)
+        download_dir = prepare_download_dir()
+        # 从这里开始跟踪下载目录中新出现的PDF
+        tracker = DownloadTracker(download_dir).start()
+        driver = create_driver(download_dir)
         
         # 访问目标网页
-        url = "https://research.ebsco.com/c/vlgzj5/search/results?q=JN%20%22Accounting%20Review%22%20AND%20DT%2020250901%20NOT%20PM%20AOP&autocorrect=y&db=aph%2Cbth&expanders=concept&facetFilter=databases%3AYnRo&limiters=FT%3AY&searchMode=boolean&searchSegment=all-results"
+        url = EBSCO_SEARCH_URL
         print(f"正在访问网页: `{url}` ")
-        driver.get(url)
-        
-        # 等待页面加载
-        human_like_wait(1, 2)
+        open_page(driver, url)
         
         # 处理cookies弹窗
         handle_cookies(driver)
         
         print("等待搜索结果加载...")
-        human_like_wait(1, 2)
-        
         print("点击第一篇文章的标题...")
         first_article_title = WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.XPATH, "//a[contains(@id, '-bth')]"))
@@ -180,12 +176,10 @@ def download_ebsco_pdf():
             article_url = first_article_title.get_attribute('href')
             if article_url:
                 print(f"直接访问文章链接: {article_url}")
-                driver.get(article_url)
+                open_page(driver, article_url)
             else:
                 raise Exception("无法获取文章链接")
         
-        human_like_wait(1, 2)  # 等待文章详情页加载
-        
         print("点击第一个下载按钮...")
         download_button1_xpath = "//*[@id='details-page']/div[1]/div/section/div[3]/div/div[2]/div/button"
         if not click_element(driver, None, By.XPATH, download_button1_xpath):
@@ -204,9 +198,6 @@ def download_ebsco_pdf():
             if not found:
                 raise Exception("未找到下载按钮")
         
-        print("等待下载弹窗出现...")
-        human_like_wait(1, 2)  # 等待弹窗加载
-        
         print("点击第二个确认下载按钮...")
         # 使用用户提供的XPath，并确保使用JavaScript点击
         download_button2_xpath = "/html/body/div[17]/div/div/div[3]/button[2]"
@@ -246,7 +237,7 @@ def download_ebsco_pdf():
         
         print("开始下载PDF文件...")
         # 使用下载检查函数确保文件正确下载完成
-        downloaded_file = check_download_complete(download_dir)
+        downloaded_file = check_download_complete(tracker)
         
         if downloaded_file:
             print(f"PDF文件下载成功! 已保存至: {downloaded_file}")
@@ -261,6 +252,9 @@ def download_ebsco_pdf():
         if driver:
             print("正在关闭浏览器...")
             driver.quit()
+        if tracker:
+            tracker.stop()
+        RATE_CONTROLLER.report()
         print("爬虫执行完毕")
 
 # 主程序入口
@@ -0,0 +1,259 @@
+# EBSCO批量PDF下载：浏览器只负责打开检索结果并翻页，每页用一次DOM查询（execute_script）收集全部文章的
+# 标题和PDF链接；收集完成后关闭浏览器，用浏览器会话的cookie通过HTTP直接下载PDF（有界线程池并发），
+# 不再逐篇点击"下载"按钮、等待弹窗和固定的随机等待。
+# 下载进度、吞吐量（PDF/分钟）和失败原因记录在下载目录的 _manifest.json 中，重新运行时跳过已下载的文件
+# 运行：python ebsco_batch.py [--url 检索结果URL] [--workers 4] [--max-pages 0] [--out downloads]
+# 本地测试：python crawler_stubs.py ebsco，然后 python ebsco_batch.py --url http://127.0.0.1:8999/search
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from download_tracker import verify_pdf
+from ebsco_common import EBSCO_LIMITS, EBSCO_SEARCH_URL
+from rate_controller import AdaptiveRateController
+
+MANIFEST_NAME = "_manifest.json"
+DOWNLOAD_WORKERS = 4  # 同时下载的PDF数
+# 检索结果页的选择器：标题链接（与原来的 //a[contains(@id, '-bth')] 一致）、结果条目、PDF链接、下一页
+TITLE_SELECTOR = "a[id*='-bth']"
+RESULT_ITEM_SELECTOR = "li, article, [class*='result-item']"
+PDF_LINK_SELECTOR = "a.pdf-link, a[href*='/pdf'], a[data-auto*='pdf']"
+NEXT_PAGE_SELECTOR = "a[rel='next'], a[aria-label*='Next'], button[aria-label*='Next']"
+
+# 一次DOM查询收集当前页全部文章的标题和PDF链接，以及下一页链接
+COLLECT_RESULTS_JS = """
+const [titleSelector, itemSelector, pdfSelector, nextSelector] = arguments;
+const articles = [];
+document.querySelectorAll(titleSelector).forEach((link) => {
+    const item = link.closest(itemSelector) || link.parentElement;
+    const pdf = item ? item.querySelector(pdfSelector) : null;
+    articles.push({
+        id: link.id.replace(/-bth$/, ''),
+        title: link.textContent.trim(),
+        detail_url: link.href || null,
+        pdf_url: pdf ? pdf.href : null
+    });
+});
+const next = document.querySelector(nextSelector);
+return {articles: articles, next_url: next && next.href ? next.href : null, has_next: !!next};
+"""
+
+
+# 翻页收集检索结果中全部文章，max_pages为0时不限页数
+def collect_articles(driver, start_url, max_pages=0):
+    # selenium只在收集链接时需要，下载部分（download_all）不依赖它
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
+    from ebsco import handle_cookies, open_page
+
+    articles = {}
+    open_page(driver, start_url)
+    handle_cookies(driver)
+    page_number = 0
+    while True:
+        try:
+            first_title = WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, TITLE_SELECTOR))
+            )
+        except TimeoutException:
+            print("[-] 当前页没有检索结果")
+            break
+        page_number += 1
+        data = driver.execute_script(COLLECT_RESULTS_JS, TITLE_SELECTOR, RESULT_ITEM_SELECTOR,
+                                     PDF_LINK_SELECTOR, NEXT_PAGE_SELECTOR)
+        for article in data["articles"]:
+            articles.setdefault(article["id"], article)
+        print(f"[+] 第 {page_number} 页: {len(data['articles'])} 篇文章，累计 {len(articles)} 篇")
+        if max_pages and page_number >= max_pages:
+            break
+        if data["next_url"]:
+            open_page(driver, data["next_url"])
+        elif data["has_next"]:
+            # 下一页是按钮：点击后等待旧的结果被替换
+            driver.execute_script("document.querySelector(arguments[0]).click();", NEXT_PAGE_SELECTOR)
+            try:
+                WebDriverWait(driver, 10).until(EC.staleness_of(first_title))
+            except TimeoutException:
+                print("[-] 点击下一页后结果没有变化，停止翻页")
+                break
+        else:
+            break
+    return list(articles.values())
+
+
+# 用浏览器会话的cookie和User-Agent创建requests会话
+def session_from_driver(driver):
+    session = requests.Session()
+    session.headers["User-Agent"] = driver.execute_script("return navigator.userAgent;")
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+    return session
+
+
+# 文章id转为安全的文件名
+def pdf_filename(article):
+    return re.sub(r"[^\w.-]+", "_", article["id"]) + ".pdf"
+
+
+class DownloadManifest:
+    """
+    下载清单：每篇文章的状态（downloaded/skipped/failed）、文件、大小、耗时和失败原因，以及总体进度和吞吐量；
+    每完成一篇就原子地重写一次
+
+    Args:
+        path: 清单文件路径，已存在时载入之前的记录
+        total: 本次要处理的文章数
+    """
+
+    def __init__(self, path, total):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f).get("articles", {})
+        self.total = total
+        self.done = 0
+        self.downloaded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.start_time = time.time()
+        self.started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._lock = threading.Lock()
+
+    def record(self, article_id, entry):
+        with self._lock:
+            self.entries[article_id] = entry
+            self.done += 1
+            if entry["status"] == "downloaded":
+                self.downloaded += 1
+            elif entry["status"] == "skipped":
+                self.skipped += 1
+            else:
+                self.failed += 1
+            self._write()
+            print(f"[{'+' if entry['status'] != 'failed' else '-'}] 进度 {self.done}/{self.total} "
+                  f"{article_id}: {entry['status']}{'（' + entry['error'] + '）' if entry.get('error') else ''}，"
+                  f"{self.pdfs_per_minute():.1f} PDF/分钟")
+
+    def pdfs_per_minute(self):
+        elapsed = time.time() - self.start_time
+        return self.downloaded / elapsed * 60 if elapsed > 0 else 0
+
+    def summary(self):
+        return {
+            "started_at": self.started_at,
+            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "elapsed_seconds": round(time.time() - self.start_time, 2),
+            "total": self.total,
+            "done": self.done,
+            "downloaded": self.downloaded,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "pdfs_per_minute": round(self.pdfs_per_minute(), 2),
+        }
+
+    def _write(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": self.summary(), "articles": self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+
+# 下载一篇文章的PDF，返回清单条目；已存在且校验通过的文件直接跳过
+def download_pdf(session, article, download_dir, controller, timeout=60):
+    path = os.path.join(download_dir, pdf_filename(article))
+    entry = {"title": article.get("title"), "pdf_url": article.get("pdf_url"), "file": os.path.basename(path)}
+    if os.path.exists(path) and verify_pdf(path)[0]:
+        return dict(entry, status="skipped", size=os.path.getsize(path))
+    if not article.get("pdf_url"):
+        return dict(entry, status="failed", error="没有PDF链接")
+
+    start_time = time.time()
+    temp_path = path + ".part"
+    try:
+        # stream=True时get收到响应头即返回：速率控制只记录到响应头的延迟，大文件的传输时间不算作服务器变慢
+        with controller.request(article["pdf_url"]) as call:
+            response = session.get(article["pdf_url"], stream=True, timeout=timeout)
+            call["status"] = response.status_code
+        with response:
+            response.raise_for_status()
+            # iter_content会解开gzip/deflate，压缩传输时Content-Length是压缩后的长度，不能用来校验文件
+            expected_size = response.headers.get("Content-Length")
+            if response.headers.get("Content-Encoding", "identity").lower() != "identity":
+                expected_size = None
+            with open(temp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    f.write(chunk)
+        valid, error = verify_pdf(temp_path, int(expected_size) if expected_size else None)
+        if not valid:
+            os.remove(temp_path)
+            return dict(entry, status="failed", error=error)
+        os.replace(temp_path, path)
+        return dict(entry, status="downloaded", size=os.path.getsize(path),
+                    seconds=round(time.time() - start_time, 3))
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return dict(entry, status="failed", error=str(e)[:200])
+
+
+# 默认的下载速率控制：沿用EBSCO的礼貌速率上限，只把并发放宽到下载线程数（HTTP下载不占用浏览器）
+def default_controller(workers=DOWNLOAD_WORKERS):
+    return AdaptiveRateController(default_limits=EBSCO_LIMITS.replace(max_concurrency=workers))
+
+
+# 用有界线程池下载全部文章的PDF，返回清单
+def download_all(articles, session, download_dir, workers=DOWNLOAD_WORKERS, controller=None):
+    controller = controller or default_controller(workers)
+    manifest = DownloadManifest(os.path.join(download_dir, MANIFEST_NAME), len(articles))
+
+    def task(article):
+        manifest.record(article["id"], download_pdf(session, article, download_dir, controller))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(task, article) for article in articles]:
+            future.result()
+    controller.report()
+    return manifest
+
+
+def main():
+    from ebsco import RATE_CONTROLLER, create_driver, prepare_download_dir
+
+    parser = argparse.ArgumentParser(description="EBSCO批量PDF下载")
+    parser.add_argument("--url", default=EBSCO_SEARCH_URL, help="检索结果页URL")
+    parser.add_argument("--out", default="downloads", help="下载目录")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="同时下载的PDF数")
+    parser.add_argument("--max-pages", type=int, default=0, help="最多翻多少页，0表示全部")
+    args = parser.parse_args()
+
+    download_dir = prepare_download_dir(args.out)
+    driver = create_driver(download_dir)
+    try:
+        articles = collect_articles(driver, args.url, args.max_pages)
+        session = session_from_driver(driver)
+    finally:
+        # 链接和cookie收集完就关闭浏览器，下载只用HTTP
+        driver.quit()
+    RATE_CONTROLLER.report()
+
+    print(f"[+] 共收集 {len(articles)} 篇文章，开始下载PDF（{args.workers} 个线程）")
+    manifest = download_all(articles, session, download_dir, args.workers)
+    summary = manifest.summary()
+    print(f"[+] 下载 {summary['downloaded']}，跳过 {summary['skipped']}，失败 {summary['failed']}，"
+          f"{summary['pdfs_per_minute']} PDF/分钟，清单: {manifest.path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+# EBSCO爬虫的公共部分：主机、检索URL和礼貌访问配置
+# 本模块不依赖selenium，HTTP批量下载（ebsco_batch.download_all）和测试可以直接复用这里的配置
+
+from rate_controller import HostLimits
+
+EBSCO_HOST = "research.ebsco.com"
+EBSCO_SEARCH_URL = "https://research.ebsco.com/c/vlgzj5/search/results?q=JN%20%22Accounting%20Review%22%20AND%20DT%2020250901%20NOT%20PM%20AOP&autocorrect=y&db=aph%2Cbth&expanders=concept&facetFilter=databases%3AYnRo&limiters=FT%3AY&searchMode=boolean&searchSegment=all-results"
+# 页面操作和PDF下载平均不超过每秒2次（浏览器只有一个，页面操作的并发为1）
+EBSCO_LIMITS = HostLimits(start_rate=1.0, max_rate=2.0, max_concurrency=1)
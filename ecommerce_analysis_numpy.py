@@ -0,0 +1,381 @@
+# 电商用户行为分析 - NumPy向量化后端（单机，无需启动Spark）
+# 将 user_behavior_10m.csv 的五列加载为NumPy数组：行为、品类为分类编码，用户ID、商品ID因子化为int32，
+# 所有任务（转化率、品类热度、时段、Top3购买用户、漏斗、复购率、次日留存）均用 bincount/sort/unique 向量化计算，
+# 结果按Spark脚本相同的列和格式写入 output/numpy/ 下的同名目录
+# 运行：python ecommerce_analysis_numpy.py [--compare] [--benchmark]
+#   --compare    与Spark脚本的输出（output/sql_*）逐行比对
+#   --benchmark  以子进程运行Spark脚本并对比总耗时
+
+import os
+import csv
+import sys
+import glob
+import time
+import subprocess
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+
+from ecommerce_common import USER_BEHAVIOR_COLUMNS, default_user_behavior_source
+from funnel_engine import DEFAULT_FUNNEL_STAGES
+
+OUTPUT_ROOT = "output/numpy"
+SPARK_OUTPUT_ROOT = "output"
+
+
+class BehaviorData:
+    """
+    用户行为数据的列式数组表示
+
+    user / item: int32因子化编码（缺失值为-1），user_ids / item_ids 为编码到原始ID的映射
+    action / category: 分类编码（缺失值为-1），actions / categories 为编码到名称的映射
+    timestamp: int64秒级时间戳，has_timestamp 标记非空行（时间戳为空的行不参与按小时/日期的统计）
+    """
+
+    def __init__(self, frame, utc_offset=None):
+        self.num_rows = len(frame)
+        self.user, self.user_ids = pd.factorize(frame["user_id"])
+        self.item, self.item_ids = pd.factorize(frame["item_id"])
+        self.user = self.user.astype(np.int32)
+        self.item = self.item.astype(np.int32)
+
+        action = frame["action"].astype("category")
+        category = frame["category"].astype("category")
+        self.action = action.cat.codes.to_numpy()
+        self.actions = list(action.cat.categories)
+        self.category = category.cat.codes.to_numpy()
+        self.categories = list(category.cat.categories)
+
+        timestamp = frame["timestamp"].to_numpy(dtype=np.float64)
+        self.has_timestamp = ~np.isnan(timestamp)
+        self.timestamp = np.where(self.has_timestamp, timestamp, 0).astype(np.int64)
+
+        # Spark的FROM_UNIXTIME按会话时区（默认为本机时区）转换，这里取数据中位时间的本机时区偏移
+        if utc_offset is None:
+            reference = int(np.median(self.timestamp[self.has_timestamp])) if self.has_timestamp.any() else 0
+            utc_offset = time.localtime(reference).tm_gmtoff
+        local_seconds = self.timestamp + utc_offset
+        self.day = local_seconds // 86400
+        self.hour = (local_seconds % 86400) // 3600
+
+    # 行为名称对应的编码，不存在时返回-2（不会与任何行匹配）
+    def action_code(self, name):
+        return self.actions.index(name) if name in self.actions else -2
+
+
+# 带过滤条件读取CSV时每次读入的行数
+CSV_CHUNK_ROWS = 1000000
+
+
+# 与Parquet分区裁剪相同的过滤条件（ecommerce_parquet_store.arrow_filter），日期按本机时区计算，与 event_date 一致
+def _csv_chunk_mask(frame, start_date=None, end_date=None, actions=None, user_ids=None, num_buckets=None):
+    mask = np.ones(len(frame), dtype=bool)
+    timestamp = frame["timestamp"].to_numpy(dtype=np.float64)
+    if start_date is not None:
+        mask &= timestamp >= time.mktime(start_date.timetuple())
+    if end_date is not None:
+        mask &= timestamp < time.mktime((end_date + timedelta(days=1)).timetuple())
+    if actions is not None:
+        mask &= frame["action"].isin(list(actions)).to_numpy()
+    if user_ids is not None:
+        mask &= frame["user_id"].isin(list(user_ids)).to_numpy()
+    return mask
+
+
+# 读取数据为BehaviorData：目录按Parquet分区存储读取（可传入过滤条件做分区裁剪），文件按CSV读取（优先使用pyarrow解析引擎）；
+# CSV带过滤条件时分块读取、边读边过滤，内存中只保留符合条件的行
+def load_behavior_data(path=None, **filters):
+    path = path or default_user_behavior_source()
+    if os.path.isdir(path):
+        from ecommerce_parquet_store import arrow_read_behavior
+        return BehaviorData(arrow_read_behavior(path, **filters))
+    options = dict(header=None, names=USER_BEHAVIOR_COLUMNS,
+                   dtype={"user_id": str, "item_id": str, "action": "category",
+                          "timestamp": np.float64, "category": "category"})
+    if any(value is not None for value in filters.values()):
+        chunks = [chunk[_csv_chunk_mask(chunk, **filters)]
+                  for chunk in pd.read_csv(path, chunksize=CSV_CHUNK_ROWS, **options)]
+        frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=USER_BEHAVIOR_COLUMNS)
+        return BehaviorData(frame)
+    try:
+        frame = pd.read_csv(path, engine="pyarrow", **options)
+    except (ImportError, ValueError):
+        frame = pd.read_csv(path, **options)
+    return BehaviorData(frame)
+
+
+# 与Spark ROUND(x, 2) 一致的四舍五入（HALF_UP），除数为0时返回None（Spark中为NULL）
+def spark_round(numerator, denominator, digits=2):
+    if not denominator:
+        return None
+    value = Decimal(repr(float(numerator) / float(denominator) * 100))
+    return float(value.quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP))
+
+
+# 按计数降序排列的 (编码, 计数)，只保留计数大于0的项
+def sorted_counts(counts):
+    order = np.argsort(-counts, kind="stable")
+    return [(code, int(counts[code])) for code in order if counts[code] > 0]
+
+
+## 任务 1.1：行为总次数 + 购买转化率
+def action_count(data):
+    valid = data.action >= 0
+    counts = np.bincount(data.action[valid], minlength=len(data.actions))
+    rows = [[data.actions[code], count] for code, count in sorted_counts(counts)]
+    missing = int((~valid).sum())
+    if missing:
+        rows.append([None, missing])
+        rows.sort(key=lambda row: -row[1])
+    return ["action", "total_count"], rows
+
+
+def purchase_conversion_rate(action_rows):
+    totals = {action: count for action, count in action_rows}
+    return spark_round(totals.get("buy", 0), totals.get("click", 0))
+
+
+## 任务 1.2：商品类别热度（按点击量降序）
+def category_click(data):
+    clicks = data.category[data.action == data.action_code("click")]
+    counts = np.bincount(clicks[clicks >= 0], minlength=len(data.categories))
+    rows = [[data.categories[code], count] for code, count in sorted_counts(counts)]
+    missing = int((clicks < 0).sum())
+    if missing:
+        rows.append([None, missing])
+        rows.sort(key=lambda row: -row[1])
+    return ["category", "click_count"], rows
+
+
+## 任务 1.3：用户活跃时段（按小时统计行为次数）
+def hourly_behavior(data):
+    counts = np.bincount(data.hour[data.has_timestamp], minlength=24)
+    rows = [[f"{hour:02d}", int(counts[hour])] for hour in range(24) if counts[hour] > 0]
+    return ["hour", "total_behavior_count"], rows
+
+
+## 任务 2.1：Top3购买用户
+def top3_buy_user(data, top=3):
+    buyers = data.user[data.action == data.action_code("buy")]
+    counts = np.bincount(buyers[buyers >= 0], minlength=len(data.user_ids))
+    top = min(top, int((counts > 0).sum()))
+    if top == 0:
+        return ["user_id", "buy_count"], []
+    candidates = np.argpartition(-counts, top - 1)[:top]
+    candidates = candidates[np.argsort(-counts[candidates], kind="stable")]
+    return ["user_id", "buy_count"], [[data.user_ids[code], int(counts[code])] for code in candidates]
+
+
+# 每个(用户, 商品)按顺序到达的漏斗深度，与funnel_engine中Spark SQL的逐环节推进逻辑一致：
+# 第一个环节取首次发生时间，之后每个环节取不早于上一环节到达时间的最早一次（且在时间窗口内），能到达的环节数即为深度
+def funnel_depth(data, stages=DEFAULT_FUNNEL_STAGES, window_seconds=None):
+    stage_of_action = np.full(len(data.actions) + 1, -1, dtype=np.int64)
+    for index, stage in enumerate(stages):
+        code = data.action_code(stage)
+        if code >= 0:
+            stage_of_action[code] = index
+    stage = stage_of_action[data.action]  # 行为编码-1会取到末尾的-1
+    keep = (stage >= 0) & data.has_timestamp & (data.user >= 0) & (data.item >= 0)
+
+    pair = data.user[keep].astype(np.int64) * len(data.item_ids) + data.item[keep]
+    ts = data.timestamp[keep]
+    stage = stage[keep]
+    if len(pair) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    pairs, group_id = np.unique(pair, return_inverse=True)
+
+    # 按 (用户-商品, 环节, 时间) 排序：时间换成名次后与组合键拼成一个int64，
+    # 每个组合键内“不早于某个时间的最早一次”就是一次searchsorted
+    times, ts_rank = np.unique(ts, return_inverse=True)
+    sorted_key = np.sort((group_id * len(stages) + stage) * len(times) + ts_rank)
+    key, ts_rank = sorted_key // len(times), sorted_key % len(times)
+
+    groups = np.arange(len(pairs))
+    reached = np.ones(len(pairs), dtype=bool)
+    reached_rank = np.zeros(len(pairs), dtype=np.int64)  # 上一环节到达时间的名次
+    depth = np.zeros(len(pairs), dtype=np.int64)
+    for index in range(len(stages)):
+        stage_key = groups * len(stages) + index
+        position = np.minimum(np.searchsorted(sorted_key, stage_key * len(times) + reached_rank), len(key) - 1)
+        reached &= key[position] == stage_key
+        reached_rank = np.where(reached, ts_rank[position], reached_rank)
+        if index == 0:
+            start_ts = times[reached_rank]
+        elif window_seconds is not None:
+            reached &= times[reached_rank] - start_ts <= window_seconds
+        depth += reached
+
+    group_user = pairs // len(data.item_ids)
+    return group_user, depth
+
+
+## 任务 2.2：转化漏斗
+def funnel_conversion(data, stages=DEFAULT_FUNNEL_STAGES, window_seconds=None):
+    group_user, depth = funnel_depth(data, stages, window_seconds)
+    stage_users = [len(np.unique(group_user[depth >= index + 1])) for index in range(len(stages))]
+    header = [f"{previous}_to_{stage}" for previous, stage in zip(stages, stages[1:])] + ["overall_conversion"]
+    row = [spark_round(stage_users[i + 1], stage_users[i]) for i in range(len(stages) - 1)]
+    row.append(spark_round(stage_users[-1], stage_users[0]))
+    return header, [row]
+
+
+## 任务 2.3：商品复购率
+def item_repurchase(data):
+    buy = (data.action == data.action_code("buy")) & (data.item >= 0) & (data.user >= 0)
+    pair = data.item[buy].astype(np.int64) * len(data.user_ids) + data.user[buy]
+    pairs, buy_times = np.unique(pair, return_counts=True)
+    pair_item = pairs // len(data.user_ids)
+    total_buy_user = np.bincount(pair_item, minlength=len(data.item_ids))
+    repurchase_user = np.bincount(pair_item[buy_times >= 2], minlength=len(data.item_ids))
+
+    items = np.nonzero(total_buy_user)[0]
+    rows = [[data.item_ids[code], int(total_buy_user[code]), int(repurchase_user[code]),
+             spark_round(repurchase_user[code], total_buy_user[code])] for code in items]
+    rows.sort(key=lambda row: -row[3])
+    return ["item_id", "total_buy_user", "repurchase_user", "repurchase_rate"], rows
+
+
+## 任务 2.4：次日留存率（当天活跃且前一天也活跃的用户占比）
+def user_retention(data):
+    header = ["current_date", "current_active_user", "retained_user", "day2_retention_rate"]
+    active = data.has_timestamp & (data.user >= 0)
+    if not active.any():
+        return header, []
+    first_day = int(data.day[active].min())
+    day_offset = data.day[active] - first_day
+    day_span = int(day_offset.max()) + 2
+    # (用户, 日期) 去重后编码为 用户*day_span + 日期偏移，前一天即为 key - 1
+    keys = np.unique(data.user[active].astype(np.int64) * day_span + day_offset)
+    key_day = keys % day_span
+    retained = (key_day > 0) & np.isin(keys - 1, keys)
+    active_users = np.bincount(key_day)
+    retained_users = np.bincount(key_day[retained], minlength=len(active_users))
+
+    rows = []
+    for offset in np.nonzero(active_users)[0]:
+        date = str(np.datetime64(first_day + int(offset), "D"))
+        rows.append([date, int(active_users[offset]), int(retained_users[offset]),
+                     spark_round(retained_users[offset], active_users[offset])])
+    return header, rows
+
+
+# 输出目录 -> 计算函数
+TASKS = [
+    ("sql_basic_action_count", action_count),
+    ("sql_basic_category_click", category_click),
+    ("sql_basic_hourly_behavior", hourly_behavior),
+    ("sql_advanced_top3_user", top3_buy_user),
+    ("sql_advanced_funnel", funnel_conversion),
+    ("sql_advanced_repurchase", item_repurchase),
+    ("sql_advanced_retention", user_retention),
+]
+
+
+def format_value(value):
+    return "" if value is None else str(value)
+
+
+# 按Spark的CSV输出格式写入：目录下一个part文件，带表头，NULL写为空串
+def write_result(name, header, rows, output_root=OUTPUT_ROOT):
+    output_dir = os.path.join(output_root, name)
+    os.makedirs(output_dir, exist_ok=True)
+    for old_file in glob.glob(os.path.join(output_dir, "part-*")):
+        os.remove(old_file)
+    with open(os.path.join(output_dir, "part-00000.csv"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows([format_value(value) for value in row] for row in rows)
+
+
+# 读取Spark输出目录中的全部part文件，返回 (表头, 行列表)
+def read_spark_result(name, output_root=SPARK_OUTPUT_ROOT):
+    header, rows = None, []
+    for part_file in sorted(glob.glob(os.path.join(output_root, name, "part-*.csv"))):
+        with open(part_file, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            part_header = next(reader, None)
+            header = header or part_header
+            rows.extend(reader)
+    return header, rows
+
+
+# 与Spark输出逐行比对（排序后比较，并列项在两边的先后顺序可能不同）
+def compare_with_spark(results):
+    print("\n=== 与Spark输出比对 ===")
+    all_match = True
+    for name, (header, rows) in results.items():
+        spark_header, spark_rows = read_spark_result(name)
+        if spark_header is None:
+            print(f"{name}: 未找到Spark输出，跳过")
+            continue
+        numpy_rows = sorted([format_value(value) for value in row] for row in rows)
+        match = spark_header == header and numpy_rows == sorted(spark_rows)
+        all_match &= match
+        print(f"{name}: {'一致' if match else '不一致'}（NumPy {len(rows)} 行，Spark {len(spark_rows)} 行）")
+    return all_match
+
+
+def run_all(path=None):
+    start_time = time.time()
+    data = load_behavior_data(path)
+    load_duration = time.time() - start_time
+    print(f"加载 {data.num_rows} 行数据耗时: {load_duration:.2f} 秒"
+          f"（用户 {len(data.user_ids)}，商品 {len(data.item_ids)}，品类 {len(data.categories)}）")
+
+    results = {}
+    for name, task in TASKS:
+        task_start = time.time()
+        header, rows = task(data)
+        write_result(name, header, rows)
+        results[name] = (header, rows)
+        print(f"[NumPy] {name} 耗时: {time.time() - task_start:.2f} 秒")
+    return results, time.time() - start_time
+
+
+def print_summary(results):
+    print("\n=== 购买转化率结果 ===")
+    print(purchase_conversion_rate(results["sql_basic_action_count"][1]))
+    print("\n=== 商品类别热度Top3 ===")
+    for row in results["sql_basic_category_click"][1][:3]:
+        print(row)
+    print("\n=== 用户活跃高峰时段 ===")
+    for row in sorted((row for row in results["sql_basic_hourly_behavior"][1] if row[1] >= 8000),
+                      key=lambda row: -row[1]):
+        print(row)
+    print("\n=== Top3高价值用户（购买次数最多） ===")
+    for row in results["sql_advanced_top3_user"][1]:
+        print(row)
+    print("\n=== 转化漏斗各环节转化率 ===")
+    header, rows = results["sql_advanced_funnel"]
+    print(dict(zip(header, rows[0])))
+    print("\n=== 商品复购率Top3 ===")
+    for row in results["sql_advanced_repurchase"][1][:3]:
+        print(row)
+    print("\n=== 近3天用户次日留存率 ===")
+    for row in results["sql_advanced_retention"][1][-3:][::-1]:
+        print(row)
+
+
+def main():
+    print("=== 电商用户行为分析（NumPy后端） ===")
+    results, duration = run_all()
+    print_summary(results)
+    print(f"\n[NumPy] 全部任务总耗时（含加载）: {duration:.2f} 秒，结果已保存到 {OUTPUT_ROOT}/")
+
+    if "--benchmark" in sys.argv:
+        print("\n正在运行Spark脚本进行对比...")
+        spark_start = time.time()
+        subprocess.run([sys.executable, "ecommerce_analysis_spark_sql.py", "--force"], check=True,
+                       stdout=subprocess.DEVNULL)
+        spark_duration = time.time() - spark_start
+        print(f"Spark脚本总耗时（含启动）: {spark_duration:.2f} 秒，NumPy后端: {duration:.2f} 秒，"
+              f"加速比: {spark_duration / max(duration, 1e-9):.2f}x")
+
+    if "--compare" in sys.argv or "--benchmark" in sys.argv:
+        compare_with_spark(results)
+
+
+if __name__ == "__main__":
+    main()
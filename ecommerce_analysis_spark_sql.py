@@ -1,281 +1,371 @@
-#1. 初始化SparkSession（SQL核心入口）
-from pyspark.sql import SparkSession
-from pyspark.sql.types import StructType, StructField, StringType, LongType
-
-spark = SparkSession.builder.appName("EcommerceSQLAnalysis") .master("local[*]").getOrCreate()  # 本地模式，集群模式可改为.master("yarn")
-    
-
-#2. 定义数据Schema（与10万条用户行为数据字段匹配）
-user_behavior_schema = StructType([
-    StructField("user_id", StringType(), nullable=True),
-    StructField("item_id", StringType(), nullable=True),
-    StructField("action", StringType(), nullable=True),
-    StructField("timestamp", LongType(), nullable=True),
-    StructField("category", StringType(), nullable=True)
-])
-
-# 3. 加载CSV数据（避免自动推断Schema的误差）
-df = spark.read \
-    .csv("user_behavior_10m.csv",  # 数据文件路径（与generate_large_behavior.py同目录）
-         header=False,
-         schema=user_behavior_schema)
-
-# 4. 创建临时视图（后续所有SQL均基于此视图查询）
-df.createOrReplaceTempView("user_behavior_view")
+#1. 电商用户行为分析（Spark SQL）
+# 每个分析任务定义为一个带参数和依赖声明的查询节点（见job_runner.py），独立的节点在共享的SparkSession上并发执行，
+# 输入数据、节点代码和参数都未变化且输出仍存在的节点会被跳过
+# 运行：python ecommerce_analysis_spark_sql.py [--tasks funnel,retention] [--param peak_threshold=8000] [--workers 4] [--force]
+# 配置档由环境变量SPARK_PROFILE指定：small-local（默认）/ large-local / cluster
+import os
+import sys
+import time
+import argparse
+import threading
+from datetime import timedelta
+import funnel_engine
+import result_sink
+import ecommerce_common
+import ecommerce_parquet_store
+from spark_session_factory import create_spark_session
+from view_cache import ViewMaterializer
+from ecommerce_common import default_user_behavior_source, load_user_behavior_view
+from ecommerce_parquet_store import latest_event_date, spark_read_behavior
+from funnel_engine import create_funnel_views
+from job_runner import QueryNode, JobRunner, parse_params
+from result_sink import write_result
 
-### 进阶分析任务
+# 任务参数默认值（可用 --param key=value 覆盖）
+DEFAULT_PARAMS = {
+    "source": default_user_behavior_source(),  # 已有Parquet存储时优先读取Parquet
+    "output_root": "output",
+    "output_format": "csv",  # 结果格式：csv / json / parquet
+    "category_top": 3,  # 终端输出的热门品类数
+    "peak_threshold": 8000,  # 高峰时段的行为次数阈值
+    "top_n": 3,  # 高价值用户数
+    "funnel_stages": ["click", "collect", "cart", "buy"],
+    "funnel_window_hours": 0.0,  # 漏斗时间窗口（小时），0表示不限
+    "repurchase_top": 3,  # 终端输出的复购率Top商品数
+    "recent_days": 3,  # 终端输出最近几天的次日留存率
+    "retention_days": 0,  # 只计算最近几天的次日留存率（Parquet存储只读取这些日期分区），0表示全部日期
+}
+
+# 并发执行时，终端输出（标题 + show）整体加锁，避免不同任务的输出交错
+display_lock = threading.Lock()
+views = None  # ViewMaterializer，在main中创建
+
+
+# 保存结果视图：小结果写为单个文件，行数和写入耗时记录在输出根目录的 _manifest.json（见result_sink.py）
+def save_result(spark, view_name, output_dir, params):
+    write_result(spark.sql(f"SELECT * FROM {view_name}"), output_dir, params["output_format"])
+
+
+def display(spark, title, query):
+    with display_lock:
+        print(title)
+        spark.sql(query).show()
+
+
+# 创建任务专用的源视图：数据源为Parquet存储时通过spark_read_behavior读取，event_date分区裁剪、action条件下推到
+# 行组统计信息，只读取相关文件；数据源为CSV时无法裁剪，从已缓存的user_behavior_view中过滤
+# recent_days：只保留最近 recent_days+1 天（多一天用于计算第一天的次日留存）
+def define_source_view(spark, params, view_name, actions=None, recent_days=0):
+    if os.path.isdir(params["source"]):
+        start_date = None
+        if recent_days:
+            latest = latest_event_date(params["source"])
+            start_date = latest - timedelta(days=int(recent_days)) if latest is not None else None
+        spark_read_behavior(spark, params["source"], actions=actions, start_date=start_date) \
+            .createOrReplaceTempView(view_name)
+        return
+    conditions = []
+    if actions is not None:
+        conditions.append("action IN (" + ", ".join(f"'{action}'" for action in actions) + ")")
+    if recent_days:
+        conditions.append(f"""DATE(FROM_UNIXTIME(timestamp)) >= DATE_SUB(
+        (SELECT MAX(DATE(FROM_UNIXTIME(timestamp))) FROM user_behavior_view), {int(recent_days)})""")
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    spark.sql(f"CREATE OR REPLACE TEMPORARY VIEW {view_name} AS SELECT * FROM user_behavior_view {where}")
+
+
+### 基础分析任务
 ## 任务 1.1：统计 4 种行为总次数 + 计算购买转化率
-# 1. 统计行为总次数并创建视图
-spark.sql("""
-CREATE TEMPORARY VIEW action_count_view AS
-SELECT 
-  action,
-  COUNT(*) AS total_count  -- 行为总次数
-FROM user_behavior_view
-GROUP BY action
-ORDER BY total_count DESC;
-""")
-# 2. 计算购买转化率（终端输出）
-conversion_result = spark.sql("""
-SELECT 
-  ROUND(
-    (SELECT total_count FROM action_count_view WHERE action = 'buy') 
-    / (SELECT total_count FROM action_count_view WHERE action = 'click') * 100, 
-    2
-  ) AS purchase_conversion_rate
-FROM action_count_view
-LIMIT 1;
-""")
-print("=== 购买转化率结果 ===")
-conversion_result.show()
-# 3. 保存行为统计结果（CSV格式，带表头）
-spark.sql("SELECT * FROM action_count_view") \
-     .write \
-     .csv("output/sql_basic_action_count",
-          header=True,
-          mode="overwrite")  # 覆盖已有文件
+def define_action_count(spark, params):
+    # 统计行为总次数并创建视图
+    spark.sql("""
+    CREATE OR REPLACE TEMPORARY VIEW action_count_view AS
+    SELECT
+      action,
+      COUNT(*) AS total_count  -- 行为总次数
+    FROM user_behavior_view
+    GROUP BY action
+    ORDER BY total_count DESC
+    """)
+    views.cache("action_count_view")
+
+
+def execute_action_count(spark, params):
+    # 保存行为统计结果（默认CSV格式，带表头）
+    save_result(spark, "action_count_view", f"{params['output_root']}/sql_basic_action_count", params)
+
+
+def execute_conversion(spark, params):
+    # 计算购买转化率（终端输出）
+    display(spark, "=== 购买转化率结果 ===", """
+    SELECT
+      ROUND(
+        (SELECT total_count FROM action_count_view WHERE action = 'buy')
+        / (SELECT total_count FROM action_count_view WHERE action = 'click') * 100,
+        2
+      ) AS purchase_conversion_rate
+    FROM action_count_view
+    LIMIT 1
+    """)
 
 
 ## 任务 1.2：分析商品类别热度（按点击量降序）
-# 1. 统计品类点击量并创建视图
-spark.sql("""
-CREATE TEMPORARY VIEW category_click_view AS
-SELECT 
-  category,
-  COUNT(*) AS click_count  -- 品类点击量
-FROM user_behavior_view
-WHERE action = 'click'  -- 仅关注点击行为
-GROUP BY category
-ORDER BY click_count DESC;
-""")
-# 2. 保存品类热度结果
-spark.sql("SELECT * FROM category_click_view") \
-     .write \
-     .csv("output/sql_basic_category_click",
-          header=True,
-          mode="overwrite")
-# 3. 终端输出品类热度Top3
-print("\n=== 商品类别热度Top3 ===")
-spark.sql("SELECT * FROM category_click_view LIMIT 3").show()
+def define_category(spark, params):
+    # 统计品类点击量并创建视图
+    spark.sql("""
+    CREATE OR REPLACE TEMPORARY VIEW category_click_view AS
+    SELECT
+      category,
+      COUNT(*) AS click_count  -- 品类点击量
+    FROM user_behavior_view
+    WHERE action = 'click'  -- 仅关注点击行为
+    GROUP BY category
+    ORDER BY click_count DESC
+    """)
+    views.cache("category_click_view")
+
+
+def execute_category(spark, params):
+    # 保存品类热度结果，终端输出热度TopN品类
+    save_result(spark, "category_click_view", f"{params['output_root']}/sql_basic_category_click", params)
+    display(spark, f"\n=== 商品类别热度Top{params['category_top']} ===",
+            f"SELECT * FROM category_click_view LIMIT {int(params['category_top'])}")
+
 
 ## 任务 1.3：分析用户活跃时段（按小时统计行为次数）
-# 1. 统计时段行为次数并创建视图
-spark.sql("""
-CREATE TEMPORARY VIEW hourly_behavior_view AS
-SELECT 
-  FROM_UNIXTIME(timestamp, 'HH') AS hour,  -- 提取小时（如08、20）
-  COUNT(*) AS total_behavior_count  -- 该小时总行为次数
-FROM user_behavior_view
-GROUP BY hour
-ORDER BY hour;
-""")
-# 2. 保存活跃时段结果
-spark.sql("SELECT * FROM hourly_behavior_view") \
-     .write \
-     .csv("output/sql_basic_hourly_behavior",
-          header=True,
-          mode="overwrite")
-# 3. 终端输出高峰时段（行为次数≥8000的小时）
-print("\n=== 用户活跃高峰时段 ===")
-spark.sql("""
-SELECT hour, total_behavior_count 
-FROM hourly_behavior_view 
-WHERE total_behavior_count >= 8000 
-ORDER BY total_behavior_count DESC;
-""").show()
+def define_hourly(spark, params):
+    # 统计时段行为次数并创建视图
+    spark.sql("""
+    CREATE OR REPLACE TEMPORARY VIEW hourly_behavior_view AS
+    SELECT
+      FROM_UNIXTIME(timestamp, 'HH') AS hour,  -- 提取小时（如08、20）
+      COUNT(*) AS total_behavior_count  -- 该小时总行为次数
+    FROM user_behavior_view
+    GROUP BY hour
+    ORDER BY hour
+    """)
+    views.cache("hourly_behavior_view")
+
+
+def execute_hourly(spark, params):
+    # 保存活跃时段结果
+    save_result(spark, "hourly_behavior_view", f"{params['output_root']}/sql_basic_hourly_behavior", params)
+
+
+def execute_peak_hours(spark, params):
+    # 终端输出高峰时段（行为次数≥阈值的小时）
+    display(spark, "\n=== 用户活跃高峰时段 ===", f"""
+    SELECT hour, total_behavior_count
+    FROM hourly_behavior_view
+    WHERE total_behavior_count >= {int(params['peak_threshold'])}
+    ORDER BY total_behavior_count DESC
+    """)
+
 
 ### 进阶分析任务
-## 任务 2.1：高价值用户识别（Top3 购买用户）
-# 1. 筛选Top3购买用户并创建视图
-spark.sql("""
-CREATE TEMPORARY VIEW top3_buy_user_view AS
-SELECT 
-  user_id,
-  COUNT(*) AS buy_count  -- 用户购买次数
-FROM user_behavior_view
-WHERE action = 'buy'
-GROUP BY user_id
-ORDER BY buy_count DESC
-LIMIT 3;
-""")
-# 2. 保存Top3用户结果
-spark.sql("SELECT * FROM top3_buy_user_view") \
-     .write \
-     .csv("output/sql_advanced_top3_user",
-          header=True,
-          mode="overwrite")
-
-# 3. 终端输出Top3高价值用户
-print("\n=== Top3高价值用户（购买次数最多） ===")
-spark.sql("SELECT * FROM top3_buy_user_view").show()
+## 任务 2.1：高价值用户识别（TopN 购买用户）
+def define_top_buyers(spark, params):
+    # 筛选TopN购买用户并创建视图（只读取购买行为）
+    define_source_view(spark, params, "top_buyers_source_view", actions=["buy"])
+    spark.sql(f"""
+    CREATE OR REPLACE TEMPORARY VIEW top3_buy_user_view AS
+    SELECT
+      user_id,
+      COUNT(*) AS buy_count  -- 用户购买次数
+    FROM top_buyers_source_view
+    WHERE action = 'buy'
+    GROUP BY user_id
+    ORDER BY buy_count DESC
+    LIMIT {int(params['top_n'])}
+    """)
+    views.cache("top3_buy_user_view")
+
+
+def execute_top_buyers(spark, params):
+    # 保存并输出TopN用户结果
+    save_result(spark, "top3_buy_user_view", f"{params['output_root']}/sql_advanced_top3_user", params)
+    display(spark, f"\n=== Top{params['top_n']}高价值用户（购买次数最多） ===", "SELECT * FROM top3_buy_user_view")
+
 
 ## 任务 2.2：转化漏斗分析（点击→收藏→加购→购买，基于同一商品的递进行为）
-# 1. 统计用户对每个商品的行为路径（按时间排序）
-spark.sql("""
-CREATE TEMPORARY VIEW user_item_behavior_path AS
-SELECT 
-  user_id,
-  item_id,
-  action,
-  timestamp,
-  -- 按时间排序，标记用户对该商品的行为顺序
-  ROW_NUMBER() OVER (PARTITION BY user_id, item_id ORDER BY timestamp) AS action_order
-FROM user_behavior_view;
-""")
-# 2. 筛选符合“click→collect→cart→buy”递进顺序的用户-商品行为
-spark.sql("""
-CREATE TEMPORARY VIEW valid_funnel_behavior AS
-SELECT 
-  ubv.user_id,
-  ubv.item_id,
-  ubv.action,
-  -- 确保行为按 click→collect→cart→buy 顺序发生
-  CASE 
-    WHEN ubv.action = 'click' AND ubv.action_order = 1 THEN 1
-    WHEN ubv.action = 'collect' AND ubv.action_order = 2 THEN 1
-    WHEN ubv.action = 'cart' AND ubv.action_order = 3 THEN 1
-    WHEN ubv.action = 'buy' AND ubv.action_order = 4 THEN 1
-    ELSE 0
-  END AS is_valid_funnel
-FROM user_item_behavior_path ubv
-WHERE ubv.action IN ('click', 'collect', 'cart', 'buy');
-""")
-# 3. 统计各环节的独立用户数（仅包含符合递进顺序的行为）
-spark.sql("""
-CREATE TEMPORARY VIEW funnel_user_count_view AS
-SELECT 
-  COUNT(DISTINCT CASE WHEN action = 'click' AND is_valid_funnel = 1 THEN user_id END) AS click_user,
-  COUNT(DISTINCT CASE WHEN action = 'collect' AND is_valid_funnel = 1 THEN user_id END) AS collect_user,
-  COUNT(DISTINCT CASE WHEN action = 'cart' AND is_valid_funnel = 1 THEN user_id END) AS cart_user,
-  COUNT(DISTINCT CASE WHEN action = 'buy' AND is_valid_funnel = 1 THEN user_id END) AS buy_user
-FROM valid_funnel_behavior;
-""")
-# 4. 计算各环节转化率（逻辑与之前一致，基于修正后的用户数）
-spark.sql("""
-CREATE TEMPORARY VIEW funnel_conversion_view AS
-SELECT 
-  ROUND(collect_user / click_user * 100, 2) AS click_to_collect,
-  ROUND(cart_user / collect_user * 100, 2) AS collect_to_cart,
-  ROUND(buy_user / cart_user * 100, 2) AS cart_to_buy,
-  ROUND(buy_user / click_user * 100, 2) AS overall_conversion
-FROM funnel_user_count_view;
-""")
-# 5. 保存并输出结果
-spark.sql("SELECT * FROM funnel_conversion_view") \
-     .write \
-     .csv("output/sql_advanced_funnel",
-          header=True,
-          mode="overwrite")
-
-print("\n=== 转化漏斗各环节转化率 ===")
-spark.sql("SELECT * FROM funnel_conversion_view").show()
+def define_funnel(spark, params):
+    # 1. 按(用户, 商品)聚合行为，判断是否按环节顺序递进（不做全量排序，见funnel_engine.py）
+    # 2. 统计各环节的独立用户数（funnel_user_count_view）
+    # 3. 计算各环节转化率（funnel_conversion_view）
+    # 源视图只包含漏斗环节的行为，每个环节都要与之连接一次，缓存后只读取一次
+    stages = list(params["funnel_stages"])
+    define_source_view(spark, params, "funnel_source_view", actions=stages)
+    views.cache("funnel_source_view")
+    window_hours = float(params["funnel_window_hours"])
+    window_seconds = int(window_hours * 3600) if window_hours > 0 else None
+    create_funnel_views(spark, stages, window_seconds, source_view="funnel_source_view")
+    views.cache("funnel_conversion_view")
+
+
+def execute_funnel(spark, params):
+    # 保存并输出结果
+    save_result(spark, "funnel_conversion_view", f"{params['output_root']}/sql_advanced_funnel", params)
+    display(spark, "\n=== 转化漏斗各环节转化率 ===", "SELECT * FROM funnel_conversion_view")
+
 
 ## 任务 2.3：商品复购率分析
-# 1. 统计用户-商品购买次数
-spark.sql("""
-CREATE TEMPORARY VIEW item_user_buy_count_view AS
-SELECT 
-  item_id,
-  user_id,
-  COUNT(*) AS buy_times  -- 用户对该商品的购买次数
-FROM user_behavior_view
-WHERE action = 'buy'
-GROUP BY item_id, user_id;
-""")
-# 2. 计算商品复购率
-spark.sql("""
-CREATE TEMPORARY VIEW item_repurchase_view AS
-SELECT 
-  item_id,
-  COUNT(DISTINCT user_id) AS total_buy_user,  -- 商品总购买用户数
-  -- 复购用户数（保留别名，用于结果展示）
-  COUNT(DISTINCT CASE WHEN buy_times >= 2 THEN user_id END) AS repurchase_user,
-  -- 用原始表达式替换别名，避免引用未解析的字段
-  ROUND(
-    (COUNT(DISTINCT CASE WHEN buy_times >= 2 THEN user_id END) / COUNT(DISTINCT user_id)) * 100, 
-    2
-  ) AS repurchase_rate  -- 复购率
-FROM item_user_buy_count_view
-GROUP BY item_id
-ORDER BY repurchase_rate DESC;
-""")
-# 3. 保存复购率结果
-spark.sql("SELECT * FROM item_repurchase_view") \
-     .write \
-     .csv("output/sql_advanced_repurchase",
-          header=True,
-          mode="overwrite")
-# 4. 终端输出复购率Top3商品
-print("\n=== 商品复购率Top3 ===")
-spark.sql("SELECT * FROM item_repurchase_view LIMIT 3").show()
+def define_repurchase(spark, params):
+    # 1. 统计用户-商品购买次数（只读取购买行为）
+    define_source_view(spark, params, "repurchase_source_view", actions=["buy"])
+    spark.sql("""
+    CREATE OR REPLACE TEMPORARY VIEW item_user_buy_count_view AS
+    SELECT
+      item_id,
+      user_id,
+      COUNT(*) AS buy_times  -- 用户对该商品的购买次数
+    FROM repurchase_source_view
+    WHERE action = 'buy'
+    GROUP BY item_id, user_id
+    """)
+    # 2. 计算商品复购率
+    spark.sql("""
+    CREATE OR REPLACE TEMPORARY VIEW item_repurchase_view AS
+    SELECT
+      item_id,
+      COUNT(DISTINCT user_id) AS total_buy_user,  -- 商品总购买用户数
+      -- 复购用户数（保留别名，用于结果展示）
+      COUNT(DISTINCT CASE WHEN buy_times >= 2 THEN user_id END) AS repurchase_user,
+      -- 用原始表达式替换别名，避免引用未解析的字段
+      ROUND(
+        (COUNT(DISTINCT CASE WHEN buy_times >= 2 THEN user_id END) / COUNT(DISTINCT user_id)) * 100,
+        2
+      ) AS repurchase_rate  -- 复购率
+    FROM item_user_buy_count_view
+    GROUP BY item_id
+    ORDER BY repurchase_rate DESC
+    """)
+    views.cache("item_repurchase_view")
+
+
+def execute_repurchase(spark, params):
+    # 保存复购率结果，终端输出复购率TopN商品
+    save_result(spark, "item_repurchase_view", f"{params['output_root']}/sql_advanced_repurchase", params)
+    display(spark, f"\n=== 商品复购率Top{params['repurchase_top']} ===",
+            f"SELECT * FROM item_repurchase_view LIMIT {int(params['repurchase_top'])}")
+
 
 ## 任务 2.4：用户次日留存率
-# 1. 提取用户每日活跃记录（去重）
-spark.sql("""
-CREATE TEMPORARY VIEW user_daily_active_view AS
-SELECT 
-  DISTINCT user_id,
-  DATE(FROM_UNIXTIME(timestamp)) AS active_date  -- 转为日期格式（如2023-11-01）
-FROM user_behavior_view;
-""")
-# 2. 用窗口函数获取前一天活跃日期
-spark.sql("""
-CREATE TEMPORARY VIEW user_prev_active_view AS
-SELECT 
-  user_id,
-  active_date,
-  LAG(active_date, 1) OVER (PARTITION BY user_id ORDER BY active_date) AS prev_active_date
-FROM user_daily_active_view;
-""")
-# 3. 计算次日留存率（修正版）
-spark.sql("""
-CREATE TEMPORARY VIEW user_retention_view AS
-SELECT 
-  active_date AS current_date,
-  COUNT(DISTINCT user_id) AS current_active_user,  -- 当天活跃用户数
-  -- 留存用户数（保留别名，用于结果展示）
-  COUNT(DISTINCT CASE WHEN DATEDIFF(active_date, prev_active_date) = 1 THEN user_id END) AS retained_user,
-  -- 用原始表达式替换别名，避免引用未解析的字段
-  ROUND(
-    (COUNT(DISTINCT CASE WHEN DATEDIFF(active_date, prev_active_date) = 1 THEN user_id END) 
-    / COUNT(DISTINCT user_id)) * 100, 
-    2
-  ) AS day2_retention_rate
-FROM user_prev_active_view
-GROUP BY active_date
-ORDER BY active_date;
-""")
-# 4. 保存留存率结果
-spark.sql("SELECT * FROM user_retention_view") \
-     .write \
-     .csv("output/sql_advanced_retention",
-          header=True,
-          mode="overwrite")
-# 5. 终端输出近3天留存率
-print("\n=== 近3天用户次日留存率 ===")
-spark.sql("""
-SELECT current_date, current_active_user, retained_user, day2_retention_rate 
-FROM user_retention_view 
-ORDER BY current_date DESC 
-LIMIT 3;
-""").show()
\ No newline at end of file
+def define_retention(spark, params):
+    # 1. 提取用户每日活跃记录（去重；设置了retention_days时只读取最近的日期）
+    retention_days = int(params["retention_days"])
+    define_source_view(spark, params, "retention_source_view", recent_days=retention_days)
+    spark.sql("""
+    CREATE OR REPLACE TEMPORARY VIEW user_daily_active_view AS
+    SELECT
+      DISTINCT user_id,
+      DATE(FROM_UNIXTIME(timestamp)) AS active_date  -- 转为日期格式（如2023-11-01）
+    FROM retention_source_view
+    """)
+    # 2. 用窗口函数获取前一天活跃日期
+    spark.sql("""
+    CREATE OR REPLACE TEMPORARY VIEW user_prev_active_view AS
+    SELECT
+      user_id,
+      active_date,
+      LAG(active_date, 1) OVER (PARTITION BY user_id ORDER BY active_date) AS prev_active_date
+    FROM user_daily_active_view
+    """)
+    # 3. 计算次日留存率（修正版）；只读取最近几天时，最早一天没有前一天的数据，不输出
+    first_day_filter = "WHERE active_date > (SELECT MIN(active_date) FROM user_daily_active_view)" \
+        if retention_days else ""
+    spark.sql(f"""
+    CREATE OR REPLACE TEMPORARY VIEW user_retention_view AS
+    SELECT
+      active_date AS current_date,
+      COUNT(DISTINCT user_id) AS current_active_user,  -- 当天活跃用户数
+      -- 留存用户数（保留别名，用于结果展示）
+      COUNT(DISTINCT CASE WHEN DATEDIFF(active_date, prev_active_date) = 1 THEN user_id END) AS retained_user,
+      -- 用原始表达式替换别名，避免引用未解析的字段
+      ROUND(
+        (COUNT(DISTINCT CASE WHEN DATEDIFF(active_date, prev_active_date) = 1 THEN user_id END)
+        / COUNT(DISTINCT user_id)) * 100,
+        2
+      ) AS day2_retention_rate
+    FROM user_prev_active_view
+    {first_day_filter}
+    GROUP BY active_date
+    ORDER BY active_date
+    """)
+    views.cache("user_retention_view")
+
+
+def execute_retention(spark, params):
+    # 保存留存率结果，终端输出最近几天的留存率
+    save_result(spark, "user_retention_view", f"{params['output_root']}/sql_advanced_retention", params)
+    display(spark, f"\n=== 近{params['recent_days']}天用户次日留存率 ===", f"""
+    SELECT current_date, current_active_user, retained_user, day2_retention_rate
+    FROM user_retention_view
+    ORDER BY current_date DESC
+    LIMIT {int(params['recent_days'])}
+    """)
+
+
+# 查询节点：名称、视图定义、执行动作、依赖、所用参数、输出目录、用到的辅助模块
+TASK_NODES = [
+    QueryNode("action_count", define_action_count, execute_action_count,
+              params=["output_root", "output_format"], outputs=["{output_root}/sql_basic_action_count"]),
+    QueryNode("conversion", None, execute_conversion, depends=["action_count"]),
+    QueryNode("category", define_category, execute_category,
+              params=["output_root", "output_format", "category_top"], outputs=["{output_root}/sql_basic_category_click"]),
+    QueryNode("hourly", define_hourly, execute_hourly,
+              params=["output_root", "output_format"], outputs=["{output_root}/sql_basic_hourly_behavior"]),
+    QueryNode("peak_hours", None, execute_peak_hours, depends=["hourly"], params=["peak_threshold"]),
+    QueryNode("top_buyers", define_top_buyers, execute_top_buyers,
+              params=["output_root", "output_format", "top_n"], outputs=["{output_root}/sql_advanced_top3_user"]),
+    QueryNode("funnel", define_funnel, execute_funnel,
+              params=["output_root", "output_format", "funnel_stages", "funnel_window_hours"],
+              outputs=["{output_root}/sql_advanced_funnel"], helpers=[funnel_engine]),
+    QueryNode("repurchase", define_repurchase, execute_repurchase,
+              params=["output_root", "output_format", "repurchase_top"], outputs=["{output_root}/sql_advanced_repurchase"]),
+    QueryNode("retention", define_retention, execute_retention,
+              params=["output_root", "output_format", "recent_days", "retention_days"],
+              outputs=["{output_root}/sql_advanced_retention"]),
+]
+
+
+def main():
+    global views
+    parser = argparse.ArgumentParser(description="电商用户行为分析（Spark SQL）")
+    parser.add_argument("--tasks", help=f"逗号分隔的任务名（默认全部）: {','.join(node.name for node in TASK_NODES)}")
+    parser.add_argument("--param", action="append", default=[], help="覆盖任务参数，格式 key=value")
+    parser.add_argument("--workers", type=int, default=4, help="并发执行的任务数")
+    parser.add_argument("--force", action="store_true", help="不跳过输入未变化的任务")
+    args = parser.parse_args()
+    params = parse_params(DEFAULT_PARAMS, args.param)
+    task_names = args.tasks.split(",") if args.tasks else None
+
+    # 初始化SparkSession（SQL核心入口），FAIR调度使并发提交的任务公平共享执行资源
+    spark_profile = os.environ.get("SPARK_PROFILE", "small-local")
+    spark = create_spark_session("EcommerceSQLAnalysis", profile=spark_profile, input_paths=[params["source"]],
+                                 extra_conf={"spark.scheduler.mode": "FAIR"})
+    query_start_time = time.time()
+    views = ViewMaterializer(spark, params["source"])
+    try:
+        # 加载数据（Schema定义见ecommerce_common.py）并创建临时视图（后续所有SQL均基于此视图查询）
+        load_user_behavior_view(spark, params["source"])
+
+        # 缓存基础视图：原始数据只读取一次，后续任务都从内存列式缓存读取
+        # （数据源为Parquet存储时，只用部分行为或日期的任务改为直接读取相关分区文件，见define_source_view）
+        # 各任务中既要保存又要输出的结果视图也会缓存，避免重复计算
+        views.cache("user_behavior_view")
+
+        # 每个节点执行期间的原始数据扫描次数由views按节点统计；结果写出、数据加载等共用代码变化时全部节点重新执行
+        runner = JobRunner(spark, TASK_NODES, params, [params["source"]], workers=args.workers, force=args.force,
+                           shared_code=[save_result, display, define_source_view, result_sink, ecommerce_common,
+                                        ecommerce_parquet_store], task_tracker=views)
+        runner.run(task_names)
+        runner.report()
+        print(f"\n[Spark] [{spark_profile}] 全部分析任务耗时: {time.time() - query_start_time:.2f} 秒")
+    finally:
+        # 任务失败时也输出原始数据扫描次数，并显式释放缓存、关闭SparkSession
+        views.finish()
+        spark.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# 单次扫描计算全部基础电商指标（任务1.1、1.2、1.3、2.1）
+# 原脚本中行为总次数、品类点击量、时段行为次数、Top3购买用户各自对 user_behavior_view 做一次完整 GROUP BY，
+# 这里用 GROUPING SETS 在一次扫描中同时完成四个聚合，再拆分写入原有的输出目录
+# 运行：python ecommerce_basic_single_scan.py [--compare]，--compare 时额外运行原有的四次聚合并对比耗时
+
+import sys
+import time
+from spark_session_factory import create_spark_session
+from ecommerce_common import default_user_behavior_source, load_user_behavior_view
+from result_sink import write_result
+
+# GROUPING SETS 中空值会与"未参与该分组"混淆，用占位值保留原始数据中的NULL分组
+NULL_PLACEHOLDER = "__NULL__"
+
+# 一次扫描、四个分组集合：行为类型 / 点击品类 / 小时 / 购买用户
+BASIC_METRICS_SQL = f"""
+SELECT metric, metric_key, metric_count
+FROM (
+  SELECT
+    CASE
+      WHEN GROUPING(action) = 0 THEN 'action'
+      WHEN GROUPING(click_category) = 0 THEN 'category'
+      WHEN GROUPING(hour) = 0 THEN 'hour'
+      ELSE 'buyer'
+    END AS metric,
+    COALESCE(action, click_category, hour, buyer_id) AS metric_key,
+    COUNT(*) AS metric_count
+  FROM (
+    SELECT
+      action,
+      CASE WHEN action = 'click' THEN COALESCE(category, '{NULL_PLACEHOLDER}') END AS click_category,
+      FROM_UNIXTIME(timestamp, 'HH') AS hour,
+      CASE WHEN action = 'buy' THEN COALESCE(user_id, '{NULL_PLACEHOLDER}') END AS buyer_id
+    FROM user_behavior_view
+  )
+  GROUP BY GROUPING SETS ((action), (click_category), (hour), (buyer_id))
+)
+-- 非点击/非购买行为在品类、购买用户分组中表现为NULL，需要排除
+WHERE NOT (metric IN ('category', 'buyer') AND metric_key IS NULL)
+"""
+
+# 从合并结果中拆分出各任务的结果：(输出目录, 查询SQL)
+SPLIT_QUERIES = [
+    ("output/sql_basic_action_count", """
+SELECT metric_key AS action, metric_count AS total_count
+FROM basic_metrics_view WHERE metric = 'action'
+ORDER BY total_count DESC
+"""),
+    ("output/sql_basic_category_click", f"""
+SELECT NULLIF(metric_key, '{NULL_PLACEHOLDER}') AS category, metric_count AS click_count
+FROM basic_metrics_view WHERE metric = 'category'
+ORDER BY click_count DESC
+"""),
+    ("output/sql_basic_hourly_behavior", """
+SELECT metric_key AS hour, metric_count AS total_behavior_count
+FROM basic_metrics_view WHERE metric = 'hour'
+ORDER BY hour
+"""),
+    ("output/sql_advanced_top3_user", f"""
+SELECT NULLIF(metric_key, '{NULL_PLACEHOLDER}') AS user_id, metric_count AS buy_count
+FROM basic_metrics_view WHERE metric = 'buyer'
+ORDER BY buy_count DESC
+LIMIT 3
+"""),
+]
+
+# 原脚本中的四次独立聚合，用于耗时对比
+SEPARATE_QUERIES = [
+    "SELECT action, COUNT(*) AS total_count FROM user_behavior_view GROUP BY action ORDER BY total_count DESC",
+    "SELECT category, COUNT(*) AS click_count FROM user_behavior_view WHERE action = 'click' "
+    "GROUP BY category ORDER BY click_count DESC",
+    "SELECT FROM_UNIXTIME(timestamp, 'HH') AS hour, COUNT(*) AS total_behavior_count FROM user_behavior_view "
+    "GROUP BY hour ORDER BY hour",
+    "SELECT user_id, COUNT(*) AS buy_count FROM user_behavior_view WHERE action = 'buy' "
+    "GROUP BY user_id ORDER BY buy_count DESC LIMIT 3",
+]
+
+
+# 单次扫描计算并保存全部基础指标，返回耗时（秒）
+def run_single_scan(spark):
+    start_time = time.time()
+    # 合并结果（行为数+品类数+24+购买用户数 行）远小于原始数据，缓存后拆分时不再扫描原始数据
+    basic_metrics = spark.sql(BASIC_METRICS_SQL).cache()
+    basic_metrics.createOrReplaceTempView("basic_metrics_view")
+
+    results = {}
+    for output_dir, query in SPLIT_QUERIES:
+        result = spark.sql(query)
+        write_result(result, output_dir)
+        results[output_dir] = result
+
+    print("=== 购买转化率结果 ===")
+    spark.sql("""
+    SELECT ROUND(
+      SUM(CASE WHEN metric_key = 'buy' THEN metric_count END)
+      / SUM(CASE WHEN metric_key = 'click' THEN metric_count END) * 100, 2
+    ) AS purchase_conversion_rate
+    FROM basic_metrics_view WHERE metric = 'action'
+    """).show()
+
+    print("\n=== 商品类别热度Top3 ===")
+    results["output/sql_basic_category_click"].limit(3).show()
+
+    print("\n=== 用户活跃高峰时段 ===")
+    results["output/sql_basic_hourly_behavior"] \
+        .filter("total_behavior_count >= 8000") \
+        .orderBy("total_behavior_count", ascending=False) \
+        .show()
+
+    print("\n=== Top3高价值用户（购买次数最多） ===")
+    results["output/sql_advanced_top3_user"].show()
+
+    duration = time.time() - start_time
+    basic_metrics.unpersist()
+    return duration
+
+
+# 对比两种方案只计算（不写文件）全部四个聚合的耗时，返回 (单次扫描耗时, 四次聚合耗时)
+def compare_scan_plans(spark):
+    start_time = time.time()
+    spark.sql(BASIC_METRICS_SQL).collect()
+    single_duration = time.time() - start_time
+
+    start_time = time.time()
+    for query in SEPARATE_QUERIES:
+        spark.sql(query).collect()
+    separate_duration = time.time() - start_time
+    return single_duration, separate_duration
+
+
+def main():
+    spark = create_spark_session("EcommerceBasicSingleScan", input_paths=[default_user_behavior_source()])
+    load_user_behavior_view(spark)
+
+    print("=== 单次扫描计算基础电商指标（任务1.1/1.2/1.3/2.1） ===")
+    single_duration = run_single_scan(spark)
+    print(f"\n单次扫描（GROUPING SETS）耗时: {single_duration:.2f} 秒")
+
+    if "--compare" in sys.argv:
+        single_duration, separate_duration = compare_scan_plans(spark)
+        print("\n=== 计算耗时对比（不含写文件） ===")
+        print(f"单次扫描（GROUPING SETS）: {single_duration:.2f} 秒")
+        print(f"原方案四次独立聚合: {separate_duration:.2f} 秒")
+        print(f"加速比: {separate_duration / max(single_duration, 1e-9):.2f}x")
+
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
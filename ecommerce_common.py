@@ -0,0 +1,43 @@
+# 电商用户行为分析的公共定义：数据文件、字段和基础视图加载
+# 本模块不在顶层导入pyspark，非Spark后端（如NumPy后端）也可以直接复用这里的常量
+
+import os
+
+USER_BEHAVIOR_CSV = "user_behavior_10m.csv"  # 数据文件路径（与generate_large_behavior.py同目录）
+USER_BEHAVIOR_PARQUET = "user_behavior_parquet"  # 按日期分区、按用户分桶的Parquet存储（见ecommerce_parquet_store.py）
+
+# 数据字段（与用户行为数据字段匹配），timestamp为秒级时间戳，其余为字符串
+USER_BEHAVIOR_COLUMNS = ["user_id", "item_id", "action", "timestamp", "category"]
+
+
+# 数据Schema
+def get_user_behavior_schema():
+    from pyspark.sql.types import StructType, StructField, StringType, LongType
+    return StructType([
+        StructField("user_id", StringType(), nullable=True),
+        StructField("item_id", StringType(), nullable=True),
+        StructField("action", StringType(), nullable=True),
+        StructField("timestamp", LongType(), nullable=True),
+        StructField("category", StringType(), nullable=True)
+    ])
+
+
+# 默认数据源：已生成Parquet存储时优先读取Parquet，否则读取原始CSV
+def default_user_behavior_source():
+    return USER_BEHAVIOR_PARQUET if os.path.isdir(USER_BEHAVIOR_PARQUET) else USER_BEHAVIOR_CSV
+
+
+# 加载数据并创建 user_behavior_view 临时视图
+# 目录按Parquet分区存储读取（event_date/user_bucket为分区列），文件按CSV读取（指定Schema，避免自动推断的误差）
+def load_user_behavior_view(spark, path=None, view_name="user_behavior_view"):
+    path = path or default_user_behavior_source()
+    if os.path.isdir(path):
+        df = spark.read.parquet(path)
+    else:
+        df = spark.read \
+            .csv(path,
+                 header=False,
+                 schema=get_user_behavior_schema())
+    print(f"[+] 用户行为数据源: {path}")
+    df.createOrReplaceTempView(view_name)
+    return df
@@ -0,0 +1,178 @@
+# 用户行为数据的分区列式存储
+# 一次性把 user_behavior_10m.csv 转换为Parquet：按事件日期(event_date)分区，再按用户ID哈希分桶(user_bucket)，
+# 每个文件内按 action、user_id 排序，使行组的min/max统计信息可用于谓词下推。
+# 之后Spark和非Spark（pyarrow/NumPy）后端都直接读取该目录，"只看购买""最近3天留存""某个用户"等查询
+# 只会读取相关的分区文件和行组，不再每次重新解析CSV
+# 运行：python ecommerce_parquet_store.py [--engine spark|arrow] [--buckets 16]
+
+import os
+import sys
+import time
+import zlib
+import argparse
+from datetime import date, timedelta
+
+from ecommerce_common import USER_BEHAVIOR_CSV, USER_BEHAVIOR_COLUMNS, USER_BEHAVIOR_PARQUET
+
+NUM_USER_BUCKETS = 16
+
+
+# 用户ID所在的分桶：CRC32(UTF-8字节) % 分桶数，Spark中为 crc32(CAST(user_id AS BINARY)) % 分桶数
+def user_bucket(user_id, num_buckets=NUM_USER_BUCKETS):
+    return zlib.crc32(user_id.encode('utf-8')) % num_buckets
+
+
+# 使用Spark转换：event_date按会话时区计算，与 DATE(FROM_UNIXTIME(timestamp)) 一致
+def ingest_with_spark(csv_path=USER_BEHAVIOR_CSV, output_path=USER_BEHAVIOR_PARQUET, num_buckets=NUM_USER_BUCKETS):
+    from pyspark.sql.functions import col, crc32, from_unixtime, to_date
+    from spark_session_factory import create_spark_session
+    from ecommerce_common import load_user_behavior_view
+
+    spark = create_spark_session("UserBehaviorIngest", input_paths=[csv_path])
+    df = load_user_behavior_view(spark, csv_path)
+    df = df \
+        .withColumn("event_date", to_date(from_unixtime(col("timestamp")))) \
+        .withColumn("user_bucket", crc32(col("user_id").cast("binary")) % num_buckets)
+    df.repartition("event_date", "user_bucket") \
+        .sortWithinPartitions("action", "user_id") \
+        .write \
+        .partitionBy("event_date", "user_bucket") \
+        .parquet(output_path, mode="overwrite", compression="snappy")
+    spark.stop()
+
+
+# 不依赖Spark的转换（pyarrow），event_date按本机时区计算
+def ingest_with_arrow(csv_path=USER_BEHAVIOR_CSV, output_path=USER_BEHAVIOR_PARQUET, num_buckets=NUM_USER_BUCKETS):
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pv
+    import pyarrow.dataset as ds
+
+    column_types = {"user_id": pa.string(), "item_id": pa.string(), "action": pa.string(),
+                    "timestamp": pa.int64(), "category": pa.string()}
+    table = pv.read_csv(csv_path,
+                        read_options=pv.ReadOptions(column_names=USER_BEHAVIOR_COLUMNS),
+                        convert_options=pv.ConvertOptions(column_types=column_types))
+
+    # 按数据中位时间的本机时区偏移换算日期
+    timestamps = table["timestamp"].to_numpy(zero_copy_only=False)
+    valid = ~np.isnan(timestamps.astype(np.float64))
+    utc_offset = time.localtime(int(np.median(timestamps[valid]))).tm_gmtoff if valid.any() else 0
+    local_seconds = pc.add(table["timestamp"], utc_offset)
+    event_date = pc.cast(pc.cast(pc.multiply(local_seconds, 1000), pa.timestamp("ms")), pa.date32())
+
+    # 每个不同的用户ID只计算一次分桶
+    user_dictionary = pc.dictionary_encode(table["user_id"]).combine_chunks()
+    bucket_of_user = pa.array([user_bucket(user_id, num_buckets) for user_id in user_dictionary.dictionary.to_pylist()],
+                              type=pa.int32())
+    buckets = pc.take(bucket_of_user, user_dictionary.indices)
+
+    table = table.append_column("event_date", event_date).append_column("user_bucket", buckets)
+    table = table.sort_by([("event_date", "ascending"), ("user_bucket", "ascending"),
+                           ("action", "ascending"), ("user_id", "ascending")])
+    ds.write_dataset(table, output_path, format="parquet",
+                     partitioning=ds.partitioning(
+                         pa.schema([("event_date", pa.date32()), ("user_bucket", pa.int32())]), flavor="hive"),
+                     existing_data_behavior="delete_matching")
+
+
+# Spark读取：分区列上的条件做分区裁剪，action等条件下推到Parquet行组统计信息
+def spark_read_behavior(spark, path=USER_BEHAVIOR_PARQUET, actions=None, start_date=None, end_date=None,
+                        user_ids=None, num_buckets=NUM_USER_BUCKETS):
+    from pyspark.sql.functions import col
+    df = spark.read.parquet(path)
+    if start_date is not None:
+        df = df.filter(col("event_date") >= start_date)
+    if end_date is not None:
+        df = df.filter(col("event_date") <= end_date)
+    if actions is not None:
+        df = df.filter(col("action").isin(list(actions)))
+    if user_ids is not None:
+        buckets = sorted({user_bucket(user_id, num_buckets) for user_id in user_ids})
+        df = df.filter(col("user_bucket").isin(buckets) & col("user_id").isin(list(user_ids)))
+    return df
+
+
+# 构造pyarrow数据集的过滤表达式（含分区列条件，用于裁剪文件）
+def arrow_filter(actions=None, start_date=None, end_date=None, user_ids=None, num_buckets=NUM_USER_BUCKETS):
+    import pyarrow.dataset as ds
+    conditions = []
+    if start_date is not None:
+        conditions.append(ds.field("event_date") >= start_date)
+    if end_date is not None:
+        conditions.append(ds.field("event_date") <= end_date)
+    if actions is not None:
+        conditions.append(ds.field("action").isin(list(actions)))
+    if user_ids is not None:
+        buckets = sorted({user_bucket(user_id, num_buckets) for user_id in user_ids})
+        conditions.append(ds.field("user_bucket").isin(buckets))
+        conditions.append(ds.field("user_id").isin(list(user_ids)))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+# 显式指定分区列类型，否则event_date会被推断为字符串，无法与日期比较
+def open_arrow_dataset(path=USER_BEHAVIOR_PARQUET):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    partitioning = ds.partitioning(pa.schema([("event_date", pa.date32()), ("user_bucket", pa.int32())]),
+                                   flavor="hive")
+    return ds.dataset(path, format="parquet", partitioning=partitioning)
+
+
+# 非Spark读取：返回只包含原始五列的pandas DataFrame
+def arrow_read_behavior(path=USER_BEHAVIOR_PARQUET, **filters):
+    dataset = open_arrow_dataset(path)
+    table = dataset.to_table(columns=USER_BEHAVIOR_COLUMNS, filter=arrow_filter(**filters))
+    return table.to_pandas()
+
+
+# 统计某个查询实际需要读取的文件数
+def count_arrow_files(path=USER_BEHAVIOR_PARQUET, **filters):
+    dataset = open_arrow_dataset(path)
+    expression = arrow_filter(**filters)
+    selected = dataset.get_fragments(filter=expression) if expression is not None else dataset.get_fragments()
+    return len(list(selected)), len(dataset.files)
+
+
+# 分区目录中最新的事件日期
+def latest_event_date(path=USER_BEHAVIOR_PARQUET):
+    dates = [name.split("=", 1)[1] for name in os.listdir(path) if name.startswith("event_date=")]
+    dates = [value for value in dates if value[:1].isdigit()]
+    return date.fromisoformat(max(dates)) if dates else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="将用户行为CSV转换为分区Parquet存储")
+    parser.add_argument("--engine", choices=["spark", "arrow"], default="spark", help="转换使用的引擎")
+    parser.add_argument("--buckets", type=int, default=NUM_USER_BUCKETS, help="user_id分桶数")
+    parser.add_argument("--input", default=USER_BEHAVIOR_CSV)
+    parser.add_argument("--output", default=USER_BEHAVIOR_PARQUET)
+    args = parser.parse_args()
+
+    print(f"=== 转换 {args.input} -> {args.output}（引擎: {args.engine}，分桶数: {args.buckets}） ===")
+    start_time = time.time()
+    if args.engine == "spark":
+        ingest_with_spark(args.input, args.output, args.buckets)
+    else:
+        ingest_with_arrow(args.input, args.output, args.buckets)
+    print(f"转换耗时: {time.time() - start_time:.2f} 秒")
+
+    # 演示分区裁剪效果：只看购买 / 最近3天 需要读取的文件数
+    try:
+        latest = latest_event_date(args.output)
+        selected, total = count_arrow_files(args.output, actions=["buy"])
+        print(f"只看购买: 读取 {selected}/{total} 个文件（其余行组由统计信息跳过）")
+        if latest is not None:
+            start = latest - timedelta(days=3)
+            selected, total = count_arrow_files(args.output, start_date=start)
+            print(f"最近3天留存（{start} 起）: 读取 {selected}/{total} 个文件")
+    except ImportError:
+        print("未安装pyarrow，跳过分区裁剪统计")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
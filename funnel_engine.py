@@ -0,0 +1,114 @@
+# 转化漏斗引擎：判断每个(用户, 商品)是否按顺序完成了各漏斗环节
+# 原方案对全部1000万行做 ROW_NUMBER() OVER (PARTITION BY user_id, item_id ORDER BY timestamp)，需要全量排序；
+# 这里逐个环节推进“到达时间”：第一个环节取首次发生时间，之后每个环节取不早于上一环节到达时间的最早一次，
+# 每一步只是按(用户, 商品)的等值连接加MIN聚合，不对组内的行为排序。
+# 支持任意有序的环节列表和可选的时间窗口（从第一个环节开始到后续环节的最长间隔）
+
+import re
+import sys
+import time
+
+DEFAULT_FUNNEL_STAGES = ["click", "collect", "cart", "buy"]
+
+_STAGE_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _check_stages(stages):
+    if len(stages) < 2:
+        raise ValueError("漏斗至少需要两个环节")
+    for stage in stages:
+        # 环节名会用作SQL列名和字符串常量
+        if not _STAGE_NAME_PATTERN.match(stage):
+            raise ValueError(f"非法的漏斗环节名: {stage}")
+    if len(set(stages)) != len(stages):
+        raise ValueError("漏斗环节不能重复")
+
+
+# 生成每个(用户, 商品)的漏斗深度SQL
+def build_funnel_depth_sql(stages=DEFAULT_FUNNEL_STAGES, window_seconds=None, source_view="user_behavior_view"):
+    """
+    逐个环节计算到达时间：t0为第一个环节的首次发生时间，ti为第i个环节中不早于t(i-1)的最早一次
+    （有时间窗口时还要求距t0不超过窗口），某个环节没有满足条件的行为时ti为NULL，之后的环节也都为NULL。
+    按到达时间推进而不是比较各环节的首次时间，后面的环节在前面的环节之前也发生过时（如 收藏→点击→收藏）
+    仍能判断出按顺序完成的路径；不为NULL的到达时间个数即为该(用户, 商品)到达的漏斗深度
+    """
+    _check_stages(stages)
+    stage_list = ", ".join(f"'{stage}'" for stage in stages)
+    steps = [f"""reached0 AS (
+  SELECT user_id, item_id, MIN(CASE WHEN action = '{stages[0]}' THEN timestamp END) AS t0
+  FROM {source_view}
+  WHERE action IN ({stage_list}) AND timestamp IS NOT NULL
+  GROUP BY user_id, item_id
+)"""]
+    for i in range(1, len(stages)):
+        previous = ", ".join(f"r.t{j}" for j in range(i))
+        window = f" AND s.timestamp - r.t0 <= {int(window_seconds)}" if window_seconds is not None else ""
+        steps.append(f"""reached{i} AS (
+  SELECT r.user_id, r.item_id, {previous}, MIN(s.timestamp) AS t{i}
+  FROM reached{i - 1} r
+  LEFT JOIN {source_view} s
+    ON s.user_id = r.user_id AND s.item_id = r.item_id AND s.action = '{stages[i]}'
+    AND s.timestamp >= r.t{i - 1}{window}
+  GROUP BY r.user_id, r.item_id, {previous}
+)""")
+    depth_cases = "\n".join(f"    WHEN t{depth - 1} IS NOT NULL THEN {depth}" for depth in range(len(stages), 0, -1))
+    ctes = ",\n".join(steps)
+    return f"""
+WITH {ctes}
+SELECT
+  user_id,
+  item_id,
+  CASE
+{depth_cases}
+    ELSE 0
+  END AS funnel_depth
+FROM reached{len(stages) - 1}
+"""
+
+
+# 创建漏斗相关的临时视图：funnel_depth_view、funnel_user_count_view、funnel_conversion_view
+# 列名与原方案一致：各环节独立用户数 {环节}_user，相邻环节转化率 {上一环节}_to_{环节}，整体转化率 overall_conversion
+def create_funnel_views(spark, stages=DEFAULT_FUNNEL_STAGES, window_seconds=None, source_view="user_behavior_view"):
+    depth_sql = build_funnel_depth_sql(stages, window_seconds, source_view)
+    spark.sql(depth_sql).createOrReplaceTempView("funnel_depth_view")
+
+    user_counts = [
+        f"COUNT(DISTINCT CASE WHEN funnel_depth >= {i + 1} THEN user_id END) AS {stage}_user"
+        for i, stage in enumerate(stages)
+    ]
+    spark.sql("SELECT\n  " + ",\n  ".join(user_counts) + "\nFROM funnel_depth_view") \
+        .createOrReplaceTempView("funnel_user_count_view")
+
+    conversions = [
+        f"ROUND({stage}_user / {previous}_user * 100, 2) AS {previous}_to_{stage}"
+        for previous, stage in zip(stages, stages[1:])
+    ]
+    conversions.append(f"ROUND({stages[-1]}_user / {stages[0]}_user * 100, 2) AS overall_conversion")
+    spark.sql("SELECT\n  " + ",\n  ".join(conversions) + "\nFROM funnel_user_count_view") \
+        .createOrReplaceTempView("funnel_conversion_view")
+    return spark.table("funnel_conversion_view")
+
+
+def main():
+    # 运行：python funnel_engine.py [click,collect,cart,buy] [窗口小时数]
+    from spark_session_factory import create_spark_session
+    from ecommerce_common import default_user_behavior_source, load_user_behavior_view
+
+    stages = sys.argv[1].split(",") if len(sys.argv) > 1 else DEFAULT_FUNNEL_STAGES
+    window_seconds = int(float(sys.argv[2]) * 3600) if len(sys.argv) > 2 else None
+
+    spark = create_spark_session("FunnelEngine", input_paths=[default_user_behavior_source()])
+    load_user_behavior_view(spark)
+
+    window_text = f"{window_seconds / 3600:g} 小时" if window_seconds is not None else "不限"
+    print(f"=== 转化漏斗: {' → '.join(stages)}（时间窗口: {window_text}） ===")
+    start_time = time.time()
+    conversion = create_funnel_views(spark, stages, window_seconds)
+    spark.table("funnel_user_count_view").show()
+    conversion.show()
+    print(f"漏斗计算耗时: {time.time() - start_time:.2f} 秒")
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# 增量计算次日留存率（任务2.4）和商品复购率（任务2.3）
+# 原脚本每次运行都对全部历史数据重新做 DISTINCT (用户, 日期) 和 LAG；
+# 这里在SQLite中持久化两类状态：每个用户按天的活跃位图、每个(用户, 商品)的购买次数（以及由它维护的商品级计数），
+# 每天只读取新一天的行为数据更新状态，向 output/sql_advanced_retention 追加一行，并由商品级计数重写复购率结果
+# 运行：
+#   python incremental_retention.py --rebuild             用全部历史数据初始化状态并重写两个结果目录
+#   python incremental_retention.py --date 2023-11-20     只处理一天的数据（可用 --input 指定当天的CSV文件）
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+import numpy as np
+
+from ecommerce_analysis_numpy import (SPARK_OUTPUT_ROOT, load_behavior_data, spark_round,
+                                      format_value, write_result)
+
+STATE_DB = "output/incremental_state.db"
+
+RETENTION_NAME = "sql_advanced_retention"
+RETENTION_HEADER = ["current_date", "current_active_user", "retained_user", "day2_retention_rate"]
+REPURCHASE_NAME = "sql_advanced_repurchase"
+REPURCHASE_HEADER = ["item_id", "total_buy_user", "repurchase_user", "repurchase_rate"]
+
+
+def day_to_date(day):
+    return str(np.datetime64(int(day), "D"))
+
+
+def date_to_day(date_text):
+    return int(np.datetime64(date_text, "D").astype(np.int64))
+
+
+# 位图以小端字节序存储，第i位表示 base_day + i 当天是否活跃
+def _bitmap_to_blob(bitmap):
+    return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+
+
+def _blob_to_bitmap(blob):
+    return int.from_bytes(blob, "little") if blob else 0
+
+
+class RetentionState:
+    """
+    留存/复购的持久化状态（SQLite）
+
+    user_activity: 用户 -> 活跃位图（相对 base_day 的天数偏移）
+    user_item_buy: (用户, 商品) -> 购买次数
+    item_buy_stats: 商品 -> (购买用户数, 复购用户数)，随 user_item_buy 同步维护
+    daily_retention: 已处理日期的留存结果
+
+    日期必须按顺序处理：已处理过的日期会被跳过，早于最后处理日期的新日期会报错
+    """
+
+    def __init__(self, path=STATE_DB):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+        CREATE TABLE IF NOT EXISTS user_activity (user_id TEXT PRIMARY KEY, bitmap BLOB);
+        CREATE TABLE IF NOT EXISTS user_item_buy (
+          user_id TEXT, item_id TEXT, buy_times INTEGER, PRIMARY KEY (user_id, item_id));
+        CREATE TABLE IF NOT EXISTS item_buy_stats (
+          item_id TEXT PRIMARY KEY, total_buy_user INTEGER, repurchase_user INTEGER);
+        CREATE TABLE IF NOT EXISTS daily_retention (
+          day INTEGER PRIMARY KEY, current_active_user INTEGER, retained_user INTEGER, day2_retention_rate REAL);
+        """)
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def last_day(self):
+        return self._get_meta("last_day")
+
+    # 清空全部状态（--rebuild 时使用）
+    def reset(self):
+        for table in ["meta", "user_activity", "user_item_buy", "item_buy_stats", "daily_retention"]:
+            self.conn.execute(f"DELETE FROM {table}")
+        self.conn.commit()
+
+    # 处理一天的数据，返回当天的留存结果行；该日期已处理过时返回None
+    def add_day(self, day, active_users, buy_counts):
+        """
+        Args:
+            day: 日期（自1970-01-01起的天数）
+            active_users: 当天活跃的用户ID集合
+            buy_counts: {(用户ID, 商品ID): 当天购买次数}
+        """
+        last_day = self.last_day
+        if last_day is not None and day <= last_day:
+            if self.conn.execute("SELECT 1 FROM daily_retention WHERE day = ?", (day,)).fetchone():
+                return None
+            raise ValueError(f"{day_to_date(day)} 早于最后处理的日期 {day_to_date(last_day)}，需要使用 --rebuild 重建状态")
+
+        base_day = self._get_meta("base_day")
+        if base_day is None:
+            base_day = day
+            self._set_meta("base_day", base_day)
+        bit = day - base_day
+
+        # 1. 更新活跃位图，前一天的位已置位即为留存用户；当天的用户写入临时表，一次连接查询取出全部已有位图
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS day_users (user_id TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM day_users")
+        self.conn.executemany("INSERT OR IGNORE INTO day_users (user_id) VALUES (?)",
+                              ((user_id,) for user_id in active_users))
+        retained_user = 0
+        updates = []
+        for user_id, blob in self.conn.execute(
+                "SELECT d.user_id, a.bitmap FROM day_users d LEFT JOIN user_activity a ON a.user_id = d.user_id"):
+            bitmap = _blob_to_bitmap(blob)
+            if bit > 0 and bitmap >> (bit - 1) & 1:
+                retained_user += 1
+            updates.append((user_id, _bitmap_to_blob(bitmap | 1 << bit)))
+        self.conn.executemany("INSERT OR REPLACE INTO user_activity (user_id, bitmap) VALUES (?, ?)", updates)
+
+        # 2. 更新(用户, 商品)购买次数，并同步商品的购买用户数/复购用户数（同样通过临时表批量取出之前的次数）
+        self.conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS day_buys (
+          user_id TEXT, item_id TEXT, buy_times INTEGER, PRIMARY KEY (user_id, item_id))""")
+        self.conn.execute("DELETE FROM day_buys")
+        self.conn.executemany("INSERT INTO day_buys (user_id, item_id, buy_times) VALUES (?, ?, ?)",
+                              ((user_id, item_id, count) for (user_id, item_id), count in buy_counts.items()))
+        buy_updates = []
+        item_deltas = {}
+        for user_id, item_id, count, previous in self.conn.execute("""
+        SELECT d.user_id, d.item_id, d.buy_times, COALESCE(b.buy_times, 0)
+        FROM day_buys d LEFT JOIN user_item_buy b ON b.user_id = d.user_id AND b.item_id = d.item_id"""):
+            current = previous + count
+            buy_updates.append((user_id, item_id, current))
+            new_buyer, new_repurchaser = item_deltas.get(item_id, (0, 0))
+            item_deltas[item_id] = (new_buyer + (1 if previous == 0 else 0),
+                                    new_repurchaser + (1 if previous < 2 <= current else 0))
+        self.conn.executemany("INSERT OR REPLACE INTO user_item_buy (user_id, item_id, buy_times) VALUES (?, ?, ?)",
+                              buy_updates)
+        self.conn.executemany("""
+        INSERT INTO item_buy_stats (item_id, total_buy_user, repurchase_user) VALUES (?, ?, ?)
+        ON CONFLICT(item_id) DO UPDATE SET
+          total_buy_user = total_buy_user + excluded.total_buy_user,
+          repurchase_user = repurchase_user + excluded.repurchase_user
+        """, [(item_id, new_buyer, new_repurchaser) for item_id, (new_buyer, new_repurchaser) in item_deltas.items()])
+
+        row = [day_to_date(day), len(active_users), retained_user, spark_round(retained_user, len(active_users))]
+        self.conn.execute("INSERT INTO daily_retention VALUES (?, ?, ?, ?)", (day, row[1], row[2], row[3]))
+        self._set_meta("last_day", day)
+        self.conn.commit()
+        return row
+
+    def retention_rows(self):
+        return [[day_to_date(day), active, retained, rate] for day, active, retained, rate in
+                self.conn.execute("SELECT * FROM daily_retention ORDER BY day")]
+
+    # 与任务2.3的结果一致，按复购率降序
+    def repurchase_rows(self):
+        rows = []
+        for item_id, total_buy_user, repurchase_user in self.conn.execute("SELECT * FROM item_buy_stats"):
+            rows.append([item_id, total_buy_user, repurchase_user, spark_round(repurchase_user, total_buy_user)])
+        rows.sort(key=lambda row: -row[3])
+        return rows
+
+    def close(self):
+        self.conn.close()
+
+
+# 从BehaviorData中提取某一天的活跃用户集合和(用户, 商品)购买次数
+def extract_day(data, day):
+    in_day = data.has_timestamp & (data.day == day) & (data.user >= 0)
+    active_users = {data.user_ids[code] for code in np.unique(data.user[in_day])}
+
+    buy = in_day & (data.action == data.action_code("buy")) & (data.item >= 0)
+    pair = data.user[buy].astype(np.int64) * len(data.item_ids) + data.item[buy]
+    pairs, counts = np.unique(pair, return_counts=True)
+    buy_counts = {(data.user_ids[p // len(data.item_ids)], data.item_ids[p % len(data.item_ids)]): int(count)
+                  for p, count in zip(pairs, counts)}
+    return active_users, buy_counts
+
+
+# 向Spark输出目录追加一行：写为一个新的带表头的part文件，Spark读取目录和read_spark_result都会合并全部part文件
+def append_result_row(name, header, row, suffix, output_root=SPARK_OUTPUT_ROOT):
+    output_dir = os.path.join(output_root, name)
+    os.makedirs(output_dir, exist_ok=True)
+    part_file = os.path.join(output_dir, f"part-incremental-{suffix}.csv")
+    with open(part_file, 'w', encoding='utf-8') as f:
+        f.write(",".join(header) + "\n")
+        f.write(",".join(format_value(value) for value in row) + "\n")
+
+
+# 用全部历史数据重建状态，并重写留存和复购结果
+def rebuild(state, path=None):
+    data = load_behavior_data(path)
+    state.reset()
+    days = np.unique(data.day[data.has_timestamp & (data.user >= 0)])
+    for day in days:
+        active_users, buy_counts = extract_day(data, int(day))
+        state.add_day(int(day), active_users, buy_counts)
+    write_result(RETENTION_NAME, RETENTION_HEADER, state.retention_rows(), SPARK_OUTPUT_ROOT)
+    write_result(REPURCHASE_NAME, REPURCHASE_HEADER, state.repurchase_rows(), SPARK_OUTPUT_ROOT)
+    return len(days)
+
+
+# 只处理一天的数据：输入为Parquet存储时只读取该日期的分区，为CSV时边读边过滤，只保留该日期的行
+def process_day(state, date_text, path=None):
+    day = date_to_day(date_text)
+    data = load_behavior_data(path, start_date=np.datetime64(date_text, "D").item(),
+                              end_date=np.datetime64(date_text, "D").item())
+    active_users, buy_counts = extract_day(data, day)
+    row = state.add_day(day, active_users, buy_counts)
+    if row is None:
+        print(f"{date_text} 已处理过，跳过")
+        return None
+    append_result_row(RETENTION_NAME, RETENTION_HEADER, row, date_text)
+    write_result(REPURCHASE_NAME, REPURCHASE_HEADER, state.repurchase_rows(), SPARK_OUTPUT_ROOT)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量计算次日留存率和商品复购率")
+    parser.add_argument("--date", help="要处理的日期（YYYY-MM-DD）")
+    parser.add_argument("--input", help="行为数据（默认Parquet存储，不存在时为CSV）")
+    parser.add_argument("--state", default=STATE_DB, help="状态数据库路径")
+    parser.add_argument("--rebuild", action="store_true", help="用全部历史数据重建状态")
+    args = parser.parse_args()
+    if not args.rebuild and not args.date:
+        parser.error("需要指定 --date 或 --rebuild")
+
+    state = RetentionState(args.state)
+    start_time = time.time()
+    try:
+        if args.rebuild:
+            num_days = rebuild(state, args.input)
+            print(f"=== 已用 {num_days} 天的历史数据重建状态 ===")
+        if args.date:
+            row = process_day(state, args.date, args.input)
+            if row is not None:
+                print("=== 新增次日留存 ===")
+                print(dict(zip(RETENTION_HEADER, row)))
+    finally:
+        state.close()
+    print(f"耗时: {time.time() - start_time:.2f} 秒")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
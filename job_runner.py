@@ -0,0 +1,238 @@
+# 参数化分析任务执行器：每个任务是一个带名称、参数和依赖声明的查询节点
+# 执行分两步：
+#   1. 按依赖顺序在主线程中定义全部所需节点的临时视图（CREATE TEMPORARY VIEW 是惰性的，不触发计算）
+#   2. 依赖已完成的节点提交到线程池，在共享的SparkSession上并发执行保存/输出等动作
+# 节点的指纹由输入数据签名、节点代码（含其用到的辅助模块/函数）、所用参数和依赖节点的指纹组成，
+# 与上次成功执行时相同且输出仍存在时跳过；没有声明输出的节点（只在终端输出结果）每次都执行
+
+import os
+import json
+import time
+import hashlib
+import inspect
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+JOB_STATE_FILE = "output/job_state.json"
+
+
+class QueryNode:
+    """
+    查询节点
+
+    Args:
+        name: 节点名称（--tasks 中使用）
+        define: define(spark, params)，创建该节点的临时视图（惰性）
+        execute: execute(spark, params)，保存/输出结果
+        depends: 依赖的节点名称列表
+        params: 节点用到的参数名称列表（参数变化时节点重新执行）
+        outputs: 节点的输出路径（支持 {参数名} 格式化），任一输出不存在时节点重新执行
+        helpers: 节点用到的辅助模块或函数，其源码计入节点代码（如漏斗节点的funnel_engine模块）
+    """
+
+    def __init__(self, name, define=None, execute=None, depends=(), params=(), outputs=(), helpers=()):
+        self.name = name
+        self.define = define
+        self.execute = execute
+        self.depends = list(depends)
+        self.params = list(params)
+        self.outputs = list(outputs)
+        self.helpers = list(helpers)
+
+    def output_paths(self, params):
+        return [output.format(**params) for output in self.outputs]
+
+    def code_signature(self):
+        return code_source([self.define, self.execute] + self.helpers)
+
+
+# 函数/模块的源码，取不到源码时使用其名称
+def code_source(objects):
+    sources = []
+    for obj in objects:
+        if obj is None:
+            continue
+        try:
+            sources.append(inspect.getsource(obj))
+        except (OSError, TypeError):
+            sources.append(getattr(obj, "__qualname__", None) or obj.__name__)
+    return "\n".join(sources)
+
+
+# 输入数据签名：路径下全部文件的 (路径, 大小, 修改时间)
+def input_signature(paths):
+    entries = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    stat = os.stat(file_path)
+                    entries.append((file_path, stat.st_size, int(stat.st_mtime)))
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            entries.append((path, stat.st_size, int(stat.st_mtime)))
+    return hashlib.sha1(json.dumps(sorted(entries)).encode("utf-8")).hexdigest()
+
+
+class JobRunner:
+    """
+    按依赖关系执行查询节点
+
+    Args:
+        spark: 共享的SparkSession
+        nodes: QueryNode列表
+        params: 参数字典
+        input_paths: 输入数据路径，用于判断输入是否变化
+        workers: 并发执行的节点数
+        state_file: 记录各节点上次成功执行时指纹的文件
+        force: 为True时不跳过任何节点
+        shared_code: 所有节点共用的辅助模块或函数（如结果写出模块），其源码计入每个节点的指纹
+        task_tracker: 提供 track_task(节点名称) 上下文管理器的对象（如view_cache.ViewMaterializer），
+            用于统计每个节点执行期间的源文件扫描次数
+    """
+
+    def __init__(self, spark, nodes, params, input_paths, workers=4, state_file=JOB_STATE_FILE, force=False,
+                 shared_code=(), task_tracker=None):
+        self.spark = spark
+        self.nodes = {node.name: node for node in nodes}
+        self.params = params
+        self.input_paths = list(input_paths)
+        self.workers = max(1, workers)
+        self.state_file = state_file
+        self.force = force
+        self.shared_code = list(shared_code)
+        self.task_tracker = task_tracker
+        self.timings = []
+
+    # 选中的节点及其全部依赖，按依赖顺序排列
+    def resolve(self, task_names=None):
+        task_names = list(self.nodes) if not task_names else task_names
+        ordered, visiting = [], set()
+
+        def visit(name):
+            if name not in self.nodes:
+                raise ValueError(f"未知的任务: {name}，可选: {', '.join(self.nodes)}")
+            if name in ordered:
+                return
+            if name in visiting:
+                raise ValueError(f"任务依赖存在环: {name}")
+            visiting.add(name)
+            for dependency in self.nodes[name].depends:
+                visit(dependency)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for name in task_names:
+            visit(name)
+        return ordered
+
+    def _load_state(self):
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        with open(self.state_file, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, ensure_ascii=False)
+
+    def _fingerprints(self, ordered):
+        source = input_signature(self.input_paths)
+        shared_code = hashlib.sha1(code_source(self.shared_code).encode("utf-8")).hexdigest()
+        fingerprints = {}
+        for name in ordered:
+            node = self.nodes[name]
+            content = {
+                "input": source,
+                "code": node.code_signature(),
+                "shared_code": shared_code,
+                "params": {key: self.params[key] for key in node.params},
+                "depends": [fingerprints[dependency] for dependency in node.depends],
+            }
+            fingerprints[name] = hashlib.sha1(
+                json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return fingerprints
+
+    def _is_unchanged(self, node, fingerprint, state):
+        # 没有输出的节点无法确认结果仍然有效，总是执行
+        if self.force or not node.outputs or state.get(node.name) != fingerprint:
+            return False
+        return all(os.path.exists(path) for path in node.output_paths(self.params))
+
+    def _execute(self, name):
+        node = self.nodes[name]
+        self.spark.sparkContext.setJobDescription(f"任务 {name}")
+        start_time = time.time()
+        with self.task_tracker.track_task(name) if self.task_tracker else nullcontext():
+            if node.execute is not None:
+                node.execute(self.spark, self.params)
+        return time.time() - start_time
+
+    # 执行选中的节点，返回 [(节点名称, 状态, 耗时)]
+    def run(self, task_names=None):
+        ordered = self.resolve(task_names)
+        fingerprints = self._fingerprints(ordered)
+        state = self._load_state()
+
+        # 1. 定义全部视图（惰性），被跳过的节点的视图也要定义，供需要重新执行的下游节点使用
+        for name in ordered:
+            if self.nodes[name].define is not None:
+                self.nodes[name].define(self.spark, self.params)
+
+        # 2. 依赖完成的节点并发执行
+        pending = list(ordered)
+        finished = set()
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    node = self.nodes[name]
+                    if not all(dependency in finished for dependency in node.depends):
+                        continue
+                    pending.remove(name)
+                    if self._is_unchanged(node, fingerprints[name], state):
+                        print(f"[任务] {name}: 输入未变化，跳过")
+                        self.timings.append((name, "跳过", 0.0))
+                        finished.add(name)
+                        continue
+                    running[executor.submit(self._execute, name)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    duration = future.result()
+                    print(f"[任务] {name}: 完成，耗时 {duration:.2f} 秒")
+                    self.timings.append((name, "完成", duration))
+                    state[name] = fingerprints[name]
+                    self._save_state(state)
+                    finished.add(name)
+        return self.timings
+
+    def report(self):
+        print("\n=== 各任务耗时 ===")
+        for name, status, duration in self.timings:
+            print(f"{name}: {status}，耗时 {duration:.2f} 秒")
+
+
+# 解析 --param key=value，按默认值的类型转换（None默认值按原字符串保存）
+def parse_params(defaults, assignments):
+    params = dict(defaults)
+    for assignment in assignments or []:
+        if "=" not in assignment:
+            raise ValueError(f"参数格式应为 key=value: {assignment}")
+        key, value = assignment.split("=", 1)
+        if key not in defaults:
+            raise ValueError(f"未知的参数: {key}，可选: {', '.join(defaults)}")
+        default = defaults[key]
+        if isinstance(default, bool):
+            params[key] = value.lower() in ("1", "true", "yes")
+        elif isinstance(default, (int, float)):
+            params[key] = type(default)(value)
+        elif isinstance(default, (list, tuple)):
+            params[key] = value.split(",")
+        else:
+            params[key] = value
+    return params
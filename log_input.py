@@ -0,0 +1,138 @@
+# 日志输入工具：支持通配符匹配多个轮转日志，以及 .gz / .bz2 / .zst 压缩日志
+# 解压在独立的生产者线程中进行（zlib/bz2/zstd解压时会释放GIL），
+# 通过有界队列把解压后的数据块交给解析线程，使解压与解析重叠执行
+
+import os
+import bz2
+import glob
+import gzip
+import time
+import queue
+import threading
+
+try:
+    import zstandard
+except ImportError:  # zstd为可选依赖，只有读取 .zst 文件时才需要
+    zstandard = None
+
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".zst")
+CHUNK_SIZE = 4 * 1024 * 1024  # 每次从解压流读取的字节数
+QUEUE_SIZE = 8  # 生产者最多预先解压的数据块数量
+
+_END_OF_STREAM = object()
+
+
+# 展开路径/通配符列表，返回去重并排序后的文件列表
+def expand_log_paths(patterns):
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths = []
+    for pattern in patterns:
+        matched = glob.glob(pattern)
+        if not matched:
+            print(f"[-] 没有找到匹配的日志文件: {pattern}")
+        paths.extend(path for path in matched if os.path.isfile(path))
+    return sorted(set(paths))
+
+
+def is_compressed(path):
+    return path.endswith(COMPRESSED_SUFFIXES)
+
+
+# 以二进制方式打开日志文件，压缩文件自动解压
+def open_log(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rb')
+    if path.endswith(".bz2"):
+        return bz2.open(path, 'rb')
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("读取 .zst 日志需要安装 zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+# 向队列放入数据，消费者已停止时放弃并返回False
+def _put(chunks, item, stop_event):
+    while not stop_event.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+# 生产者：持续读取（解压）数据块放入队列，直到文件结束或消费者停止
+def _produce_chunks(path, chunks, stop_event, chunk_size):
+    try:
+        with open_log(path) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk or not _put(chunks, chunk, stop_event):
+                    break
+    except Exception as e:
+        _put(chunks, e, stop_event)
+    _put(chunks, _END_OF_STREAM, stop_event)
+
+
+# 逐行读取日志（字符串），解压在后台线程进行；stats为LogThroughput时累计读取量
+def iter_log_lines(path, stats=None, chunk_size=CHUNK_SIZE, queue_size=QUEUE_SIZE):
+    chunks = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    producer = threading.Thread(target=_produce_chunks, args=(path, chunks, stop_event, chunk_size), daemon=True)
+    producer.start()
+
+    pending = b""
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _END_OF_STREAM:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            if stats is not None:
+                stats.decompressed_bytes += len(chunk)
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for raw_line in lines:
+                if stats is not None:
+                    stats.lines += 1
+                yield raw_line.decode('utf-8', errors='ignore') + "\n"
+        if pending:
+            if stats is not None:
+                stats.lines += 1
+            yield pending.decode('utf-8', errors='ignore')
+    finally:
+        # 消费者提前结束（如只采样前N行）时通知生产者退出
+        stop_event.set()
+        producer.join()
+
+
+class LogThroughput:
+    """记录日志读取的数据量和耗时，用于输出端到端吞吐量"""
+
+    def __init__(self):
+        self.files = 0
+        self.input_bytes = 0
+        self.decompressed_bytes = 0
+        self.lines = 0
+        self.start_time = time.time()
+
+    def add_file(self, path):
+        self.files += 1
+        self.input_bytes += os.path.getsize(path)
+
+    def merge(self, other):
+        self.files += other.files
+        self.input_bytes += other.input_bytes
+        self.decompressed_bytes += other.decompressed_bytes
+        self.lines += other.lines
+
+    def report(self, label="日志读取"):
+        duration = max(time.time() - self.start_time, 1e-9)
+        mb = 1024 * 1024
+        print(f"[{label}] 文件数: {self.files}，输入 {self.input_bytes / mb:.1f} MB，"
+              f"解压后 {self.decompressed_bytes / mb:.1f} MB，{self.lines} 行，耗时 {duration:.2f} 秒")
+        print(f"[{label}] 吞吐量: 输入 {self.input_bytes / mb / duration:.1f} MB/s，"
+              f"解压后 {self.decompressed_bytes / mb / duration:.1f} MB/s，{self.lines / duration:.0f} 行/秒")
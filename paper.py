@@ -1,9 +1,16 @@
-import random
 import time  # 修复：添加缺失的time模块导入
-import json  # 修复：添加缺失的json模块导入
-import requests
+import sys
+from itertools import islice
 from datetime import datetime
 from playwright.sync_api import sync_playwright
+from article_common import USER_AGENT, empty_article_data, clean_text, extract_doi_from_url
+from crossref_async import fetch_articles
+from doi_cache import DoiMetadataCache, CROSSREF_CACHE_DB
+from static_extract import REQUIRED_FIELDS, ExtractionStats, extract_article_static, is_complete
+from browser_pool import BROWSER_POOL_SIZE, PAGE_TIMEOUT_MS, extract_articles
+from article_store import ARTICLES_JSONL, ArticleJsonlWriter, compact_jsonl
+from url_input import InputStats, iter_unique_urls
+from rate_controller import AdaptiveRateController, HostLimits
 
 # 全局配置
 BASE_URL = "https://www.tandfonline.com"
@@ -11,17 +18,15 @@ JOURNALS_LIST_URL = f"{BASE_URL}/action/showPublications?pubType=journal"
 MAX_JOURNALS = 2  # 限制抓取的期刊数量，先从少量开始测试
 MAX_ARTICLES_PER_JOURNAL = 3  # 每个期刊最多抓取的文章数量
 OUTPUT_DIR = "."  # 输出目录
-CROSSREF_API_URL = "https://api.crossref.org/works/{doi}"  # Crossref API基础URL
+CROSSREF_CONCURRENCY = 8  # Crossref并发请求数
+CROSSREF_BATCH_SIZE = 100  # 每批并发请求的URL数
+CROSSREF_LOOKUP_BATCH = 20  # 每次 /works?filter=doi:... 批量查询的DOI数，0表示逐个DOI请求
+COMPACT_TO_JSON = True  # 抓取结束后是否把JSONL压缩为 Taylor_Francis_Articles_时间戳.json
 
-# 随机等待时间，模拟人类行为
-def random_wait(min_seconds=1, max_seconds=3):
-    time.sleep(random.uniform(min_seconds, max_seconds))
-
-# 清理文本函数
-def clean_text(text):
-    if text:
-        return ' '.join(text.strip().split())
-    return ""
+# 按主机的自适应速率控制（替代固定的随机等待）：文章页面平均不超过每秒1次，服务器正常时才逐步提速
+RATE_CONTROLLER = AdaptiveRateController({
+    "www.tandfonline.com": HostLimits(start_rate=0.5, max_rate=1.0, max_concurrency=BROWSER_POOL_SIZE),
+})
 
 # 初始化浏览器
 def init_browser():
@@ -38,7 +43,7 @@ def init_browser():
         ]
     )
     context = browser.new_context(
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        user_agent=USER_AGENT
     )
     page = context.new_page()
     
@@ -55,135 +60,15 @@ def init_browser():
     print("[+] 浏览器初始化完成")
     return playwright, browser, context, page
 
-# 从URL中提取DOI
-def extract_doi_from_url(url):
-    try:
-        # 从URL中提取DOI部分
-        if '/doi/' in url:
-            parts = url.split('/doi/')
-            if len(parts) > 1:
-                doi_part = parts[1].split('/')[0] if '/' in parts[1] else parts[1]
-                # 移除可能的查询参数
-                if '?' in doi_part:
-                    doi_part = doi_part.split('?')[0]
-                return doi_part
-        return None
-    except Exception as e:
-        print(f"[-] 从URL提取DOI失败: {str(e)}")
-        return None
-
-# 通过Crossref API获取文章信息
-def get_article_info_via_crossref(doi):
-    """
-    使用Crossref API获取文章信息
-    """
-    if not doi:
-        print("[-] 无效的DOI")
-        return None
-    
-    try:
-        # 构建完整的API URL
-        api_url = CROSSREF_API_URL.format(doi=doi)
-        print(f"[+] 正在通过Crossref API获取信息: {api_url}")
-        
-        # 设置请求头
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        }
-        
-        # 发送GET请求
-        response = requests.get(api_url, headers=headers, timeout=10)
-        response.raise_for_status()  # 如果状态码不是200，抛出异常
-        
-        # 解析JSON响应
-        data = response.json()
-        
-        if "message" in data:
-            message = data["message"]
-            article_data = {
-                "作者": "",
-                "标题": "",
-                "期刊名称": "",
-                "volume": "",
-                "issue": "",
-                "page": "",
-                "keywords": "",
-                "摘要": "",
-                "年份": "",
-                "URL": f"https://doi.org/{doi}"
-            }
-            
-            # 提取作者信息
-            if "author" in message:
-                authors = []
-                for author in message["author"]:
-                    if "given" in author and "family" in author:
-                        authors.append(f"{author['given']} {author['family']}")
-                    elif "name" in author:
-                        authors.append(author["name"])
-                article_data["作者"] = ", ".join(authors)
-            
-            # 提取标题信息
-            if "title" in message and message["title"]:
-                article_data["标题"] = clean_text(message["title"][0])
-            
-            # 提取期刊名称
-            if "container-title" in message and message["container-title"]:
-                article_data["期刊名称"] = clean_text(message["container-title"][0])
-            
-            # 提取volume信息
-            if "volume" in message:
-                article_data["volume"] = clean_text(str(message["volume"]))
-            
-            # 提取issue信息
-            if "issue" in message:
-                article_data["issue"] = clean_text(str(message["issue"]))
-            
-            # 提取page信息
-            if "page" in message:
-                article_data["page"] = clean_text(str(message["page"]))
-            
-            # 提取摘要信息
-            if "abstract" in message:
-                article_data["摘要"] = clean_text(message["abstract"])
-            
-            # 提取年份信息
-            if "published-print" in message and "date-parts" in message["published-print"]:
-                date_parts = message["published-print"]["date-parts"][0]
-                if date_parts and len(date_parts) > 0:
-                    article_data["年份"] = str(date_parts[0])
-            elif "published-online" in message and "date-parts" in message["published-online"]:
-                date_parts = message["published-online"]["date-parts"][0]
-                if date_parts and len(date_parts) > 0:
-                    article_data["年份"] = str(date_parts[0])
-            
-            return article_data
-        else:
-            print("[-] Crossref API响应中没有找到文章信息")
-            return None
-    except Exception as e:
-        print(f"[-] 通过Crossref API获取信息时出错: {str(e)}")
-        return None
-
 # 提取文章信息
 def extract_article_info(page, article_url):
-    article_data = {
-        "作者": "",
-        "标题": "",
-        "期刊名称": "",
-        "volume": "",
-        "issue": "",
-        "page": "",
-        "keywords": "",
-        "摘要": "",
-        "年份": "",
-        "URL": article_url
-    }
+    article_data = empty_article_data(article_url)
     
     try:
         print(f"[+] 正在访问文章页面: {article_url[:80]}...")
-        page.goto(article_url, wait_until="networkidle")
-        random_wait(3, 5)
+        with RATE_CONTROLLER.request(article_url, kind="browser") as call:
+            response = page.goto(article_url, wait_until="networkidle")
+            call["status"] = response.status if response else None
         
         # 提取文章标题
         try:
@@ -435,107 +320,173 @@ def extract_article_info(page, article_url):
     
     return article_data
 
+# 浏览器未取到的字段用静态HTML的结果补充
+def merge_static_fields(article_data, static_data):
+    for key, value in (static_data or {}).items():
+        if value and not article_data.get(key):
+            article_data[key] = value
+    return article_data
+
 # CrossAPI迭代方法 - 用于迭代处理多个URL
-def crossapi_iterate_urls(page, urls):
+def crossapi_iterate_urls(page, urls, concurrency=CROSSREF_CONCURRENCY, batch_size=CROSSREF_BATCH_SIZE, cache=None,
+                          stats=None, pool_size=BROWSER_POOL_SIZE, with_url=False):
     """
     使用迭代器模式处理多个URL，优先尝试通过Crossref API获取信息
+    每批URL的DOI先并发请求Crossref（见crossref_async.py，速率由令牌桶控制，不再逐个等待；
+    多个DOI合并为一次批量查询），再按原顺序产出结果；Crossref未取到的URL先用普通HTTP请求解析静态HTML
+    （见static_extract.py），静态HTML缺少必需字段时才回退到浏览器抓取：
+    pool_size>0 时这些URL分配到无头浏览器池并发抓取（见browser_pool.py），否则用 page 逐个抓取
     
     Args:
-        page: Playwright页面对象
-        urls: 待处理的URL列表
+        page: Playwright页面对象，或返回页面对象的函数（只在需要浏览器抓取时调用，用于延迟启动浏览器）
+        urls: 待处理的URL（列表或迭代器，按批读取）
+        concurrency: Crossref并发请求数
+        batch_size: 每批并发请求的URL数
+        cache: DOI元数据缓存（DoiMetadataCache），缓存有效期内的DOI不再请求Crossref
+        stats: ExtractionStats，记录每个页面的解析方式和耗时
+        pool_size: 浏览器池的上下文数，0表示使用单个页面串行抓取
+        with_url: 为True时产出 (URL, 文章信息)，便于记录哪个输入URL已完成
         
     Yields:
         每个URL对应的文章信息字典
     """
-    for url in urls:
-        try:
-            # 首先尝试通过Crossref API获取信息
-            doi = extract_doi_from_url(url)
-            if doi:
-                print(f"[+] 找到DOI: {doi}")
-                crossref_data = get_article_info_via_crossref(doi)
-                if crossref_data:
-                    yield crossref_data
-                    random_wait(2, 4)  # 每个URL之间的等待时间
-                    continue
+    urls = iter(urls)
+    while True:
+        batch = list(islice(urls, batch_size))
+        if not batch:
+            break
+        batch_dois = [extract_doi_from_url(url) for url in batch]
+        found_dois = [doi for doi in batch_dois if doi]
+        print(f"[+] 并发获取 {len(found_dois)} 个DOI的Crossref信息")
+        crossref_results = fetch_articles(found_dois, concurrency=concurrency, cache=cache,
+                                          batch_size=CROSSREF_LOOKUP_BATCH) if found_dois else {}
+        
+        results = {}  # 批内序号 -> 文章信息
+        static_results = {}  # 需要浏览器抓取的批内序号 -> 静态HTML的解析结果
+        for index, (url, doi) in enumerate(zip(batch, batch_dois)):
+            try:
+                # 首先使用Crossref API的结果
+                if doi:
+                    print(f"[+] 找到DOI: {doi}")
+                    crossref_data = crossref_results.get(doi)
+                    if crossref_data:
+                        results[index] = crossref_data
+                        continue
+                    else:
+                        print("[-] Crossref API未能获取到信息，尝试解析静态HTML")
+                
+                # Crossref API失败时先解析静态HTML，不需要启动浏览器
+                static_data, complete = extract_article_static(url, stats=stats, controller=RATE_CONTROLLER)
+                if complete:
+                    results[index] = static_data
                 else:
-                    print("[-] Crossref API未能获取到信息，尝试通过网页抓取")
-            
-            # 如果Crossref API失败，回退到网页抓取
-            article_data = extract_article_info(page, url)
-            yield article_data
-            random_wait(2, 4)  # 每个URL之间的等待时间
-        except Exception as e:
-            print(f"[-] 处理URL {url} 时出错: {str(e)}")
-            # 即使出错也继续处理下一个URL
-            continue
-
-# 保存数据到JSON
-def save_to_json(articles_data):
-    if not articles_data:
-        print("[-] 没有抓取到任何文章信息，无法保存到JSON")
-        return False
-    
-    try:
-        # 生成带时间戳的文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"Taylor_Francis_Articles_{timestamp}.json"
+                    print("[-] 静态HTML缺少必需字段，需要通过浏览器抓取")
+                    static_results[index] = static_data
+            except Exception as e:
+                print(f"[-] 处理URL {url} 时出错: {str(e)}")
+                # 即使出错也继续处理下一个URL
+                continue
         
-        # 保存到JSON文件
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(articles_data, f, ensure_ascii=False, indent=2)
+        # 静态HTML缺少必需字段的URL回退到浏览器抓取
+        if static_results and pool_size > 0:
+            browser_urls = [batch[index] for index in static_results]
+            print(f"[+] 使用 {pool_size} 个上下文的无头浏览器池抓取 {len(browser_urls)} 个页面")
+            try:
+                pool_results = extract_articles(browser_urls, size=pool_size, timeout_ms=PAGE_TIMEOUT_MS,
+                                                page_stats=stats, controller=RATE_CONTROLLER)
+                for index, article_data in zip(static_results, pool_results):
+                    results[index] = merge_static_fields(article_data, static_results[index])
+            except Exception as e:
+                print(f"[-] 浏览器池抓取出错: {str(e)}")
+        elif static_results:
+            for index, static_data in static_results.items():
+                try:
+                    start_time = time.time()
+                    article_data = extract_article_info(page() if callable(page) else page, batch[index])
+                    if stats is not None:
+                        stats.record(batch[index], "浏览器", time.time() - start_time)
+                    results[index] = merge_static_fields(article_data, static_data)
+                except Exception as e:
+                    print(f"[-] 处理URL {batch[index]} 时出错: {str(e)}")
         
-        print(f"\n[+] 数据已成功保存到: {filename}")
-        print(f"[+] 共抓取 {len(articles_data)} 篇文章信息")
-        return True
-    except Exception as e:
-        print(f"[-] 保存数据到JSON时出错: {str(e)[:100]}")
-        return False
+        for index in sorted(results):
+            yield (batch[index], results[index]) if with_url else results[index]
 
 # 主函数
 def main():
     print("===== Taylor & Francis 期刊文章爬虫开始运行 ======")
     print(f"当前时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # 测试URL列表
+    # 测试URL列表；命令行给出文件（文本/CSV/JSONL）时从文件中读取URL或DOI
     urls_to_process = [
         "https://www.tandfonline.com/doi/full/10.1080/07421222.2025.2520170"
         # 可以在这里添加更多URL进行批量处理
     ]
+    input_paths = sys.argv[1:]
+    
+    browser_objects = []  # playwright, browser, context, page（需要浏览器抓取时才启动）
+    cache = DoiMetadataCache(CROSSREF_CACHE_DB)
+    stats = ExtractionStats()
+    # 每篇文章抓取后立即写入JSONL并记录检查点，重新运行时跳过已完成的URL；
+    # 缺少必需字段的结果（如浏览器超时返回的空记录）不写入，下次运行时重新抓取
+    writer = ArticleJsonlWriter(ARTICLES_JSONL)
+    incomplete = 0
     
-    playwright = None
-    browser = None
-    context = None
-    all_articles_data = []
+    def get_page():
+        if not browser_objects:
+            browser_objects.extend(init_browser())
+        return browser_objects[3]
     
     try:
-        # 初始化浏览器
-        playwright, browser, context, page = init_browser()
+        # 逐行读取输入并按DOI去重，跳过检查点中已完成的URL（发出网络请求之前完成）
+        input_stats = InputStats()
+        if input_paths:
+            unique_urls = iter_unique_urls(input_paths, stats=input_stats)
+        else:
+            unique_urls = ((url, extract_doi_from_url(url)) for url in urls_to_process)
+        pending_urls = (url for url, doi in unique_urls if not writer.is_done(url, doi))
         
         # 使用CrossAPI迭代方法处理URL列表
-        print(f"[+] 开始使用CrossAPI方法迭代处理 {len(urls_to_process)} 个URL")
-        for article_data in crossapi_iterate_urls(page, urls_to_process):
-            all_articles_data.append(article_data)
+        print("[+] 开始使用CrossAPI方法迭代处理URL")
+        for url, article_data in crossapi_iterate_urls(get_page, pending_urls, cache=cache, stats=stats,
+                                                       with_url=True):
+            if not is_complete(article_data):
+                missing = [field for field in REQUIRED_FIELDS if not article_data.get(field)]
+                print(f"[-] {url} 缺少必需字段 {', '.join(missing)}，不记入检查点，下次运行时重试")
+                incomplete += 1
+                continue
+            writer.write(url, extract_doi_from_url(url), article_data)
             
             # 打印提取的信息
             print("\n[+] 提取的文章信息:")
             for key, value in article_data.items():
                 print(f"{key}: {value or '未找到'}")
         
-        # 保存数据到JSON
-        save_to_json(all_articles_data)
+        if input_paths:
+            input_stats.report()
+        if incomplete:
+            print(f"[-] {incomplete} 个URL未取到完整信息，未记入检查点")
+        stats.report()
+        RATE_CONTROLLER.report()
+        writer.close()
+        
+        # 压缩为JSON文件
+        if COMPACT_TO_JSON:
+            compact_jsonl(ARTICLES_JSONL, OUTPUT_DIR)
         
     except Exception as e:
         print(f"[-] 程序运行时发生错误: {str(e)}")
         import traceback
         traceback.print_exc()
     finally:
+        cache.close()
+        if not writer.file.closed:
+            writer.close()
         # 关闭浏览器
-        if context:
+        if browser_objects:
+            playwright, browser, context, _ = browser_objects
             context.close()
-        if browser:
             browser.close()
-        if playwright:
             playwright.stop()
     
     print("\n===== 爬虫运行结束 ======")
@@ -0,0 +1,272 @@
+# 自适应请求速率控制（两个爬虫共用）：按主机记录响应延迟、错误率和429次数，用AIMD调整速率和并发数
+# 原方案在每次操作前固定随机等待（paper.py 的 random_wait(2, 4)、ebsco.py 的 human_like_wait），
+# 服务器空闲时白白等待，服务器过载时又不会退让。这里：
+#   - 每个主机有一个请求速率（次/秒），请求之间只等待 1/速率 减去已经过去的时间；
+#   - 请求成功且延迟正常时加性增加速率和并发数（不超过配置的礼貌上限 max_rate / max_concurrency）；
+#   - 出现429/5xx/网络错误或延迟明显变长时乘性减小，有 Retry-After 时暂停该主机直到指定时间；
+#   - 延迟基线跟随成功请求缓慢漂移，延迟稳定在新的水平后速率可以恢复；
+#   - 同一主机上耗时差别很大的请求（如HTTP获取静态页面和浏览器加载页面）用kind区分，各自统计延迟和速率
+# 运行：python rate_controller.py（对本地桩服务器做一次演示，输出有效请求速率）
+
+import sys
+import time
+import random
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+
+import requests
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+ASYNC_POLL_INTERVAL = 0.05  # 协程等待并发名额时的检查间隔（秒）
+
+
+class HostLimits:
+    """
+    单个主机的礼貌访问配置
+
+    Args:
+        start_rate: 初始速率（次/秒）
+        max_rate: 速率上限（礼貌上限，任何情况下都不会超过）
+        min_rate: 速率下限
+        max_concurrency: 同时进行的请求数上限
+        increase: 每次成功后速率增加的量（次/秒）
+        decrease: 出错时速率乘以的系数
+        slow_factor: 延迟超过基线延迟的多少倍时视为拥塞
+        jitter: 请求间隔的随机抖动比例，避免请求过于规律
+    """
+
+    def __init__(self, start_rate=1.0, max_rate=2.0, min_rate=0.1, max_concurrency=4, increase=0.1,
+                 decrease=0.5, slow_factor=3.0, jitter=0.2):
+        self.start_rate = start_rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.max_concurrency = max_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self.jitter = jitter
+
+    # 复制一份配置并修改部分参数
+    def replace(self, **changes):
+        return HostLimits(**dict(vars(self), **changes))
+
+
+class HostState:
+    def __init__(self, limits):
+        self.limits = limits
+        self.rate = limits.start_rate
+        self.concurrency = 1.0
+        self.in_flight = 0
+        self.next_time = 0.0
+        self.baseline_latency = None  # 成功请求延迟的慢速滑动平均
+        self.latency = None  # 最近延迟的快速滑动平均
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self.first_time = None
+        self.last_time = None
+
+
+class AdaptiveRateController:
+    """
+    按主机的自适应速率控制器（线程安全）
+
+    Args:
+        limits: {主机: HostLimits}，未列出的主机使用 default_limits
+        default_limits: 默认配置
+
+    各方法的kind参数为请求类别（如 "static" / "browser"），同一主机的不同类别分别记录状态，None为默认类别
+    """
+
+    def __init__(self, limits=None, default_limits=None):
+        self.limits = limits or {}
+        self.default_limits = default_limits or HostLimits()
+        self.hosts = {}
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def host_of(url_or_host):
+        return urlsplit(url_or_host).netloc or url_or_host
+
+    # 按 (主机, 请求类别) 记录的状态
+    def _state(self, host, kind=None):
+        if (host, kind) not in self.hosts:
+            self.hosts[(host, kind)] = HostState(self.limits.get(host, self.default_limits))
+        return self.hosts[(host, kind)]
+
+    # 为该主机的下一个请求预约发出时间，返回需要等待的秒数（不等待，供同步和异步两种等待方式共用）
+    def _reserve(self, host, kind=None):
+        with self._condition:
+            state = self._state(host, kind)
+            now = time.monotonic()
+            interval = 1.0 / state.rate
+            interval *= 1 + random.uniform(-state.limits.jitter, state.limits.jitter)
+            start = max(now, state.next_time)
+            state.next_time = start + interval
+            state.waited += start - now
+            if state.first_time is None:
+                state.first_time = start
+        return start - now
+
+    # 等待到该主机允许发出下一个请求的时间，返回实际等待的秒数
+    def wait(self, url_or_host, kind=None):
+        delay = self._reserve(self.host_of(url_or_host), kind)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    # 记录一次请求的结果：status为HTTP状态码（未知时为None），error表示网络错误/超时
+    def record(self, url_or_host, latency, status=None, error=False, retry_after=None, kind=None):
+        host = self.host_of(url_or_host)
+        with self._condition:
+            state = self._state(host, kind)
+            limits = state.limits
+            state.requests += 1
+            state.last_time = time.monotonic()
+            if state.first_time is None:
+                state.first_time = state.last_time - latency
+            state.latency = latency if state.latency is None else 0.5 * state.latency + 0.5 * latency
+            failed = error or status in RETRY_STATUS
+            slow = (state.baseline_latency is not None and
+                    state.latency > state.baseline_latency * limits.slow_factor)
+            if not failed:
+                # 慢速请求也计入基线：延迟稳定在更高的水平后基线随之上升，不会一直停在最低速率
+                state.baseline_latency = latency if state.baseline_latency is None else \
+                    0.9 * state.baseline_latency + 0.1 * latency
+            if failed or slow:
+                if failed:
+                    state.errors += 1
+                if status == 429:
+                    state.throttled += 1
+                # 乘性减小
+                state.rate = max(limits.min_rate, state.rate * limits.decrease)
+                state.concurrency = max(1.0, state.concurrency * limits.decrease)
+                if retry_after:
+                    # Retry-After 针对整个主机，暂停该主机所有类别的请求
+                    resume_time = time.monotonic() + retry_after
+                    for (state_host, _), host_state in self.hosts.items():
+                        if state_host == host:
+                            host_state.next_time = max(host_state.next_time, resume_time)
+            else:
+                # 加性增加
+                state.rate = min(limits.max_rate, state.rate + limits.increase)
+                state.concurrency = min(limits.max_concurrency, state.concurrency + 1.0 / max(state.concurrency, 1.0))
+            self._condition.notify_all()
+
+    # 当前允许的并发数
+    def concurrency(self, url_or_host, kind=None):
+        with self._condition:
+            return int(self._state(self.host_of(url_or_host), kind).concurrency)
+
+    @contextmanager
+    def request(self, url, kind=None):
+        """
+        在速率和并发限制内发出一个请求，并自动记录延迟；
+        调用方把HTTP状态码写入 call["status"]（有 Retry-After 时写入 call["retry_after"]），
+        未写入状态码就抛出异常视为网络错误
+
+        Yields:
+            用于回填结果的字典
+        """
+        host = self.host_of(url)
+        with self._condition:
+            state = self._state(host, kind)
+            while state.in_flight >= int(state.concurrency):
+                self._condition.wait()
+            state.in_flight += 1
+        call = {"status": None, "retry_after": None}
+        try:
+            self.wait(host, kind)
+            start_time = time.monotonic()
+            try:
+                yield call
+            except Exception:
+                self._record_call(host, kind, call, start_time, raised=True)
+                raise
+            self._record_call(host, kind, call, start_time)
+        finally:
+            self._release(host, kind)
+
+    @asynccontextmanager
+    async def async_request(self, url, kind=None):
+        """
+        与 request 相同，用于asyncio协程（如浏览器池）：等待速率和并发名额时让出事件循环，不阻塞线程
+
+        Yields:
+            用于回填结果的字典
+        """
+        host = self.host_of(url)
+        while not self._try_acquire(host, kind):
+            await asyncio.sleep(ASYNC_POLL_INTERVAL)
+        call = {"status": None, "retry_after": None}
+        try:
+            delay = self._reserve(host, kind)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            start_time = time.monotonic()
+            try:
+                yield call
+            except Exception:
+                self._record_call(host, kind, call, start_time, raised=True)
+                raise
+            self._record_call(host, kind, call, start_time)
+        finally:
+            self._release(host, kind)
+
+    def _try_acquire(self, host, kind=None):
+        with self._condition:
+            state = self._state(host, kind)
+            if state.in_flight >= int(state.concurrency):
+                return False
+            state.in_flight += 1
+            return True
+
+    def _release(self, host, kind=None):
+        with self._condition:
+            self._state(host, kind).in_flight -= 1
+            self._condition.notify_all()
+
+    def _record_call(self, host, kind, call, start_time, raised=False):
+        latency = time.monotonic() - start_time
+        if raised:
+            # 已拿到非重试类状态码（如404）后抛出的异常不是服务器过载，不减速
+            failed = call["status"] is None or call["status"] in RETRY_STATUS
+            self.record(host, latency, call["status"], error=failed, kind=kind)
+        else:
+            self.record(host, latency, call["status"], retry_after=call["retry_after"], kind=kind)
+
+    def report(self):
+        if not self.hosts:
+            return
+        print("\n=== 请求速率 ===")
+        with self._condition:
+            for (host, kind), state in self.hosts.items():
+                duration = (state.last_time or 0) - (state.first_time or 0)
+                effective = state.requests / duration if duration > 0 else 0
+                latency = f"{state.latency * 1000:.0f} ms" if state.latency is not None else "-"
+                name = f"{host}（{kind}）" if kind else host
+                print(f"[+] {name}: {state.requests} 个请求，有效速率 {effective:.2f} 次/秒"
+                      f"（当前上限 {state.rate:.2f} 次/秒，并发 {int(state.concurrency)}），延迟 {latency}，"
+                      f"错误 {state.errors}（429: {state.throttled}），等待共 {state.waited:.1f} 秒")
+
+
+def main():
+    from crawler_stubs import StubServer
+
+    controller = AdaptiveRateController(default_limits=HostLimits(start_rate=2.0, max_rate=20.0, increase=1.0))
+    with StubServer(latency=0.02, error_every=15) as server:
+        for i in range(60):
+            url = f"{server.base_url}/works/10.1080/{i}"
+            with controller.request(url) as call:
+                response = requests.get(url, timeout=10)
+                call["status"] = response.status_code
+                retry_after = response.headers.get("Retry-After")
+                call["retry_after"] = float(retry_after) if retry_after and retry_after.isdigit() else None
+    controller.report()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+# 分析结果输出：小结果在driver端写为单个文件，大结果仍由Spark并行写出
+# 原来每个 .write.csv(..., mode="overwrite") 按shuffle分区数产生一个part文件目录，结果往往只有几行。
+# 这里先取 threshold+1 行判断结果大小：
+#   - 小结果：CSV/JSON在driver端直接写成一个 part-00000 文件；Parquet用 coalesce(1) 写出单个文件
+#   - 大结果：Spark并行写出（不再额外 count() 一遍，清单中的行数记为空）
+# 两种情况都先写到同级的临时目录，fsync后通过重命名替换原目录，
+# 并在输出根目录的 _manifest.json 中记录行数、文件数、字节数和写入耗时
+# 输出路径按Spark的默认文件系统解析：本地文件系统直接用os操作；其他文件系统（如cluster配置档的HDFS）
+# 通过Hadoop FileSystem重命名、删除、列目录和读写清单，小结果也改为 coalesce(1) 由Spark写出
+# 输出目录结构与Spark一致，spark.read.csv(目录) 和 read_spark_result 都可以直接读取
+
+import os
+import csv
+import json
+import math
+import time
+import uuid
+import shutil
+import struct
+import posixpath
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+SMALL_RESULT_ROWS = 10000
+MANIFEST_NAME = "_manifest.json"
+
+_manifest_lock = threading.Lock()
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _fsync_tree(path):
+    for root, _, files in os.walk(path):
+        for name in files:
+            with open(os.path.join(root, name), "rb+") as f:
+                os.fsync(f.fileno())
+        _fsync_dir(root)
+
+
+# 用临时目录替换目标目录：旧目录先改名再删除，替换过程中目标路径最多短暂缺失，不会出现半写的目录
+def _replace_dir(temp_dir, output_dir):
+    old_dir = None
+    if os.path.exists(output_dir):
+        old_dir = f"{output_dir}.old-{uuid.uuid4().hex[:8]}"
+        os.rename(output_dir, old_dir)
+    os.rename(temp_dir, output_dir)
+    _fsync_dir(os.path.dirname(os.path.abspath(output_dir)))
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+# 浮点数按Java Double.toString / Float.toString的格式输出（与Spark的CSV写出一致）：
+# 绝对值在 [1e-3, 1e7) 内为普通小数（至少一位小数，如 12.5、100.0），否则为科学计数法（如 1.0E7、1.5E-4）
+def _java_float_text(value, single=False):
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value == 0:
+        return "-0.0" if math.copysign(1.0, value) < 0 else "0.0"
+    text = repr(value)
+    if single:
+        # FloatType：取能还原同一个单精度值的最短表示
+        target = struct.unpack("f", struct.pack("f", value))[0]
+        text = next(candidate for candidate in (f"{value:.{digits}g}" for digits in range(1, 10))
+                    if struct.unpack("f", struct.pack("f", float(candidate)))[0] == target)
+    sign, digit_tuple, exponent = Decimal(text).normalize().as_tuple()
+    digits = "".join(map(str, digit_tuple))
+    point = len(digits) + exponent - 1  # 第一位有效数字的十进制指数
+    prefix = "-" if sign else ""
+    if 1e-3 <= abs(value) < 1e7:
+        if point >= 0:
+            digits = digits.ljust(point + 1, "0")
+            return f"{prefix}{digits[:point + 1]}.{digits[point + 1:] or '0'}"
+        return f"{prefix}0.{'0' * (-point - 1)}{digits}"
+    return f"{prefix}{digits[0]}.{digits[1:] or '0'}E{point}"
+
+
+def _format_csv_value(value, single=False):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return _java_float_text(value, single)
+    return str(value)
+
+
+def _format_json_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # DecimalType（如对decimal列做ROUND/AVG）：整数值输出为整数，否则输出为浮点数
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def _write_rows(rows, columns, output_format, file_path, float_columns=()):
+    with open(file_path, "w", newline="", encoding="utf-8") as f:
+        if output_format == "csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows([_format_csv_value(value, index in float_columns) for index, value in enumerate(row)]
+                             for row in rows)
+        else:
+            # 与Spark的JSON输出一致：每行一个对象，省略NULL字段
+            for row in rows:
+                record = {column: _format_json_value(value) for column, value in zip(columns, row)
+                          if value is not None}
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class HadoopFileSystem:
+    """
+    输出路径所在的Hadoop文件系统（通过SparkSession的JVM访问），提供结果写出用到的目录和文件操作
+
+    Args:
+        spark: SparkSession
+        path: 输出路径，不带scheme时按Spark的默认文件系统（fs.defaultFS）解析
+    """
+
+    def __init__(self, spark, path):
+        self._jvm = spark.sparkContext._jvm
+        hadoop_path = self._path(path)
+        self.fs = hadoop_path.getFileSystem(spark.sparkContext._jsc.hadoopConfiguration())
+        self.scheme = self.fs.makeQualified(hadoop_path).toUri().getScheme()
+
+    def _path(self, path):
+        return self._jvm.org.apache.hadoop.fs.Path(path)
+
+    def exists(self, path):
+        return self.fs.exists(self._path(path))
+
+    def delete(self, path):
+        self.fs.delete(self._path(path), True)
+
+    def rename(self, source, target):
+        if not self.fs.rename(self._path(source), self._path(target)):
+            raise OSError(f"重命名失败: {source} -> {target}")
+
+    # 与 _replace_dir 相同：旧目录先改名再删除
+    def replace_dir(self, temp_dir, output_dir):
+        old_dir = None
+        if self.exists(output_dir):
+            old_dir = f"{output_dir}.old-{uuid.uuid4().hex[:8]}"
+            self.rename(output_dir, old_dir)
+        self.rename(temp_dir, output_dir)
+        if old_dir:
+            self.delete(old_dir)
+
+    def dir_stats(self, path):
+        files, size = 0, 0
+        iterator = self.fs.listFiles(self._path(path), True)
+        while iterator.hasNext():
+            status = iterator.next()
+            if status.getPath().getName().startswith("part-"):
+                files += 1
+                size += status.getLen()
+        return files, size
+
+    def read_text(self, path):
+        stream = self.fs.open(self._path(path))
+        try:
+            return self._jvm.org.apache.commons.io.IOUtils.toString(stream, "UTF-8")
+        finally:
+            stream.close()
+
+    # 先写临时文件再替换，读取方不会看到写了一半的文件
+    def write_text(self, path, text):
+        temp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        stream = self.fs.create(self._path(temp_path), True)
+        try:
+            stream.write(bytearray(text.encode("utf-8")))
+            stream.hsync()
+        finally:
+            stream.close()
+        if self.exists(path):
+            self.delete(path)
+        self.rename(temp_path, path)
+
+
+# 输出路径不在本地文件系统上时返回其HadoopFileSystem，本地路径（或没有SparkSession的结果）返回None
+def output_filesystem(df, output_dir):
+    spark = getattr(df, "sparkSession", None)
+    if spark is None:
+        return None
+    hadoop_fs = HadoopFileSystem(spark, output_dir)
+    return hadoop_fs if hadoop_fs.scheme != "file" else None
+
+
+def _dir_stats(path):
+    files, size = 0, 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            if name.startswith("part-"):
+                files += 1
+                size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+# 在输出根目录的清单文件中记录一次写入
+def update_manifest(output_dir, entry, hadoop_fs=None):
+    if hadoop_fs is not None:
+        manifest_path = posixpath.join(posixpath.dirname(output_dir.rstrip("/")), MANIFEST_NAME)
+        with _manifest_lock:
+            manifest = json.loads(hadoop_fs.read_text(manifest_path)) if hadoop_fs.exists(manifest_path) else {}
+            manifest[posixpath.basename(output_dir.rstrip("/"))] = entry
+            hadoop_fs.write_text(manifest_path, json.dumps(manifest, indent=2, ensure_ascii=False))
+        return
+    manifest_path = os.path.join(os.path.dirname(os.path.abspath(output_dir)), MANIFEST_NAME)
+    with _manifest_lock:
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        manifest[os.path.basename(os.path.normpath(output_dir))] = entry
+        temp_path = f"{manifest_path}.tmp-{uuid.uuid4().hex[:8]}"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, manifest_path)
+
+
+def write_result(df, output_dir, output_format="csv", small_rows=SMALL_RESULT_ROWS):
+    """
+    写出一个分析结果并更新清单
+
+    Args:
+        df: 结果DataFrame
+        output_dir: 输出目录（与原 .write.csv 的路径相同）
+        output_format: csv / json / parquet
+        small_rows: 行数不超过该值时写为单个文件
+
+    Returns:
+        清单中的记录（行数、文件数、字节数、写入耗时等；大结果的行数为None）
+    """
+    if output_format not in ("csv", "json", "parquet"):
+        raise ValueError(f"不支持的输出格式: {output_format}")
+    start_time = time.time()
+    hadoop_fs = output_filesystem(df, output_dir)
+    if hadoop_fs is not None:
+        # 临时目录由Spark创建，父目录不存在时一并创建
+        parent_dir, name = posixpath.split(output_dir.rstrip("/"))
+        temp_dir = posixpath.join(parent_dir, f".{name}.tmp-{uuid.uuid4().hex[:8]}")
+    else:
+        parent_dir = os.path.dirname(os.path.abspath(output_dir))
+        os.makedirs(parent_dir, exist_ok=True)
+        temp_dir = os.path.join(parent_dir, f".{os.path.basename(os.path.normpath(output_dir))}.tmp-{uuid.uuid4().hex[:8]}")
+
+    head = df.limit(small_rows + 1).collect()
+    small = len(head) <= small_rows
+    try:
+        if small and output_format != "parquet" and hadoop_fs is None:
+            os.makedirs(temp_dir)
+            # 单精度(FloatType)列按Float.toString格式输出
+            float_columns = {index for index, field in enumerate(df.schema.fields)
+                             if field.dataType.typeName() == "float"}
+            _write_rows(head, df.columns, output_format,
+                        os.path.join(temp_dir, f"part-00000.{output_format}"), float_columns)
+            open(os.path.join(temp_dir, "_SUCCESS"), "w").close()
+            num_rows = len(head)
+        else:
+            writer = (df.coalesce(1) if small else df).write.mode("overwrite")
+            if output_format == "csv":
+                writer.csv(temp_dir, header=True)
+            elif output_format == "json":
+                writer.json(temp_dir)
+            else:
+                writer.parquet(temp_dir)
+            if hadoop_fs is None:
+                _fsync_tree(temp_dir)
+            # 大结果不再为统计行数重新计算一遍
+            num_rows = len(head) if small else None
+        if hadoop_fs is not None:
+            hadoop_fs.replace_dir(temp_dir, output_dir)
+        else:
+            _replace_dir(temp_dir, output_dir)
+    finally:
+        if hadoop_fs is None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        elif hadoop_fs.exists(temp_dir):
+            hadoop_fs.delete(temp_dir)
+
+    files, size = hadoop_fs.dir_stats(output_dir) if hadoop_fs is not None else _dir_stats(output_dir)
+    entry = {
+        "path": output_dir,
+        "format": output_format,
+        "rows": num_rows,
+        "files": files,
+        "bytes": size,
+        "single_file": small,
+        "write_seconds": round(time.time() - start_time, 3),
+        "written_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    update_manifest(output_dir, entry, hadoop_fs)
+    rows_text = f"{num_rows} 行" if num_rows is not None else f"超过 {small_rows} 行"
+    print(f"[输出] {output_dir}: {rows_text}，{files} 个文件，耗时 {entry['write_seconds']:.2f} 秒")
+    return entry
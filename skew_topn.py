@@ -0,0 +1,135 @@
+# 倾斜感知的Top-N计算（任务2.1 Top3购买用户、任务2.3 复购率Top商品）
+# 原脚本对完整的聚合结果 ORDER BY ... LIMIT，全表排序；这里用 RDD.takeOrdered：
+# 每个分区只维护一个大小为N的有界堆，driver端合并各分区的N个候选。
+# 少数热门用户/商品会让 GROUP BY 的shuffle分区严重倾斜：对抽样识别出的热点键追加盐值(salt)先做局部聚合，
+# 再去掉盐值合并，并输出加盐前后shuffle分区的行数分布
+# 运行：python skew_topn.py [--top 3] [--salt-buckets 16] [--hot-fraction 0.01]
+
+import sys
+import time
+import argparse
+
+from pyspark.sql import functions as F
+
+from spark_session_factory import create_spark_session
+from ecommerce_common import default_user_behavior_source, load_user_behavior_view
+from result_sink import write_result
+
+
+# 有界堆Top-N：key越小越靠前；降序字段取负，NULL排在最后（与Spark ORDER BY DESC一致）
+def take_top_n(df, n, descending_column, tie_column=None):
+    def sort_key(row):
+        value = row[descending_column]
+        tie = row[tie_column] if tie_column else None
+        return (value is None, -(value or 0), tie is None, tie or "")
+    rows = df.rdd.takeOrdered(n, key=sort_key)
+    return df.sparkSession.createDataFrame(rows, df.schema)
+
+
+# 抽样统计键的出现比例，返回占比超过 hot_fraction 的热点键
+def find_hot_keys(df, key_column, hot_fraction=0.01, sample_fraction=0.1, seed=42):
+    sample = df.select(key_column).sample(fraction=sample_fraction, seed=seed)
+    total = sample.count()
+    if total == 0:
+        return []
+    threshold = max(1, int(total * hot_fraction))
+    rows = sample.groupBy(key_column).count().filter(F.col("count") >= threshold).collect()
+    return [row[key_column] for row in rows]
+
+
+# 按指定列做哈希分区（与GROUP BY的shuffle分区方式相同），统计各分区的行数
+def partition_skew(df, partition_columns, num_partitions):
+    counts = [row["count"] for row in df.repartition(num_partitions, *partition_columns)
+              .groupBy(F.spark_partition_id().alias("partition_id")).count().collect()]
+    counts += [0] * (num_partitions - len(counts))
+    counts.sort()
+    median = counts[len(counts) // 2]
+    return {"max": counts[-1], "median": median, "min": counts[0],
+            "max_to_median": counts[-1] / median if median else float("inf")}
+
+
+def print_skew(label, before, after):
+    print(f"\n=== {label}：shuffle分区行数分布 ===")
+    for name, stats in [("加盐前", before), ("加盐后", after)]:
+        print(f"{name}: 最大 {stats['max']} / 中位数 {stats['median']} / 最小 {stats['min']}，"
+              f"最大/中位数 = {stats['max_to_median']:.2f}")
+
+
+# 热点键的行按 salt_columns 的哈希分散到 salt_buckets 个盐值，其余行盐值为0
+def add_salt(df, key_column, hot_keys, salt_buckets, salt_columns):
+    if not hot_keys:
+        return df.withColumn("salt", F.lit(0))
+    salt = F.pmod(F.xxhash64(*salt_columns), F.lit(salt_buckets))
+    return df.withColumn("salt", F.when(F.col(key_column).isin(hot_keys), salt).otherwise(F.lit(0)))
+
+
+# 任务2.1：Top-N购买用户，热点用户加盐后两阶段计数
+def top_buyers(spark, n=3, salt_buckets=16, hot_fraction=0.01, report=True):
+    buys = spark.table("user_behavior_view").filter(F.col("action") == "buy")
+    hot_users = find_hot_keys(buys, "user_id", hot_fraction)
+    salted = add_salt(buys, "user_id", hot_users, salt_buckets, ["item_id", "timestamp"])
+    buy_count = salted.groupBy("user_id", "salt").count() \
+        .groupBy("user_id").agg(F.sum("count").alias("buy_count"))
+
+    if report:
+        num_partitions = int(spark.conf.get("spark.sql.shuffle.partitions"))
+        print(f"\n热点购买用户 {len(hot_users)} 个: {hot_users[:10]}")
+        print_skew("任务2.1 按用户计数",
+                   partition_skew(salted, ["user_id"], num_partitions),
+                   partition_skew(salted, ["user_id", "salt"], num_partitions))
+    return take_top_n(buy_count, n, "buy_count", "user_id")
+
+
+# 任务2.3：复购率Top-N商品；(商品, 用户)去重后，热点商品按用户哈希加盐再合并各商品的购买/复购用户数
+def top_repurchase_items(spark, n=3, salt_buckets=16, hot_fraction=0.01, report=True):
+    buys = spark.table("user_behavior_view").filter(F.col("action") == "buy")
+    item_user = buys.groupBy("item_id", "user_id").agg(F.count("*").alias("buy_times")) \
+        .filter(F.col("user_id").isNotNull())
+    hot_items = find_hot_keys(item_user, "item_id", hot_fraction)
+    salted = add_salt(item_user, "item_id", hot_items, salt_buckets, ["user_id"])
+    partial = salted.groupBy("item_id", "salt").agg(
+        F.count("*").alias("total_buy_user"),
+        F.sum(F.when(F.col("buy_times") >= 2, 1).otherwise(0)).alias("repurchase_user"))
+    repurchase = partial.groupBy("item_id").agg(
+        F.sum("total_buy_user").alias("total_buy_user"),
+        F.sum("repurchase_user").alias("repurchase_user")) \
+        .withColumn("repurchase_rate",
+                    F.round(F.col("repurchase_user") / F.col("total_buy_user") * 100, 2))
+
+    if report:
+        num_partitions = int(spark.conf.get("spark.sql.shuffle.partitions"))
+        print(f"\n热点商品 {len(hot_items)} 个: {hot_items[:10]}")
+        print_skew("任务2.3 按商品统计购买用户",
+                   partition_skew(salted, ["item_id"], num_partitions),
+                   partition_skew(salted, ["item_id", "salt"], num_partitions))
+    return take_top_n(repurchase, n, "repurchase_rate", "item_id")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="倾斜感知的Top-N购买用户与复购商品")
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--salt-buckets", type=int, default=16, help="热点键的盐值个数")
+    parser.add_argument("--hot-fraction", type=float, default=0.01, help="抽样中占比超过该值的键视为热点")
+    args = parser.parse_args()
+
+    spark = create_spark_session("SkewAwareTopN", input_paths=[default_user_behavior_source()])
+    load_user_behavior_view(spark)
+
+    start_time = time.time()
+    top_users = top_buyers(spark, args.top, args.salt_buckets, args.hot_fraction)
+    if args.top == 3:
+        write_result(top_users, "output/sql_advanced_top3_user")
+    print(f"\n=== Top{args.top}高价值用户（购买次数最多） ===")
+    top_users.show()
+    print(f"耗时: {time.time() - start_time:.2f} 秒")
+
+    start_time = time.time()
+    top_items = top_repurchase_items(spark, args.top, args.salt_buckets, args.hot_fraction)
+    print(f"\n=== 商品复购率Top{args.top} ===")
+    top_items.show()
+    print(f"耗时: {time.time() - start_time:.2f} 秒")
+    spark.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# Spark会话工厂：为本地/集群分析任务提供统一的SparkSession调优配置
+# 各分析脚本通过 create_spark_session 创建会话，配置档可用环境变量 SPARK_PROFILE 指定：
+#   small-local  单机小数据（默认），少量shuffle分区，关闭Spark UI以加快启动
+#   large-local  单机大数据，按CPU核数和输入大小放大分区数，加大driver内存
+#   cluster      集群模式（master由环境变量 SPARK_MASTER 指定，默认yarn）
+
+import os
+import glob
+import math
+import time
+from contextlib import contextmanager
+from pyspark.sql import SparkSession
+
+DEFAULT_PROFILE = "small-local"
+
+SPARK_PROFILES = {
+    "small-local": {
+        "master": "local[*]",
+        "target_partition_mb": 64,  # 每个shuffle分区期望处理的输入数据量
+        "min_partitions": 1,
+        "max_partitions_per_core": 2,
+        "conf": {
+            "spark.driver.memory": "2g",
+            "spark.ui.enabled": "false",
+        },
+    },
+    "large-local": {
+        "master": "local[*]",
+        "target_partition_mb": 128,
+        "min_partitions_per_core": 1,
+        "max_partitions_per_core": 4,
+        "conf": {
+            "spark.driver.memory": "8g",
+            "spark.driver.maxResultSize": "2g",
+        },
+    },
+    "cluster": {
+        "master": os.environ.get("SPARK_MASTER", "yarn"),
+        "target_partition_mb": 128,
+        "min_partitions": 200,
+        "max_partitions": 2000,
+        "conf": {
+            "spark.driver.memory": "4g",
+            "spark.dynamicAllocation.enabled": "true",
+        },
+    },
+}
+
+# 所有配置档共用的设置：自适应查询执行、Arrow加速、Kryo序列化
+COMMON_CONF = {
+    "spark.sql.adaptive.enabled": "true",
+    "spark.sql.adaptive.coalescePartitions.enabled": "true",
+    "spark.sql.adaptive.skewJoin.enabled": "true",
+    "spark.sql.execution.arrow.pyspark.enabled": "true",
+    "spark.sql.execution.arrow.pyspark.fallback.enabled": "true",
+    "spark.serializer": "org.apache.spark.serializer.KryoSerializer",
+}
+
+# 启动后打印的关键配置项
+LOGGED_CONF_KEYS = [
+    "spark.master",
+    "spark.sql.shuffle.partitions",
+    "spark.sql.adaptive.enabled",
+    "spark.sql.execution.arrow.pyspark.enabled",
+    "spark.serializer",
+    "spark.driver.memory",
+]
+
+# 计算输入路径（支持通配符和目录）的总字节数
+def get_input_size(input_paths):
+    total_size = 0
+    for pattern in input_paths or []:
+        for path in glob.glob(pattern):
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    total_size += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+            else:
+                total_size += os.path.getsize(path)
+    return total_size
+
+# 根据输入数据量和CPU核数估算shuffle分区数
+def estimate_shuffle_partitions(profile_config, input_size):
+    cores = os.cpu_count() or 1
+    min_partitions = profile_config.get("min_partitions", profile_config.get("min_partitions_per_core", 0) * cores)
+    max_partitions = profile_config.get("max_partitions", profile_config.get("max_partitions_per_core", 1) * cores)
+    min_partitions = max(1, min_partitions)
+    max_partitions = max(min_partitions, max_partitions)
+
+    target_bytes = profile_config["target_partition_mb"] * 1024 * 1024
+    partitions = math.ceil(input_size / target_bytes) if input_size else min_partitions
+    return min(max(partitions, min_partitions), max_partitions)
+
+# 打印会话实际生效的关键配置
+def log_effective_config(spark, profile):
+    print(f"[Spark] 配置档: {profile}")
+    for key in LOGGED_CONF_KEYS:
+        print(f"[Spark]   {key} = {spark.conf.get(key, '未设置')}")
+
+# 按配置档创建SparkSession，并打印启动耗时和生效配置
+def create_spark_session(app_name, profile=None, input_paths=None, extra_conf=None):
+    profile = profile or os.environ.get("SPARK_PROFILE", DEFAULT_PROFILE)
+    if profile not in SPARK_PROFILES:
+        raise ValueError(f"未知的Spark配置档: {profile}，可选: {', '.join(SPARK_PROFILES)}")
+    profile_config = SPARK_PROFILES[profile]
+
+    input_size = get_input_size(input_paths)
+    shuffle_partitions = estimate_shuffle_partitions(profile_config, input_size)
+
+    conf = dict(COMMON_CONF)
+    conf.update(profile_config["conf"])
+    conf["spark.sql.shuffle.partitions"] = str(shuffle_partitions)
+    conf.update(extra_conf or {})
+
+    start_time = time.time()
+    builder = SparkSession.builder.appName(app_name).master(profile_config["master"])
+    for key, value in conf.items():
+        builder = builder.config(key, value)
+    spark = builder.getOrCreate()
+    startup_duration = time.time() - start_time
+
+    print(f"[Spark] 输入数据量: {input_size / 1024 / 1024:.1f} MB，shuffle分区数: {shuffle_partitions}")
+    log_effective_config(spark, profile)
+    print(f"[Spark] 会话启动耗时: {startup_duration:.2f} 秒")
+    return spark
+
+# 统计一段查询的耗时，并标注当前使用的配置档
+@contextmanager
+def timed_query(label, profile=None):
+    profile = profile or os.environ.get("SPARK_PROFILE", DEFAULT_PROFILE)
+    start_time = time.time()
+    try:
+        yield
+    finally:
+        print(f"[Spark] [{profile}] {label} 耗时: {time.time() - start_time:.2f} 秒")
@@ -0,0 +1,297 @@
+# 不启动浏览器的文章页面解析：通过普通HTTP获取Taylor & Francis文章页面的HTML，用CSS选择器提取与
+# extract_article_info 相同的字段；静态HTML缺少关键字段时才需要升级到Playwright
+# 安装了lxml(+cssselect)时使用lxml解析，否则使用基于标准库html.parser的简易解析（只支持下面用到的选择器语法）
+# 运行：python static_extract.py 文件或URL ...（本地HTML文件用于离线验证，如 fixtures/tandf_article.html）
+
+import os
+import re
+import sys
+import time
+from contextlib import nullcontext
+from html.parser import HTMLParser
+
+import requests
+
+from article_common import USER_AGENT, empty_article_data, clean_text
+
+# 静态HTML中必须具备的字段，缺少任一字段时升级到浏览器抓取
+REQUIRED_FIELDS = ["标题", "作者", "期刊名称"]
+
+# 各字段的候选选择器（按顺序尝试，与 extract_article_info 中的选择器一致，去掉了依赖随机id的XPath）
+TITLE_SELECTORS = ["h1.article-title", "h1"]
+AUTHOR_SELECTORS = ["div.NLM_contrib-group > a.author", "div.contrib-group > a.contrib-author",
+                    "span.NLM_contrib-author", "div.author-info > a", "a[data-test='author-name']"]
+JOURNAL_SELECTORS = ["a.journal-title", "div.journal-header > h2"]
+KEYWORD_SELECTORS = ["div.article-subject-tags > a.tag", "div.keywords-section > a.keyword", "span.keyword"]
+ABSTRACT_SELECTORS = ["div.abstractInFull", "div.abstract", "div.abstractSection"]
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class _Node:
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("#root", {}, None)
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = _Node(tag, {name: value or "" for name, value in attrs}, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(_Node(tag, {name: value or "" for name, value in attrs}, self.current))
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+_COMPOUND_PATTERN = re.compile(r"^(?P<tag>[a-zA-Z][a-zA-Z0-9]*)?(?P<rest>(?:\.[\w-]+|\[[\w-]+=['\"][^'\"]*['\"]\])*)$")
+_PART_PATTERN = re.compile(r"\.([\w-]+)|\[([\w-]+)=['\"]([^'\"]*)['\"]\]")
+
+
+def _parse_compound(text):
+    match = _COMPOUND_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"不支持的选择器: {text}")
+    classes, attrs = [], []
+    for class_name, attr_name, attr_value in _PART_PATTERN.findall(match.group("rest")):
+        if class_name:
+            classes.append(class_name)
+        else:
+            attrs.append((attr_name, attr_value))
+    return match.group("tag"), classes, attrs
+
+
+def _matches(node, compound):
+    tag, classes, attrs = compound
+    if isinstance(node, str) or node.parent is None:
+        return False
+    if tag and node.tag != tag:
+        return False
+    node_classes = node.attrs.get("class", "").split()
+    if any(name not in node_classes for name in classes):
+        return False
+    return all(node.attrs.get(name) == value for name, value in attrs)
+
+
+class SimpleDocument:
+    """
+    标准库实现的简易文档：支持 tag、.class、[attr='value'] 组合，以及后代（空格）和子元素（>）关系
+    """
+
+    def __init__(self, html):
+        builder = _TreeBuilder()
+        builder.feed(html)
+        builder.close()
+        self.nodes = []
+        stack = [builder.root]
+        while stack:
+            node = stack.pop()
+            self.nodes.append(node)
+            stack.extend(child for child in reversed(node.children) if not isinstance(child, str))
+        self.nodes = self.nodes[1:]  # 文档顺序，去掉根节点
+
+    def select(self, selector):
+        tokens = selector.replace(">", " > ").split()
+        steps, combinator = [], " "
+        for token in tokens:
+            if token == ">":
+                combinator = ">"
+                continue
+            steps.append((combinator, _parse_compound(token)))
+            combinator = " "
+        return [node for node in self.nodes if self._match_steps(node, steps, len(steps) - 1)]
+
+    def _match_steps(self, node, steps, index):
+        combinator, compound = steps[index]
+        if not _matches(node, compound):
+            return False
+        if index == 0:
+            return True
+        parent = node.parent
+        if combinator == ">":
+            return parent is not None and self._match_steps(parent, steps, index - 1)
+        while parent is not None:
+            if self._match_steps(parent, steps, index - 1):
+                return True
+            parent = parent.parent
+        return False
+
+    @staticmethod
+    def text(node):
+        parts, stack = [], [node]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, str):
+                parts.append(current)
+            else:
+                stack.extend(reversed(current.children))
+        return " ".join(parts)
+
+    @staticmethod
+    def attr(node, name):
+        return node.attrs.get(name)
+
+
+class LxmlDocument:
+    def __init__(self, html):
+        import lxml.html
+        self.root = lxml.html.fromstring(html)
+        self.root.cssselect("h1")  # 未安装cssselect时在这里抛出ImportError
+
+    def select(self, selector):
+        return self.root.cssselect(selector)
+
+    @staticmethod
+    def text(node):
+        return node.text_content()
+
+    @staticmethod
+    def attr(node, name):
+        return node.get(name)
+
+
+def parse_document(html):
+    try:
+        return LxmlDocument(html)
+    except ImportError:
+        return SimpleDocument(html)
+
+
+def _first_text(document, selectors):
+    for selector in selectors:
+        for node in document.select(selector):
+            text = clean_text(document.text(node))
+            if text:
+                return text
+    return ""
+
+
+def _all_texts(document, selectors):
+    for selector in selectors:
+        texts = [clean_text(document.text(node)) for node in document.select(selector)]
+        texts = [text for text in texts if text]
+        if texts:
+            return texts
+    return []
+
+
+def _meta_values(document, name):
+    return [clean_text(document.attr(node, "content")) for node in document.select(f"meta[name='{name}']")
+            if document.attr(node, "content")]
+
+
+# 从文章页面HTML中提取文章信息（字段与 extract_article_info 相同）
+def parse_article_html(html, article_url):
+    document = parse_document(html)
+    article_data = empty_article_data(article_url)
+
+    article_data["标题"] = _first_text(document, TITLE_SELECTORS) or next(iter(_meta_values(document, "citation_title")), "")
+    authors = _all_texts(document, AUTHOR_SELECTORS) or _meta_values(document, "citation_author")
+    article_data["作者"] = ", ".join(authors)
+    article_data["期刊名称"] = _first_text(document, JOURNAL_SELECTORS) or \
+        next(iter(_meta_values(document, "citation_journal_title")), "")
+    article_data["volume"] = next(iter(_meta_values(document, "citation_volume")), "") or \
+        _first_text(document, ["div.volume-info > span.volume"])
+    article_data["issue"] = _first_text(document, ["div.volume-info > span.issue"]) or \
+        next(iter(_meta_values(document, "citation_issue")), "")
+
+    page_range = _first_text(document, ["div.volume-info > span.page-range"])
+    if not page_range:
+        first_page = next(iter(_meta_values(document, "citation_firstpage")), "")
+        last_page = next(iter(_meta_values(document, "citation_lastpage")), "")
+        page_range = f"{first_page}-{last_page}" if first_page and last_page else first_page
+    article_data["page"] = page_range
+
+    article_data["keywords"] = ", ".join(_all_texts(document, KEYWORD_SELECTORS))
+    article_data["摘要"] = _first_text(document, ABSTRACT_SELECTORS)
+
+    date_text = next(iter(_meta_values(document, "citation_publication_date")), "")
+    if len(date_text) >= 4 and date_text[:4].isdigit():
+        article_data["年份"] = date_text[:4]
+    return article_data
+
+
+# 静态HTML是否已包含全部必需字段
+def is_complete(article_data):
+    return all(article_data.get(field) for field in REQUIRED_FIELDS)
+
+
+class ExtractionStats:
+    def __init__(self):
+        self.pages = []  # (URL, 方式, 耗时)
+
+    def record(self, url, method, duration):
+        self.pages.append((url, method, duration))
+        print(f"[+] {method} 解析耗时 {duration * 1000:.0f} ms: {url[:80]}")
+
+    def report(self):
+        if not self.pages:
+            return
+        print("\n=== 文章页面解析耗时 ===")
+        for method in sorted({method for _, method, _ in self.pages}):
+            durations = [duration for _, page_method, duration in self.pages if page_method == method]
+            print(f"{method}: {len(durations)} 页，平均 {sum(durations) / len(durations) * 1000:.0f} ms，"
+                  f"最长 {max(durations) * 1000:.0f} ms")
+
+
+# 通过HTTP获取页面并解析，返回 (文章信息, 是否完整)；请求失败时返回 (None, False)
+# controller 为 rate_controller.AdaptiveRateController 时按主机控制请求速率并记录延迟和错误
+def extract_article_static(article_url, session=None, timeout=15, stats=None, controller=None):
+    start_time = time.time()
+    try:
+        if os.path.exists(article_url):
+            with open(article_url, encoding="utf-8") as f:
+                html = f.read()
+        else:
+            with controller.request(article_url, kind="static") if controller else nullcontext({}) as call:
+                response = (session or requests).get(article_url, headers={"User-Agent": USER_AGENT}, timeout=timeout)
+                call["status"] = response.status_code
+            response.raise_for_status()
+            html = response.text
+    except Exception as e:
+        print(f"[-] 获取页面HTML失败: {str(e)[:100]}")
+        return None, False
+    article_data = parse_article_html(html, article_url)
+    if stats is not None:
+        stats.record(article_url, "静态HTML", time.time() - start_time)
+    return article_data, is_complete(article_data)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python static_extract.py 文件或URL ...")
+        return 1
+    stats = ExtractionStats()
+    for target in sys.argv[1:]:
+        article_data, complete = extract_article_static(target, stats=stats)
+        if article_data is None:
+            continue
+        print(f"\n[+] {target}（{'完整' if complete else '缺少必需字段，需要浏览器抓取'}）")
+        for key, value in article_data.items():
+            print(f"{key}: {value or '未找到'}")
+    stats.report()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# 并发Crossref抓取：用本地桩服务器验证重试和缓存的条件请求
+import pytest
+
+from crawler_stubs import StubServer
+from crossref_async import fetch_articles
+from doi_cache import DoiMetadataCache
+
+DOIS = [f"10.1080/stub.{i}" for i in range(12)]
+
+
+@pytest.fixture
+def server():
+    with StubServer(error_every=5, missing=["10.1080/stub.3"]) as stub:
+        yield stub
+
+
+def fetch(server, dois, **options):
+    options.setdefault("concurrency", 4)
+    options.setdefault("rate_per_host", 1000.0)
+    return fetch_articles(dois, report=False, api_url=f"{server.base_url}/works/{{doi}}",
+                          backoff_base=0.01, backoff_max=0.05, **options)
+
+
+def test_fetch_retries_and_reports_missing(server):
+    results = fetch(server, DOIS)
+    assert list(results) == DOIS
+    assert results["10.1080/stub.3"] is None
+    for doi in DOIS:
+        if doi != "10.1080/stub.3":
+            assert results[doi]["标题"] == f"Stub article {doi}"
+            assert results[doi]["期刊名称"] == "Journal of Stub Studies"
+    # 每5个请求注入一次429/503，重试后全部成功
+    assert server.request_count > len(DOIS)
+
+
+def test_stale_cache_revalidates_with_etag(server, tmp_path):
+    cache = DoiMetadataCache(str(tmp_path / "cache.db"), ttl_seconds=0)
+    first = fetch(server, DOIS[:4], cache=cache)
+    paths_before = len(server.httpd.request_paths)
+
+    # 有效期为0：每个条目都过期，带ETag做条件请求，服务器返回304，仍得到缓存中的结果
+    second = fetch(server, DOIS[:4], cache=cache)
+    assert second == first
+    assert cache.revalidated == 3  # 404的DOI没有ETag，重新请求后仍为404
+    assert len(server.httpd.request_paths) > paths_before
+    cache.close()
+
+
+def test_fresh_cache_sends_no_requests(server, tmp_path):
+    cache = DoiMetadataCache(str(tmp_path / "cache.db"))
+    first = fetch(server, DOIS, cache=cache)
+    requests_before = server.request_count
+    assert fetch(server, DOIS, cache=cache) == first
+    assert server.request_count == requests_before
+    cache.close()
+
+
+def test_batch_queries_use_filter_and_select(server):
+    # 重复的DOI只查询一次；Crossref返回小写DOI，大写的请求DOI也能对应上
+    dois = DOIS + [DOIS[0], "10.1080/STUB.1"]
+    results = fetch(server, dois, batch_size=5)
+    assert list(results) == list(dict.fromkeys(dois))
+    assert results["10.1080/stub.3"] is None
+    assert results["10.1080/STUB.1"]["标题"] == "Stub article 10.1080/STUB.1"
+
+    works_queries = [path for path in server.httpd.request_paths if path.startswith("/works?")]
+    # 13个不重复的DOI分为3批（注入的错误会让个别批次重试）
+    assert len(set(works_queries)) == 3
+    assert all("select=" in path and "rows=" in path for path in works_queries)
+    assert not any(path.startswith("/works/") for path in server.httpd.request_paths)
+
+
+def test_batch_mode_skips_fresh_cache_entries(server, tmp_path):
+    cache = DoiMetadataCache(str(tmp_path / "cache.db"))
+    fetch(server, DOIS[:6], cache=cache, batch_size=5)
+    requests_before = server.request_count
+    results = fetch(server, DOIS, cache=cache, batch_size=5)
+    new_queries = server.httpd.request_paths[requests_before:]
+    # 前6个DOI命中缓存（包括缓存的404），只查询其余6个
+    assert new_queries and all("stub.0" not in path for path in new_queries)
+    assert results["10.1080/stub.3"] is None
+    assert results["10.1080/stub.11"]["标题"] == "Stub article 10.1080/stub.11"
+    cache.close()
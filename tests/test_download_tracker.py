@@ -0,0 +1,58 @@
+# 下载完成检测：用桩下载器并发写入PDF，截断的文件超时后作为无效结果返回
+import os
+import threading
+
+from crawler_stubs import make_pdf_bytes, simulate_download
+from download_tracker import DownloadTracker, verify_pdf
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_verify_pdf(tmp_path):
+    data = make_pdf_bytes(5000)
+    path = str(tmp_path / "a.pdf")
+    write(path, data)
+    assert verify_pdf(path) == (True, None)
+    assert verify_pdf(path, len(data))[0]
+    assert not verify_pdf(path, len(data) + 1)[0]
+    write(path, data[:-100])
+    assert verify_pdf(path) == (False, "缺少%%EOF结尾")
+    write(path, b"<html>" + data)
+    assert verify_pdf(path) == (False, "不是PDF文件头")
+    write(path, b"%PDF")
+    assert verify_pdf(path) == (False, "文件过短")
+    assert not verify_pdf(str(tmp_path / "missing.pdf"))[0]
+
+
+def test_tracker_detects_concurrent_downloads(tmp_path):
+    download_dir = str(tmp_path)
+    # 开始跟踪之前已存在的文件不算新下载
+    write(os.path.join(download_dir, "old.pdf"), make_pdf_bytes(1000))
+    with DownloadTracker(download_dir, use_watchdog=False) as tracker:
+        threads = []
+        for i in range(4):
+            name = f"article_{i}.pdf"
+            data = make_pdf_bytes(20000, seed=str(i))
+            tracker.expect(name, len(data))
+            if i == 3:
+                data = data[:-100]
+            thread = threading.Thread(target=simulate_download,
+                                      args=(os.path.join(download_dir, name), data, 0.2, 5))
+            thread.start()
+            threads.append(thread)
+        results = tracker.wait_for(4, timeout=2)
+        for thread in threads:
+            thread.join()
+
+    by_name = {os.path.basename(result.path): result for result in results}
+    assert sorted(by_name) == [f"article_{i}.pdf" for i in range(4)]
+    for i in range(3):
+        assert by_name[f"article_{i}.pdf"].valid
+        assert by_name[f"article_{i}.pdf"].size == 20000
+    truncated = by_name["article_3.pdf"]
+    assert not truncated.valid
+    assert truncated.size == 19900
+    assert "与预期" in truncated.error
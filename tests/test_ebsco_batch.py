@@ -0,0 +1,123 @@
+# EBSCO批量下载：对模拟站点下载全部PDF，重新运行时跳过已下载的文件
+import json
+import os
+import time
+
+import pytest
+import requests
+
+from crawler_stubs import (EBSCO_MOCK_COOKIE, EBSCO_MOCK_PDF_SIZE, EBSCO_MOCK_RESULTS, EbscoMockHandler,
+                           StubServer, make_pdf_bytes)
+from ebsco_batch import MANIFEST_NAME, default_controller, download_all, download_pdf
+from ebsco_common import EBSCO_LIMITS
+from rate_controller import AdaptiveRateController, HostLimits
+
+MISSING_ID = "mock0007"
+
+
+@pytest.fixture
+def server():
+    with StubServer(EbscoMockHandler, missing=[MISSING_ID]) as stub:
+        yield stub
+
+
+def mock_articles(server):
+    ids = [f"mock{number:04d}" for number in range(EBSCO_MOCK_RESULTS)]
+    return [{"id": article_id, "title": f"Mock Accounting Article {article_id}",
+             "pdf_url": f"{server.base_url}/pdf/{article_id}.pdf"} for article_id in ids]
+
+
+def logged_in_session():
+    session = requests.Session()
+    name, value = EBSCO_MOCK_COOKIE.split("=", 1)
+    session.cookies.set(name, value)
+    return session
+
+
+def fast_controller():
+    return AdaptiveRateController(default_limits=HostLimits(start_rate=1000.0, max_rate=1000.0, max_concurrency=4))
+
+
+def read_manifest(download_dir):
+    with open(os.path.join(download_dir, MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_download_all_then_skip_on_rerun(server, tmp_path):
+    download_dir = str(tmp_path)
+    articles = mock_articles(server)
+    session = logged_in_session()
+
+    manifest = download_all(articles, session, download_dir, workers=4, controller=fast_controller())
+    summary = manifest.summary()
+    assert (summary["downloaded"], summary["skipped"], summary["failed"]) == (EBSCO_MOCK_RESULTS - 1, 0, 1)
+    saved = read_manifest(download_dir)
+    assert saved["summary"]["done"] == EBSCO_MOCK_RESULTS
+    assert saved["articles"][MISSING_ID]["status"] == "failed"
+    assert "404" in saved["articles"][MISSING_ID]["error"]
+    assert saved["articles"]["mock0000"]["size"] == EBSCO_MOCK_PDF_SIZE
+    pdfs = sorted(name for name in os.listdir(download_dir) if name.endswith(".pdf"))
+    assert len(pdfs) == EBSCO_MOCK_RESULTS - 1 and f"{MISSING_ID}.pdf" not in pdfs
+    assert not [name for name in os.listdir(download_dir) if name.endswith(".part")]
+
+    # 重新运行：已下载的文件不再请求，只重试失败的那一篇
+    requests_before = len(server.httpd.request_paths)
+    manifest = download_all(articles, session, download_dir, workers=4, controller=fast_controller())
+    summary = manifest.summary()
+    assert (summary["downloaded"], summary["skipped"], summary["failed"]) == (0, EBSCO_MOCK_RESULTS - 1, 1)
+    assert server.httpd.request_paths[requests_before:] == [f"/pdf/{MISSING_ID}.pdf"]
+    assert read_manifest(download_dir)["articles"]["mock0000"]["status"] == "skipped"
+
+
+def test_download_requires_session_cookie(server, tmp_path):
+    articles = mock_articles(server)[:2]
+    manifest = download_all(articles, requests.Session(), str(tmp_path), controller=fast_controller())
+    assert manifest.failed == 2
+    assert all("403" in entry["error"] for entry in manifest.entries.values())
+
+
+def test_default_controller_uses_ebsco_limits():
+    limits = default_controller(workers=3).default_limits
+    assert (limits.start_rate, limits.max_rate) == (EBSCO_LIMITS.start_rate, EBSCO_LIMITS.max_rate)
+    assert limits.max_concurrency == 3
+    assert EBSCO_LIMITS.max_concurrency == 1
+
+
+def test_gzip_response_is_not_checked_against_content_length(server, tmp_path):
+    articles = mock_articles(server)[:3]
+    manifest = download_all(articles, logged_in_session(), str(tmp_path), controller=fast_controller())
+    assert manifest.downloaded == 3
+    # 传输的是压缩后的内容，写出的是解压后的PDF
+    assert server.httpd.bytes_sent < 3 * EBSCO_MOCK_PDF_SIZE
+    assert all(entry["size"] == EBSCO_MOCK_PDF_SIZE for entry in manifest.entries.values())
+
+
+class SlowBodyResponse:
+    status_code = 200
+    headers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        time.sleep(0.3)
+        yield make_pdf_bytes(1000)
+
+
+class SlowBodySession:
+    def get(self, url, stream=False, timeout=None):
+        return SlowBodyResponse()
+
+
+def test_latency_is_recorded_at_response_headers(tmp_path):
+    controller = fast_controller()
+    entry = download_pdf(SlowBodySession(), {"id": "slow", "pdf_url": "http://pdf.example/slow.pdf"},
+                         str(tmp_path), controller)
+    assert entry["status"] == "downloaded"
+    assert controller.hosts[("pdf.example", None)].latency < 0.1
@@ -0,0 +1,47 @@
+# 漏斗深度：Spark SQL（在SQLite中执行同一条SQL）与NumPy后端按到达时间推进的结果
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from ecommerce_analysis_numpy import BehaviorData, funnel_depth
+from funnel_engine import build_funnel_depth_sql
+
+STAGES = ["click", "collect", "cart", "buy"]
+
+# (事件列表, 不限窗口的深度, 窗口10秒的深度)
+CASES = {
+    # 收藏在点击之前也发生过一次：首次时间 收藏@1 < 点击@2，但 点击@2→收藏@3 是按顺序的路径
+    "repeat_before": ([("collect", 1), ("click", 2), ("collect", 3)], 2, 2),
+    "in_order": ([("click", 1), ("collect", 2), ("cart", 2), ("buy", 4)], 4, 4),
+    "out_of_order": ([("cart", 1), ("collect", 2), ("click", 3)], 1, 1),
+    # 到达时间取最早的可行行为：cart@30 超出窗口，buy 不再计入
+    "window": ([("click", 0), ("collect", 5), ("cart", 30), ("buy", 31)], 4, 2),
+    "no_start": ([("collect", 1), ("buy", 2)], 0, 0),
+}
+
+
+def behavior_frame():
+    rows = [(f"u_{name}", "i1", action, timestamp, "c1")
+            for name, (events, _, _) in CASES.items() for action, timestamp in events]
+    return pd.DataFrame(rows, columns=["user_id", "item_id", "action", "timestamp", "category"])
+
+
+def numpy_depths(window_seconds):
+    data = BehaviorData(behavior_frame(), utc_offset=0)
+    group_user, depth = funnel_depth(data, STAGES, window_seconds)
+    return {data.user_ids[user][2:]: int(value) for user, value in zip(group_user, depth)}
+
+
+def sql_depths(window_seconds):
+    connection = sqlite3.connect(":memory:")
+    behavior_frame().to_sql("user_behavior_view", connection, index=False)
+    rows = connection.execute(build_funnel_depth_sql(STAGES, window_seconds)).fetchall()
+    return {user_id[2:]: depth for user_id, _, depth in rows}
+
+
+@pytest.mark.parametrize("window_seconds", [None, 10])
+@pytest.mark.parametrize("depths", [numpy_depths, sql_depths])
+def test_funnel_depth_follows_reached_time(depths, window_seconds):
+    column = 1 if window_seconds is None else 2
+    assert depths(window_seconds) == {name: case[column] for name, case in CASES.items()}
@@ -0,0 +1,63 @@
+# 查询节点执行器的跳过逻辑（用不连接Spark的假会话）
+import os
+from contextlib import contextmanager
+
+import funnel_engine
+from job_runner import QueryNode, JobRunner
+
+
+class FakeSparkContext:
+    def setJobDescription(self, description):
+        pass
+
+
+class FakeSpark:
+    sparkContext = FakeSparkContext()
+
+
+class RecordingTracker:
+    def __init__(self):
+        self.tasks = []
+
+    @contextmanager
+    def track_task(self, task_name):
+        self.tasks.append(task_name)
+        yield
+
+
+def make_nodes(output_dir):
+    def execute_save(spark, params):
+        os.makedirs(output_dir, exist_ok=True)
+
+    def execute_display(spark, params):
+        pass
+
+    return [QueryNode("save", None, execute_save, outputs=[output_dir], helpers=[funnel_engine]),
+            QueryNode("display", None, execute_display, depends=["save"])]
+
+
+def run_once(tmp_path, nodes, shared_code=()):
+    tracker = RecordingTracker()
+    runner = JobRunner(FakeSpark(), nodes, {}, [], state_file=str(tmp_path / "state.json"),
+                       shared_code=shared_code, task_tracker=tracker)
+    return {name: status for name, status, _ in runner.run()}, tracker.tasks
+
+
+def test_nodes_without_outputs_always_run(tmp_path):
+    nodes = make_nodes(str(tmp_path / "out"))
+    statuses, tracked = run_once(tmp_path, nodes)
+    assert statuses == {"save": "完成", "display": "完成"}
+    assert tracked == ["save", "display"]
+
+    statuses, tracked = run_once(tmp_path, nodes)
+    assert statuses == {"save": "跳过", "display": "完成"}
+    assert tracked == ["display"]
+
+
+def test_shared_code_change_reruns_nodes(tmp_path):
+    nodes = make_nodes(str(tmp_path / "out"))
+    run_once(tmp_path, nodes, shared_code=[make_nodes])
+    statuses, _ = run_once(tmp_path, nodes, shared_code=[make_nodes])
+    assert statuses["save"] == "跳过"
+    statuses, _ = run_once(tmp_path, nodes, shared_code=[run_once])
+    assert statuses["save"] == "完成"
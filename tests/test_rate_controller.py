@@ -0,0 +1,88 @@
+# 自适应速率控制：同步和异步两种请求方式共用同一主机的速率和并发限制
+import asyncio
+import time
+
+import pytest
+
+from rate_controller import AdaptiveRateController, HostLimits
+
+URL = "http://stub.example/works/1"
+
+
+def make_controller(**options):
+    options.setdefault("jitter", 0.0)
+    return AdaptiveRateController(default_limits=HostLimits(**options))
+
+
+def test_async_request_respects_rate_and_concurrency():
+    controller = make_controller(start_rate=20.0, max_rate=20.0, max_concurrency=1)
+    peak = {"now": 0, "max": 0}
+
+    async def one():
+        async with controller.async_request(URL) as call:
+            peak["now"] += 1
+            peak["max"] = max(peak["max"], peak["now"])
+            await asyncio.sleep(0.01)
+            peak["now"] -= 1
+            call["status"] = 200
+
+    async def run():
+        await asyncio.gather(*(one() for _ in range(6)))
+
+    start_time = time.monotonic()
+    asyncio.run(run())
+    # 20次/秒：6个请求之间至少间隔5个 0.05 秒
+    assert time.monotonic() - start_time >= 0.24
+    assert peak["max"] == 1
+    state = controller.hosts[("stub.example", None)]
+    assert state.requests == 6 and state.errors == 0 and state.in_flight == 0
+
+
+def test_async_request_backs_off_on_error():
+    controller = make_controller(start_rate=4.0, max_rate=4.0)
+
+    async def fail():
+        async with controller.async_request(URL):
+            raise TimeoutError("page timeout")
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(fail())
+    state = controller.hosts[("stub.example", None)]
+    assert state.errors == 1 and state.rate == 2.0 and state.in_flight == 0
+
+
+def test_non_retry_status_does_not_back_off():
+    controller = make_controller(start_rate=4.0, max_rate=4.0)
+    with pytest.raises(ValueError):
+        with controller.request(URL) as call:
+            call["status"] = 404
+            raise ValueError("not found")
+    state = controller.hosts[("stub.example", None)]
+    assert state.errors == 0 and state.rate == 4.0
+
+
+def test_rate_recovers_after_latency_settles():
+    controller = make_controller(start_rate=0.5, max_rate=1.0)
+    for latency in [0.2] * 5 + [2.0] * 3:
+        controller.record(URL, latency, 200)
+    state = controller.hosts[("stub.example", None)]
+    assert state.rate < 0.5
+    # 页面加载稳定在2秒：基线随之上升，不再视为拥塞，速率回到上限
+    for _ in range(50):
+        controller.record(URL, 2.0, 200)
+    assert state.rate == pytest.approx(1.0)
+    assert state.baseline_latency > 1.5
+
+
+def test_request_kinds_keep_separate_state():
+    controller = make_controller(start_rate=0.5, max_rate=1.0)
+    for _ in range(5):
+        controller.record(URL, 0.2, 200, kind="static")
+        controller.record(URL, 2.0, 200, kind="browser")
+    static = controller.hosts[("stub.example", "static")]
+    browser = controller.hosts[("stub.example", "browser")]
+    assert static.rate == pytest.approx(1.0) and browser.rate == pytest.approx(1.0)
+    assert static.errors == browser.errors == 0
+    # Retry-After 暂停整个主机
+    controller.record(URL, 0.2, 429, retry_after=30, kind="static")
+    assert browser.next_time >= static.next_time > time.monotonic() + 25
@@ -0,0 +1,74 @@
+# driver端写出小结果的格式（用不依赖Spark的假DataFrame）
+import json
+from decimal import Decimal
+
+import pytest
+
+from result_sink import MANIFEST_NAME, _java_float_text, write_result
+
+
+class FakeType:
+    def __init__(self, name):
+        self.name = name
+
+    def typeName(self):
+        return self.name
+
+
+class FakeField:
+    def __init__(self, name, type_name):
+        self.name = name
+        self.dataType = FakeType(type_name)
+
+
+class FakeSchema:
+    def __init__(self, fields):
+        self.fields = fields
+
+
+class FakeDataFrame:
+    def __init__(self, columns, types, rows):
+        self.columns = columns
+        self.schema = FakeSchema([FakeField(name, type_name) for name, type_name in zip(columns, types)])
+        self.rows = rows
+
+    def limit(self, count):
+        return FakeDataFrame(self.columns, [field.dataType.name for field in self.schema.fields], self.rows[:count])
+
+    def collect(self):
+        return list(self.rows)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (12.5, "12.5"), (100.0, "100.0"), (0.001, "0.001"), (-3.25, "-3.25"), (9999999.0, "9999999.0"),
+    (1e7, "1.0E7"), (12345678.9, "1.23456789E7"), (0.00015, "1.5E-4"), (1e21, "1.0E21"),
+    (0.0, "0.0"), (float("nan"), "NaN"), (float("-inf"), "-Infinity"),
+])
+def test_java_double_text(value, expected):
+    assert _java_float_text(value) == expected
+
+
+def test_java_float_text_uses_single_precision_digits():
+    assert _java_float_text(1.100000023841858, single=True) == "1.1"
+
+
+def test_small_csv_matches_spark_format(tmp_path):
+    output_dir = tmp_path / "result"
+    df = FakeDataFrame(["item_id", "rate", "ratio", "flag"], ["string", "double", "float", "boolean"],
+                       [("a", 12345678.9, 1.100000023841858, True), ("b", None, 0.5, False)])
+    entry = write_result(df, str(output_dir))
+    assert entry["rows"] == 2 and entry["single_file"]
+    text = (output_dir / "part-00000.csv").read_text(encoding="utf-8")
+    assert text.splitlines() == ["item_id,rate,ratio,flag", "a,1.23456789E7,1.1,true", "b,,0.5,false"]
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert manifest["result"]["rows"] == 2
+
+
+def test_small_json_handles_decimal(tmp_path):
+    output_dir = tmp_path / "result"
+    df = FakeDataFrame(["item_id", "rate", "total"], ["string", "decimal(10,2)", "decimal(10,0)"],
+                       [("a", Decimal("12.34"), Decimal("5")), ("b", None, Decimal("7"))])
+    write_result(df, str(output_dir), "json")
+    lines = (output_dir / "part-00000.json").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [{"item_id": "a", "rate": 12.34, "total": 5},
+                                                    {"item_id": "b", "total": 7}]
@@ -0,0 +1,58 @@
+# 静态HTML解析：保存的文章页面和桩服务器生成的页面
+import os
+
+from crawler_stubs import ArticlePageHandler, StubServer, make_article_html
+from static_extract import (SimpleDocument, extract_article_static, is_complete, parse_article_html,
+                            parse_document)
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "tandf_article.html")
+
+
+def read_fixture():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_parse_fixture():
+    article_data = parse_article_html(read_fixture(), "https://www.tandfonline.com/doi/full/10.1080/x")
+    assert article_data["标题"] == "Generative AI Adoption and Knowledge Work Productivity"
+    assert article_data["作者"] == "Jane Doe, Wei Zhang"
+    assert article_data["期刊名称"] == "Journal of Management Information Systems"
+    assert (article_data["volume"], article_data["issue"], article_data["page"]) == ("42", "Issue 3", "701-730")
+    assert article_data["keywords"] == "Generative AI, productivity, field experiment"
+    assert article_data["摘要"].startswith("We study how generative AI tools")
+    assert article_data["年份"] == "2025"
+    assert article_data["URL"] == "https://www.tandfonline.com/doi/full/10.1080/x"
+    assert is_complete(article_data)
+
+
+def test_simple_document_selectors():
+    document = SimpleDocument(read_fixture())
+    assert [document.text(node) for node in document.select("div.NLM_contrib-group > a.author")] == \
+        ["Jane Doe", "Wei Zhang"]
+    assert document.select("meta[name='citation_volume']")[0].attrs["content"] == "42"
+    # 子元素关系不匹配更深的后代
+    assert document.select("div.volume-info > a.author") == []
+    assert len(parse_document(read_fixture()).select("h1")) == 1
+
+
+def test_meta_fallback_when_markup_missing():
+    html = ('<html><head><meta name="citation_title" content="Meta Title">'
+            '<meta name="citation_author" content="A. Author"><meta name="citation_journal_title" content="J">'
+            '<meta name="citation_firstpage" content="5"><meta name="citation_lastpage" content="9">'
+            '</head><body></body></html>')
+    article_data = parse_article_html(html, "u")
+    assert (article_data["标题"], article_data["作者"], article_data["期刊名称"], article_data["page"]) == \
+        ("Meta Title", "A. Author", "J", "5-9")
+
+
+def test_dynamic_page_is_incomplete():
+    assert not is_complete(parse_article_html(make_article_html("10.1080/stub.1", dynamic=True), "u"))
+
+
+def test_extract_from_stub_server():
+    with StubServer(ArticlePageHandler, missing=["10.1080/stub.2"]) as server:
+        article_data, complete = extract_article_static(f"{server.base_url}/doi/full/10.1080/stub.1")
+        assert complete and article_data["标题"] == "Stub article 10.1080/stub.1"
+        article_data, complete = extract_article_static(f"{server.base_url}/doi/full/10.1080/stub.2")
+        assert article_data is not None and not complete
@@ -0,0 +1,159 @@
+# 待抓取URL的输入：从文本/CSV/JSONL文件中逐行读取文章URL或DOI（不把整个文件读入内存），
+# 用 extract_doi_from_url 规范化DOI，在发出任何网络请求之前去重：同一DOI的不同URL形式
+# （/doi/full|abs|pdf/、doi.org链接、大小写、URL编码）只保留第一次出现的那一个。
+# 去重默认使用集合；输入达到上千万行时可以改用布隆过滤器（内存固定，但有极小概率把新DOI误判为重复）
+# 运行：python url_input.py 文件 ... [--bloom 容量]（只统计，不抓取）
+
+import os
+import sys
+import csv
+import json
+import math
+import hashlib
+import argparse
+
+from article_common import extract_doi_from_url
+
+TANDF_DOI_URL = "https://www.tandfonline.com/doi/full/{doi}"  # 只有DOI时使用的文章页地址
+URL_FIELDS = ["url", "URL", "link", "href"]  # CSV列名/JSONL字段名
+DOI_FIELDS = ["doi", "DOI"]
+
+
+class BloomFilter:
+    """
+    布隆过滤器：capacity个元素时误判率约为error_rate
+
+    Args:
+        capacity: 预计的元素个数
+        error_rate: 误判率
+    """
+
+    def __init__(self, capacity, error_rate=1e-6):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    # 加入元素，返回元素此前是否（可能）已存在
+    def add(self, key):
+        existed = True
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] >> bit & 1:
+                existed = False
+                self.bits[byte] |= 1 << bit
+        return existed
+
+
+class SetFilter:
+    def __init__(self):
+        self.keys = set()
+
+    def add(self, key):
+        if key in self.keys:
+            return True
+        self.keys.add(key)
+        return False
+
+
+class InputStats:
+    def __init__(self):
+        self.rows = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.unique = 0
+
+    def report(self):
+        print(f"[+] 输入: 读取 {self.rows} 行，有效 {self.unique}，重复 {self.duplicates}，无法识别 {self.invalid}")
+
+
+def _pick_field(record, fields):
+    for field in fields:
+        if record.get(field):
+            return str(record[field]).strip()
+    return ""
+
+
+# 逐行读取一个输入文件，产出原始的URL或DOI字符串
+def iter_raw_values(path):
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8", newline="") as f:
+        if extension == ".csv":
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            columns = [index for index, name in enumerate(header) if name.strip() in URL_FIELDS + DOI_FIELDS]
+            if not columns:
+                # 没有表头：每行取第一列，表头行本身也是数据
+                columns = [0]
+                yield header[0] if header else ""
+            for row in reader:
+                yield next((row[index] for index in columns if index < len(row) and row[index].strip()), "")
+        elif extension in (".jsonl", ".ndjson"):
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    yield ""
+                    continue
+                if isinstance(record, str):
+                    yield record
+                elif isinstance(record, dict):
+                    yield _pick_field(record, URL_FIELDS) or _pick_field(record, DOI_FIELDS)
+                else:
+                    yield ""
+        else:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+
+
+# 逐个产出去重后的 (URL, DOI)；没有DOI的URL按URL去重，只有DOI时构造文章页地址
+def iter_unique_urls(paths, bloom_capacity=0, stats=None):
+    seen = BloomFilter(bloom_capacity) if bloom_capacity else SetFilter()
+    stats = stats if stats is not None else InputStats()
+    for path in paths:
+        print(f"[+] 读取输入文件: {path}")
+        for value in iter_raw_values(path):
+            stats.rows += 1
+            value = value.strip()
+            doi = extract_doi_from_url(value) if value else None
+            if doi:
+                url = value if value.lower().startswith(("http://", "https://")) else TANDF_DOI_URL.format(doi=doi)
+                key = "doi:" + doi
+            elif value.lower().startswith(("http://", "https://")):
+                url, key = value, "url:" + value.split("#")[0]
+            else:
+                stats.invalid += 1
+                continue
+            if seen.add(key):
+                stats.duplicates += 1
+                continue
+            stats.unique += 1
+            yield url, doi
+
+
+def main():
+    parser = argparse.ArgumentParser(description="读取并去重待抓取的URL/DOI")
+    parser.add_argument("paths", nargs="+", help="文本/CSV/JSONL文件")
+    parser.add_argument("--bloom", type=int, default=0, help="使用布隆过滤器去重，参数为预计的元素个数")
+    parser.add_argument("--show", type=int, default=10, help="显示前几个结果")
+    args = parser.parse_args()
+
+    stats = InputStats()
+    for index, (url, doi) in enumerate(iter_unique_urls(args.paths, args.bloom, stats)):
+        if index < args.show:
+            print(f"{doi or '-'}\t{url}")
+    stats.report()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
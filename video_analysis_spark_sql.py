@@ -2,66 +2,151 @@
 # 使用Spark SQL和原生SQL对比分析性能差异
 
 import re
+import sys
 import time
 import sqlite3
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import regexp_extract, count, col, desc, when
+from itertools import chain, islice
+from pyspark.sql.functions import regexp_extract, count, col, desc, when, pandas_udf
+from pyspark.sql.types import StringType
+
+from access_log import VIDEO_ID_PATTERN, video_id_regex, CLIENT_IP_PATTERN, STATUS_PATTERN, BYTES_PATTERN
+from spark_session_factory import create_spark_session, timed_query, get_input_size
+from log_input import expand_log_paths, iter_log_lines
+from result_sink import write_result
+
+LOG_FILE = "access.20161111.log"
+
+# 提取视频ID - 原方案：先提取request_url，再分别匹配 /video/ 和 mid= （共三次正则）
+def extract_video_id_three_pass(log_df):
+    # 解析日志文件内容，提取请求URL
+    log_df = log_df.withColumn("request_url", regexp_extract(col("value"), '\"(GET|POST) (.+) HTTP/1\\.1\"', 2))
+    
+    # 提取视频ID - 匹配 /video/ 或 mid= 格式的视频请求
+    log_df = log_df.withColumn("video_id", regexp_extract(col("request_url"), "/video/(\\d+)", 1))
+    
+    # 另外检查POST请求中的mid参数
+    log_df = log_df.withColumn("video_id", \
+        when(col("video_id") == "", regexp_extract(col("request_url"), "mid=(\\d+)\\&?", 1)).otherwise(col("video_id")))
+    return log_df
+
+# 提取视频ID - 单次组合正则，直接作用于原始value列
+def extract_video_id_single_pass(log_df):
+    return log_df.withColumn("video_id", regexp_extract(col("value"), VIDEO_ID_PATTERN, 1))
+
+# 提取视频ID - 可选的向量化pandas UDF方案（需要安装pandas和pyarrow）
+def extract_video_id_pandas_udf(log_df):
+    import pandas as pd
+    
+    # 按Arrow批次整体提取视频ID，未匹配时返回空串
+    @pandas_udf(StringType())
+    def video_id_udf(values: pd.Series) -> pd.Series:
+        return values.str.extract(video_id_regex, expand=False).fillna("")
+    
+    return log_df.withColumn("video_id", video_id_udf(col("value")))
+
+# 提取客户端IP、状态码和响应字节数，用于计算独立访客、流量和状态码分布
+def extract_access_fields(log_df):
+    return log_df \
+        .withColumn("client_ip", regexp_extract(col("value"), CLIENT_IP_PATTERN, 1)) \
+        .withColumn("status", regexp_extract(col("value"), STATUS_PATTERN, 1)) \
+        .withColumn("bytes", regexp_extract(col("value"), BYTES_PATTERN, 1).cast("long"))
+
+# 在完整日志上对比各视频ID提取方案的TOP 20查询耗时
+def benchmark_video_id_extraction(spark, log_paths=LOG_FILE):
+    print("\n=== 视频ID提取方案性能对比（完整日志） ===")
+    extractors = [
+        ("三次正则(原方案)", extract_video_id_three_pass),
+        ("单次组合正则", extract_video_id_single_pass),
+        ("pandas UDF", extract_video_id_pandas_udf),
+    ]
+    
+    durations = {}
+    top_lists = []
+    for name, extractor in extractors:
+        start_time = time.time()
+        try:
+            video_df = extractor(spark.read.text(log_paths)).filter(col("video_id") != "")
+            top_rows = video_df.groupBy("video_id") \
+                .agg(count("*").alias("view_count")) \
+                .orderBy(desc("view_count"), "video_id") \
+                .limit(20) \
+                .collect()
+        except Exception as e:
+            print(f"{name} 执行失败: {e}")
+            continue
+        durations[name] = time.time() - start_time
+        top_lists.append([(row["video_id"], row["view_count"]) for row in top_rows])
+        print(f"{name} 耗时: {durations[name]:.2f} 秒")
+    
+    # 校验各方案的TOP 20结果是否一致
+    if top_lists:
+        consistent = all(top == top_lists[0] for top in top_lists)
+        print(f"各方案TOP 20结果一致: {'是' if consistent else '否'}")
+    return durations
 
 def main():
-    # 初始化SparkSession
-    spark = SparkSession.builder \
-        .appName("VideoPopularityAnalysis") \
-        .master("local[*]") \
-        .getOrCreate()
+    # 日志路径：命令行中非"--"开头的参数，支持通配符和 .gz/.bz2/.zst 压缩的轮转日志
+    # Spark按文件并行读取压缩日志（gzip等不可切分，每个文件一个任务）；.zst需要Hadoop支持zstd编解码
+    log_patterns = [arg for arg in sys.argv[1:] if not arg.startswith("--")] or [LOG_FILE]
+    log_paths = expand_log_paths(log_patterns)
+    
+    # 初始化SparkSession（配置档由环境变量SPARK_PROFILE指定，默认small-local）
+    spark = create_spark_session("VideoPopularityAnalysis", input_paths=log_paths)
     
     print("=== 任务2.5：分析统计主站最受欢迎的视频TOP 20 ===")
-    print("数据来源: access.20161111.log")
+    print(f"数据来源: {', '.join(log_paths)}")
     
     # 方法1：使用Spark SQL分析
     print("\n1. 使用Spark SQL进行分析...")
     spark_start_time = time.time()
     
     # 读取日志文件
-    log_df = spark.read.text("access.20161111.log")
-    
-    # 解析日志文件内容，提取请求URL
-    log_df = log_df.withColumn("request_url", regexp_extract(col("value"), '\"(GET|POST) (.+) HTTP/1\\.1\"', 2))
-    
-    # 提取视频ID - 匹配 /video/ 或 mid= 格式的视频请求
-    log_df = log_df.withColumn("video_id", regexp_extract(col("request_url"), "/video/(\\d+)", 1))
+    log_df = spark.read.text(log_paths)
     
-    # 另外检查POST请求中的mid参数
-    log_df = log_df.withColumn("video_id", \
-        when(col("video_id") == "", regexp_extract(col("request_url"), "mid=(\\d+)\\&?", 1)).otherwise(col("video_id")))
+    # 提取视频ID - 单次组合正则同时匹配 /video/ 和 mid= 格式的视频请求
+    log_df = extract_video_id_single_pass(log_df)
     
-    # 筛选出有效的视频访问记录
-    video_df = log_df.filter(col("video_id") != "")
+    # 筛选出有效的视频访问记录，并提取IP/状态码/字节数
+    video_df = extract_access_fields(log_df.filter(col("video_id") != ""))
     
     # 创建临时视图
     video_df.createOrReplaceTempView("video_views")
     
     # 使用Spark SQL查询最受欢迎的TOP 20视频
+    # 在同一次聚合中计算独立访客数（HyperLogLog++近似，各分区草图可合并）、总流量和状态码分布
     top_videos_spark = spark.sql("""
-        SELECT video_id, COUNT(*) as view_count
+        SELECT video_id, COUNT(*) as view_count,
+            APPROX_COUNT_DISTINCT(client_ip, 0.02) as unique_visitors,
+            COALESCE(SUM(bytes), 0) as total_bytes,
+            SUM(CASE WHEN status LIKE '2%' THEN 1 ELSE 0 END) as status_2xx,
+            SUM(CASE WHEN status LIKE '3%' THEN 1 ELSE 0 END) as status_3xx,
+            SUM(CASE WHEN status LIKE '4%' THEN 1 ELSE 0 END) as status_4xx,
+            SUM(CASE WHEN status LIKE '5%' THEN 1 ELSE 0 END) as status_5xx
         FROM video_views
         GROUP BY video_id
         ORDER BY view_count DESC
         LIMIT 20
     """)
     
+    print("\nSpark SQL - 最受欢迎的TOP 20视频:")
+    with timed_query("TOP 20视频查询"):
+        top_videos_spark.show()
+    
+    # Spark是惰性执行的，读取和聚合都发生在show()中，因此从读取日志开始计时到show()结束
     spark_end_time = time.time()
     spark_duration = spark_end_time - spark_start_time
+    print(f"Spark SQL 分析耗时（读取+聚合）: {spark_duration:.2f} 秒")
     
-    print(f"Spark SQL 分析耗时: {spark_duration:.2f} 秒")
-    print("\nSpark SQL - 最受欢迎的TOP 20视频:")
-    top_videos_spark.show()
+    # 端到端吞吐量（按输入文件大小计算，压缩日志即为压缩后的大小）
+    input_mb = get_input_size(log_paths) / 1024 / 1024
+    print(f"输入 {input_mb:.1f} MB，吞吐量: {input_mb / max(spark_duration, 1e-9):.1f} MB/s")
     
     # 确保output目录存在
     import os
     os.makedirs("output", exist_ok=True)
     
     # 保存Spark SQL结果
-    top_videos_spark.write.csv("output/top20_videos_spark", header=True, mode="overwrite")
+    write_result(top_videos_spark, "output/top20_videos_spark")
     print("\nSpark SQL结果已保存到 output/top20_videos_spark 目录")
     
     # 方法2：使用原生SQL（SQLite）分析 - 由于数据量大，采样一部分数据进行演示
@@ -94,37 +179,35 @@ def main():
     batch_data = []
     
     try:
-        with open("access.20161111.log", 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                if count >= sample_size:
-                    break
-                    
-                # 提取请求URL
-                match = re.search(r'"(GET|POST) (.+) HTTP/1\.1"', line)
-                if match:
-                    request_url = match.group(2)
-                    video_id = ""
-                    
-                    # 尝试匹配/video/格式
-                    video_match = video_pattern1.search(request_url)
+        # 所有日志文件串成一个行迭代器，读满sample_size行就停止，不再打开剩余的文件
+        sample_lines = islice(chain.from_iterable(iter_log_lines(log_path) for log_path in log_paths), sample_size)
+        for line in sample_lines:
+            # 提取请求URL
+            match = re.search(r'"(GET|POST) (.+) HTTP/1\.1"', line)
+            if match:
+                request_url = match.group(2)
+                video_id = ""
+                
+                # 尝试匹配/video/格式
+                video_match = video_pattern1.search(request_url)
+                if video_match:
+                    video_id = video_match.group(1)
+                else:
+                    # 尝试匹配mid=格式
+                    video_match = video_pattern2.search(request_url)
                     if video_match:
                         video_id = video_match.group(1)
-                    else:
-                        # 尝试匹配mid=格式
-                        video_match = video_pattern2.search(request_url)
-                        if video_match:
-                            video_id = video_match.group(1)
+                
+                if video_id:
+                    batch_data.append((request_url, video_id))
                     
-                    if video_id:
-                        batch_data.append((request_url, video_id))
-                        
-                        if len(batch_data) >= batch_size:
-                            cursor.executemany('INSERT INTO log_records VALUES (?, ?)', batch_data)
-                            batch_data = []
-                            count += batch_size
-                            if count % 100000 == 0:
-                                print(f"已处理 {count} 行数据...")
-        
+                    if len(batch_data) >= batch_size:
+                        cursor.executemany('INSERT INTO log_records VALUES (?, ?)', batch_data)
+                        batch_data = []
+                        count += batch_size
+                        if count % 100000 == 0:
+                            print(f"已处理 {count} 行数据...")
+    
         # 插入剩余数据
         if batch_data:
             cursor.executemany('INSERT INTO log_records VALUES (?, ?)', batch_data)
@@ -167,6 +250,10 @@ def main():
     print("- 对于本案例中的超大规模日志文件(1800万行)，Spark SQL的优势会更加明显")
     print("- Spark SQL支持更大规模数据的处理，而不受单机内存限制")
     
+    # 可选：在完整日志上对比视频ID提取方案（python video_analysis_spark_sql.py --benchmark-extract）
+    if "--benchmark-extract" in sys.argv:
+        benchmark_video_id_extraction(spark, log_paths)
+    
     # 停止SparkSession
     spark.stop()
     
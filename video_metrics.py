@@ -0,0 +1,214 @@
+# 每个视频的访问指标：访问次数、独立访客数（HyperLogLog近似）、总流量字节数、状态码分布
+# 一次扫描日志同时计算所有指标；日志按字节范围切分成多个分片并行扫描，
+# 各分片的统计结果（包括HyperLogLog草图）可以直接合并，且内存占用与独立IP数量无关
+
+import os
+import csv
+import sys
+import math
+import time
+import hashlib
+from multiprocessing import Pool
+
+from access_log import extract_video_id, parse_access_fields
+from log_input import expand_log_paths, is_compressed, iter_log_lines, LogThroughput
+
+LOG_FILE = "access.20161111.log"
+OUTPUT_FILE = "output/video_metrics.csv"
+
+# 状态码按首位数字归类
+STATUS_CLASSES = ["2xx", "3xx", "4xx", "5xx", "other"]
+_STATUS_INDEX = {"2": 0, "3": 1, "4": 2, "5": 3}
+
+
+class HyperLogLog:
+    """
+    HyperLogLog基数估计草图，寄存器数为 2^precision，每个寄存器1字节
+
+    precision=10 时固定占用1KB，标准误差约 1.04/sqrt(1024) ≈ 3.3%
+    """
+
+    def __init__(self, precision=10):
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+        self._value_bits = 64 - precision
+        self._value_mask = (1 << self._value_bits) - 1
+
+    def add(self, value):
+        hashed = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = hashed >> self._value_bits
+        # 剩余位中第一个1出现的位置（从1开始计数）
+        rank = self._value_bits - (hashed & self._value_mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    # 合并另一个同精度的草图（逐寄存器取最大值）
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("只能合并相同精度的HyperLogLog草图")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        # 小基数时使用线性计数修正
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class VideoMetrics:
+    """每个视频的访问指标汇总，支持按分片合并"""
+
+    def __init__(self, precision=10):
+        self.precision = precision
+        self.hits = {}
+        self.total_bytes = {}
+        self.status_counts = {}
+        self.visitors = {}
+
+    def add(self, video_id, client_ip, status, size):
+        if video_id not in self.hits:
+            self.hits[video_id] = 0
+            self.total_bytes[video_id] = 0
+            self.status_counts[video_id] = [0] * len(STATUS_CLASSES)
+            self.visitors[video_id] = HyperLogLog(self.precision)
+        self.hits[video_id] += 1
+        self.total_bytes[video_id] += size
+        self.status_counts[video_id][_STATUS_INDEX.get(status[:1], 4)] += 1
+        if client_ip:
+            self.visitors[video_id].add(client_ip)
+
+    # 解析并记录一行日志，返回是否为有效的视频访问记录
+    def add_line(self, line):
+        video_id = extract_video_id(line)
+        if not video_id:
+            return False
+        client_ip, status, size = parse_access_fields(line)
+        self.add(video_id, client_ip, status, size)
+        return True
+
+    # 合并另一个分片的统计结果
+    def merge(self, other):
+        for video_id, hits in other.hits.items():
+            if video_id not in self.hits:
+                self.hits[video_id] = hits
+                self.total_bytes[video_id] = other.total_bytes[video_id]
+                self.status_counts[video_id] = list(other.status_counts[video_id])
+                self.visitors[video_id] = other.visitors[video_id]
+                continue
+            self.hits[video_id] += hits
+            self.total_bytes[video_id] += other.total_bytes[video_id]
+            counts = self.status_counts[video_id]
+            for i, value in enumerate(other.status_counts[video_id]):
+                counts[i] += value
+            self.visitors[video_id].merge(other.visitors[video_id])
+
+    # 按访问次数降序返回指标行，top为None时返回全部视频
+    def rows(self, top=None):
+        video_ids = sorted(self.hits, key=lambda video_id: (-self.hits[video_id], video_id))
+        if top is not None:
+            video_ids = video_ids[:top]
+        for video_id in video_ids:
+            yield [video_id, self.hits[video_id], self.visitors[video_id].count(),
+                   self.total_bytes[video_id]] + self.status_counts[video_id]
+
+
+# 将文件按字节范围切分为若干分片，返回 [(start, end), ...]
+def split_file(log_file, num_parts):
+    file_size = os.path.getsize(log_file)
+    part_size = max(1, -(-file_size // num_parts))
+    return [(start, min(start + part_size, file_size)) for start in range(0, file_size, part_size)]
+
+
+# 扫描一个分片：未压缩文件按字节范围扫描（以行首落在范围内为准），
+# 压缩文件无法按字节切分，start为None时整个文件作为一个分片，边解压边解析
+def scan_partition(task):
+    log_file, start, end, precision = task
+    metrics = VideoMetrics(precision)
+    stats = LogThroughput()
+    if start is None:
+        stats.add_file(log_file)
+        for line in iter_log_lines(log_file, stats):
+            metrics.add_line(line)
+        return metrics, stats
+
+    stats.files = 1 if start == 0 else 0
+    stats.input_bytes = end - start
+    with open(log_file, 'rb') as f:
+        if start > 0:
+            # 从上一个换行符之后开始，前一个分片负责跨越边界的那一行
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            raw_line = f.readline()
+            if not raw_line:
+                break
+            stats.decompressed_bytes += len(raw_line)
+            stats.lines += 1
+            metrics.add_line(raw_line.decode('utf-8', errors='ignore'))
+    return metrics, stats
+
+
+# 并行扫描所有日志文件（支持通配符和压缩文件）并合并各分片的指标
+def collect_video_metrics(log_patterns=LOG_FILE, workers=None, precision=10):
+    workers = workers or os.cpu_count() or 1
+    tasks = []
+    for log_file in expand_log_paths(log_patterns):
+        if is_compressed(log_file):
+            tasks.append((log_file, None, None, precision))
+        else:
+            tasks.extend((log_file, start, end, precision) for start, end in split_file(log_file, workers))
+
+    metrics = VideoMetrics(precision)
+    stats = LogThroughput()
+    if workers == 1:
+        for partial_metrics, partial_stats in map(scan_partition, tasks):
+            metrics.merge(partial_metrics)
+            stats.merge(partial_stats)
+        return metrics, stats
+    # 多个文件/分片之间相互独立，交给进程池并行处理
+    with Pool(workers) as pool:
+        for partial_metrics, partial_stats in pool.imap_unordered(scan_partition, tasks):
+            metrics.merge(partial_metrics)
+            stats.merge(partial_stats)
+    return metrics, stats
+
+
+def save_metrics(metrics, output_file=OUTPUT_FILE):
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["video_id", "view_count", "unique_visitors", "total_bytes"]
+                        + [f"status_{name}" for name in STATUS_CLASSES])
+        writer.writerows(metrics.rows())
+
+
+def main():
+    # 可传入多个日志路径或通配符，如 python video_metrics.py "logs/access.*.log.gz"
+    log_patterns = sys.argv[1:] or [LOG_FILE]
+    print("=== 视频访问指标统计（访问次数/独立访客/流量/状态码） ===")
+    print(f"数据来源: {', '.join(log_patterns)}")
+
+    start_time = time.time()
+    metrics, stats = collect_video_metrics(log_patterns)
+    duration = time.time() - start_time
+    stats.report("日志扫描")
+    sketch_memory = len(metrics.visitors) * (1 << metrics.precision)
+    print(f"扫描耗时: {duration:.2f} 秒，视频数: {len(metrics.hits)}，"
+          f"HyperLogLog草图内存: {sketch_memory / 1024 / 1024:.2f} MB")
+
+    print("\n最受欢迎的TOP 20视频及其访问指标:")
+    print("视频ID, 访问次数, 独立访客(约), 总流量(字节), " + ", ".join(STATUS_CLASSES))
+    for row in metrics.rows(top=20):
+        print(", ".join(str(value) for value in row))
+
+    save_metrics(metrics)
+    print(f"\n全部视频指标已保存到 {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
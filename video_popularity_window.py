@@ -0,0 +1,218 @@
+# 视频热度时间窗口分析：按分钟/小时分桶统计每个视频的访问次数
+# 每个视频只保存一段紧凑的前缀和数组(array)，任意时间窗口的TOP K查询
+# 直接由前缀和相减得到，无需重新扫描日志；日志追加新内容时可增量更新
+
+import os
+import sys
+import time
+import heapq
+import argparse
+from array import array
+from datetime import datetime, timezone
+
+from access_log import extract_video_id, parse_log_time
+from log_input import expand_log_paths, is_compressed, iter_log_lines, LogThroughput
+
+LOG_FILE = "access.20161111.log"
+
+
+class VideoPopularityWindow:
+    """
+    按时间分桶的视频热度统计
+
+    Args:
+        bucket_seconds: 分桶粒度（秒），60为按分钟，3600为按小时
+    """
+
+    def __init__(self, bucket_seconds=60):
+        self.bucket_seconds = bucket_seconds
+        # video_id -> 该视频前缀和数组对应的起始桶号
+        self.first_bucket = {}
+        # video_id -> array('L')，第i项为从起始桶到第(起始桶+i)个桶的累计访问次数
+        self.prefix_counts = {}
+        # 日志文件 -> 已处理到的字节偏移（用于增量更新）
+        self.file_offsets = {}
+        self.total_lines = 0
+        self.video_lines = 0
+        self.min_time = None
+        self.max_time = None
+
+    # 记录一次（或n次）视频访问
+    def add(self, video_id, timestamp, n=1):
+        bucket = timestamp // self.bucket_seconds
+        if self.min_time is None or timestamp < self.min_time:
+            self.min_time = timestamp
+        if self.max_time is None or timestamp > self.max_time:
+            self.max_time = timestamp
+
+        prefix = self.prefix_counts.get(video_id)
+        if prefix is None:
+            self.first_bucket[video_id] = bucket
+            self.prefix_counts[video_id] = array('L', [n])
+            return
+
+        index = bucket - self.first_bucket[video_id]
+        if index >= len(prefix):
+            # 常见情况：日志按时间追加，新访问落在最后一个桶之后，补齐累计值后只需修改末尾
+            prefix.extend([prefix[-1]] * (index - len(prefix) + 1))
+            prefix[index] += n
+        elif index >= 0:
+            # 乱序的历史日志：该桶及之后所有桶的累计值都要加n
+            for i in range(index, len(prefix)):
+                prefix[i] += n
+        else:
+            # 比该视频的起始桶还早：整体前移起始桶
+            shifted = array('L', [n]) * (-index)
+            shifted.extend(value + n for value in prefix)
+            self.prefix_counts[video_id] = shifted
+            self.first_bucket[video_id] = bucket
+
+    # 解析并记录一行日志，返回是否为有效的视频访问记录
+    def add_line(self, line):
+        self.total_lines += 1
+        video_id = extract_video_id(line)
+        if not video_id:
+            return False
+        timestamp = parse_log_time(line)
+        if timestamp is None:
+            return False
+        self.video_lines += 1
+        self.add(video_id, timestamp)
+        return True
+
+    # 增量读取日志文件中上次处理之后新追加的完整行，返回本次处理的行数
+    def update_from_log(self, log_file=LOG_FILE):
+        offset = self.file_offsets.get(log_file, 0)
+        if os.path.getsize(log_file) < offset:
+            # 文件被截断或轮转，从头开始读取
+            offset = 0
+
+        processed = 0
+        with open(log_file, 'rb') as f:
+            f.seek(offset)
+            for raw_line in f:
+                if not raw_line.endswith(b"\n"):
+                    # 行尾还未写完，留到下次更新时处理
+                    break
+                offset += len(raw_line)
+                self.add_line(raw_line.decode('utf-8', errors='ignore'))
+                processed += 1
+        self.file_offsets[log_file] = offset
+        return processed
+
+    # 读取多个日志文件（支持通配符和 .gz/.bz2/.zst 压缩的轮转日志），返回本次处理的行数
+    def update_from_logs(self, log_patterns, stats=None):
+        processed = 0
+        for log_file in expand_log_paths(log_patterns):
+            if not is_compressed(log_file):
+                processed += self.update_from_log(log_file)
+                continue
+            # 压缩的轮转日志不会再追加内容，只需完整读取一次
+            if log_file in self.file_offsets:
+                continue
+            if stats is not None:
+                stats.add_file(log_file)
+            for line in iter_log_lines(log_file, stats):
+                self.add_line(line)
+                processed += 1
+            self.file_offsets[log_file] = os.path.getsize(log_file)
+        return processed
+
+    # 某视频在第bucket个桶之前（不含）的累计访问次数
+    def _count_before(self, video_id, bucket):
+        prefix = self.prefix_counts[video_id]
+        index = bucket - self.first_bucket[video_id]
+        if index <= 0:
+            return 0
+        if index > len(prefix):
+            return prefix[-1]
+        return prefix[index - 1]
+
+    # 时间窗口 [start_time, end_time) 对应的桶号范围（按分桶粒度对齐）
+    def _bucket_range(self, start_time, end_time):
+        start_bucket = start_time // self.bucket_seconds
+        end_bucket = -(-end_time // self.bucket_seconds)
+        return start_bucket, end_bucket
+
+    # 查询某视频在时间窗口 [start_time, end_time) 内的访问次数
+    def window_count(self, video_id, start_time, end_time):
+        if video_id not in self.prefix_counts:
+            return 0
+        start_bucket, end_bucket = self._bucket_range(start_time, end_time)
+        return self._count_before(video_id, end_bucket) - self._count_before(video_id, start_bucket)
+
+    # 查询时间窗口 [start_time, end_time) 内访问次数最多的k个视频，返回 [(video_id, view_count), ...]
+    def top_k(self, start_time, end_time, k=20):
+        start_bucket, end_bucket = self._bucket_range(start_time, end_time)
+        counts = []
+        for video_id in self.prefix_counts:
+            view_count = self._count_before(video_id, end_bucket) - self._count_before(video_id, start_bucket)
+            if view_count > 0:
+                counts.append((view_count, video_id))
+        top = heapq.nsmallest(k, counts, key=lambda item: (-item[0], item[1]))
+        return [(video_id, view_count) for view_count, video_id in top]
+
+    # 前缀和数组占用的内存（字节）
+    def memory_bytes(self):
+        return sum(prefix.itemsize * len(prefix) for prefix in self.prefix_counts.values())
+
+
+# 把 "HH:MM" 转换为日志当天对应的时间戳
+def parse_clock(clock, day_start):
+    hour, minute = clock.split(":")
+    return day_start + int(hour) * 3600 + int(minute) * 60
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="视频热度时间窗口分析")
+    parser.add_argument("--log", nargs="+", default=[LOG_FILE], help="访问日志文件路径或通配符，支持 .gz/.bz2/.zst")
+    parser.add_argument("--bucket-seconds", type=int, default=60, help="分桶粒度（秒），默认按分钟")
+    parser.add_argument("--start", help="窗口开始时间 HH:MM（默认为日志起始时间）")
+    parser.add_argument("--end", help="窗口结束时间 HH:MM（默认为日志结束时间）")
+    parser.add_argument("--top", type=int, default=20, help="返回的视频数量")
+    parser.add_argument("--follow", type=int, default=0, help="每隔N秒增量读取新追加的日志并刷新结果，0表示只运行一次")
+    args = parser.parse_args()
+
+    print("=== 视频热度时间窗口分析 ===")
+    print(f"数据来源: {', '.join(args.log)}")
+
+    engine = VideoPopularityWindow(bucket_seconds=args.bucket_seconds)
+    while True:
+        load_start = time.time()
+        stats = LogThroughput()
+        processed = engine.update_from_logs(args.log, stats)
+        load_duration = time.time() - load_start
+        print(f"\n本次处理 {processed} 行日志（累计 {engine.total_lines} 行，有效视频访问 {engine.video_lines} 行），"
+              f"耗时 {load_duration:.2f} 秒")
+        if stats.files:
+            stats.report("压缩日志读取")
+        print(f"视频数: {len(engine.prefix_counts)}，前缀和数组占用内存: {engine.memory_bytes() / 1024 / 1024:.2f} MB")
+
+        if engine.min_time is not None:
+            day_start = engine.min_time - engine.min_time % 86400
+            start_time = parse_clock(args.start, day_start) if args.start else engine.min_time
+            end_time = parse_clock(args.end, day_start) if args.end else engine.max_time + 1
+
+            query_start = time.time()
+            top_videos = engine.top_k(start_time, end_time, args.top)
+            query_duration = time.time() - query_start
+
+            print(f"\n{format_time(start_time)} ~ {format_time(end_time)} 最受欢迎的TOP {args.top}视频"
+                  f"（查询耗时 {query_duration * 1000:.1f} 毫秒）:")
+            for video_id, view_count in top_videos:
+                print(f"视频ID: {video_id}, 访问次数: {view_count}")
+
+        if args.follow <= 0:
+            break
+        time.sleep(args.follow)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(0)
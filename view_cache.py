@@ -0,0 +1,110 @@
+# 临时视图物化层：把会被多次使用的临时视图缓存为Spark内存列式表(InMemoryRelation)，
+# 避免每次 .write.csv / .show() 都从原始CSV重新计算；结束时显式释放缓存，
+# 并按任务统计原始CSV被重新扫描的次数
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+
+class ViewMaterializer:
+    """
+    管理临时视图缓存并统计源文件扫描次数
+
+    扫描次数通过Hadoop本地文件系统的累计读取字节数估算（读取字节数 / 源文件大小），
+    适用于 local[*] 模式（执行器与driver在同一个JVM中）
+
+    Args:
+        spark: SparkSession
+        source_path: 原始数据文件路径，用于统计重新扫描次数
+    """
+
+    def __init__(self, spark, source_path):
+        self.spark = spark
+        self.source_path = source_path
+        self.source_size = self._get_size(source_path)
+        self.cached_views = []
+        self.task_stats = []
+        self._current_task = None
+        self._task_start_time = None
+        self._task_start_bytes = 0
+        self._lock = threading.Lock()
+        self._active_tasks = 0
+        self.overlapped = False  # 是否有任务并发执行（读取字节数为进程级累计值，并发任务会互相计入）
+
+    # 源文件大小，源为目录（如Parquet存储）时统计目录下全部文件
+    @staticmethod
+    def _get_size(path):
+        if os.path.isdir(path):
+            return sum(os.path.getsize(os.path.join(root, name))
+                       for root, _, files in os.walk(path) for name in files)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    # 缓存临时视图（惰性缓存，第一次被使用时物化为列式内存表）
+    def cache(self, view_name):
+        self.spark.catalog.cacheTable(view_name)
+        self.cached_views.append(view_name)
+
+    # 当前JVM中本地文件系统的累计读取字节数
+    def _local_bytes_read(self):
+        jvm = self.spark.sparkContext._jvm
+        total_bytes = 0
+        for statistics in jvm.org.apache.hadoop.fs.FileSystem.getAllStatistics():
+            if statistics.getScheme() == "file":
+                total_bytes += statistics.getBytesRead()
+        return total_bytes
+
+    # 结束上一个任务的统计，并开始统计新任务
+    def mark_task(self, task_name):
+        self._finish_task()
+        self._current_task = task_name
+        self._task_start_time = time.time()
+        self._task_start_bytes = self._local_bytes_read()
+
+    # 统计一个任务执行期间的源文件扫描次数和耗时，可在多个线程中同时使用
+    @contextmanager
+    def track_task(self, task_name):
+        with self._lock:
+            self._active_tasks += 1
+            if self._active_tasks > 1:
+                self.overlapped = True
+        start_time = time.time()
+        start_bytes = self._local_bytes_read()
+        try:
+            yield
+        finally:
+            bytes_read = self._local_bytes_read() - start_bytes
+            scans = bytes_read / self.source_size if self.source_size else 0
+            with self._lock:
+                self._active_tasks -= 1
+                self.task_stats.append((task_name, scans, bytes_read, time.time() - start_time))
+
+    def _finish_task(self):
+        if self._current_task is None:
+            return
+        bytes_read = self._local_bytes_read() - self._task_start_bytes
+        scans = bytes_read / self.source_size if self.source_size else 0
+        duration = time.time() - self._task_start_time
+        self.task_stats.append((self._current_task, scans, bytes_read, duration))
+        self._current_task = None
+
+    # 输出各任务的源文件扫描次数和耗时
+    def report(self):
+        self._finish_task()
+        print("\n=== 各任务原始数据扫描次数 ===")
+        total_scans = 0
+        for task_name, scans, bytes_read, duration in self.task_stats:
+            total_scans += scans
+            print(f"{task_name}: 扫描 {scans:.2f} 次（读取 {bytes_read / 1024 / 1024:.1f} MB），耗时 {duration:.2f} 秒")
+        print(f"合计扫描 {total_scans:.2f} 次")
+        if self.overlapped:
+            print("（有任务并发执行，各任务的读取字节数包含同时运行的其他任务，使用 --workers 1 可得到准确的分任务统计）")
+
+    # 输出统计结果并释放所有缓存的视图
+    def finish(self):
+        self.report()
+        for view_name in reversed(self.cached_views):
+            self.spark.catalog.uncacheTable(view_name)
+        print(f"已释放 {len(self.cached_views)} 个缓存视图")
+        self.cached_views = []